@@ -0,0 +1,194 @@
+import threading
+import time
+
+from narodmon.settings import aggregation_dict
+from narodmon.tools import sensor_class
+
+
+class P2Median:
+    __slots__ = ('heights', 'positions', 'desired', 'count')
+
+    def __init__(self):
+        """
+        Streaming median estimator (P-square algorithm), O(1) memory
+        """
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 2, 3, 4, 5]
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        heights = self.heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        for index in range(cell + 1, 5):
+            self.positions[index] += 1
+        increments = (0, 0.25, 0.5, 0.75, 1)
+        for index in range(5):
+            self.desired[index] += increments[index]
+        for index in range(1, 4):
+            delta = self.desired[index] - self.positions[index]
+            if (delta >= 1 and self.positions[index + 1] - self.positions[index] > 1) or \
+                    (delta <= -1 and self.positions[index - 1] - self.positions[index] < -1):
+                step = 1 if delta > 0 else -1
+                height = self.parabolic(index, step)
+                if not heights[index - 1] < height < heights[index + 1]:
+                    height = self.linear(index, step)
+                heights[index] = height
+                self.positions[index] += step
+
+    def parabolic(self, index, step):
+        heights, positions = self.heights, self.positions
+        return heights[index] + step / (positions[index + 1] - positions[index - 1]) * (
+            (positions[index] - positions[index - 1] + step) * (heights[index + 1] - heights[index]) /
+            (positions[index + 1] - positions[index]) +
+            (positions[index + 1] - positions[index] - step) * (heights[index] - heights[index - 1]) /
+            (positions[index] - positions[index - 1]))
+
+    def linear(self, index, step):
+        heights, positions = self.heights, self.positions
+        return heights[index] + step * (heights[index + step] - heights[index]) / (positions[index + step] -
+                                                                                   positions[index])
+
+    def value(self):
+        if self.count > 5:
+            return self.heights[2]
+        heights = self.heights
+        middle = len(heights) // 2
+        return heights[middle] if len(heights) % 2 else (heights[middle - 1] + heights[middle]) / 2
+
+
+class Window:
+    __slots__ = ('index', 'statistic', 'count', 'total', 'value', 'time', 'unit', 'median')
+
+    def __init__(self, index, statistic):
+        """
+        State of one aggregation window of one sensor
+
+        :param index: number of window (utc time // window length)
+        :param statistic: 'last', 'mean', 'min', 'max' or 'median'
+        """
+        self.index = index
+        self.statistic = statistic
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+        self.time = None
+        self.unit = None
+        self.median = P2Median() if statistic == 'median' else None
+
+    def add(self, value, utc_time, unit=None):
+        self.count += 1
+        self.unit = unit or self.unit
+        statistic = self.statistic
+        if statistic == 'mean':
+            self.total += value
+        elif statistic == 'median':
+            self.median.add(value)
+        if statistic == 'min' and self.value is not None and value >= self.value:
+            return
+        if statistic == 'max' and self.value is not None and value <= self.value:
+            return
+        if statistic in ('last', 'min', 'max') or self.time is None or utc_time >= self.time:
+            self.time = utc_time
+        if statistic in ('last', 'min', 'max'):
+            self.value = value
+
+    def result(self, id_in):
+        """
+        Get aggregated sensor data (time is time of last sample, or time of extreme sample for min/max)
+
+        :param id_in: sensor ID
+        :return: dict with sensor data
+        """
+        if self.statistic == 'mean':
+            value = self.total / self.count
+        elif self.statistic == 'median':
+            value = self.median.value()
+        else:
+            value = self.value
+        answer = {"id": id_in, "value": value, "time": self.time}
+        if self.unit:
+            answer.update({"unit": self.unit})
+        return answer
+
+
+class Aggregator:
+    def __init__(self, window=300, statistics=None, default='last'):
+        """
+        Reduces all samples of each sensor in current time window (aligned to utc) to one reading.
+        Statistic of sensor is taken by sensor id, then by its class (settings.aggregation_dict).
+
+        :param window: window length in seconds
+        :param statistics: (optional) dict {class name or sensor id: statistic}, overrides settings.aggregation_dict
+        :param default: statistic of unknown sensors
+        """
+        self.window = window
+        self.statistics = dict(aggregation_dict)
+        if statistics:
+            self.statistics.update(statistics)
+        self.default = default
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def get_statistic(self, id_in):
+        if id_in in self.statistics:
+            return self.statistics[id_in]
+        return self.statistics.get(sensor_class(id_in), self.default)
+
+    def add(self, devices):
+        """
+        Add samples, readings of windows closed by these samples are returned
+
+        :param devices: list of device data (dicts with mac and sensors)
+        :return: dict {mac: aggregated sensors list}
+        """
+        now = int(time.time())
+        closed = {}
+        with self.lock:
+            for device in devices:
+                mac = device.get('mac')
+                for sensor in device['sensors']:
+                    utc_time = sensor.get('time') or now
+                    index = utc_time // self.window
+                    key = (mac, sensor['id'])
+                    window = self.windows.get(key)
+                    if window is not None and window.index != index:
+                        if window.index < index:
+                            closed.setdefault(mac, []).append(window.result(sensor['id']))
+                        else:
+                            continue
+                        window = None
+                    if window is None:
+                        window = self.windows[key] = Window(index, self.get_statistic(sensor['id']))
+                    window.add(float(sensor['value']), utc_time, sensor.get('unit'))
+        return closed
+
+    def flush(self, force=False):
+        """
+        Get readings of windows already finished by current time
+
+        :param force: if True - all windows are returned, including current ones
+        :return: dict {mac: aggregated sensors list}
+        """
+        index = int(time.time()) // self.window
+        closed = {}
+        with self.lock:
+            for key, window in list(self.windows.items()):
+                if force or window.index < index:
+                    closed.setdefault(key[0], []).append(window.result(key[1]))
+                    del self.windows[key]
+        return closed
@@ -0,0 +1,252 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import os
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class HistoryArchive:
+    def __init__(self, path):
+        """
+        On-disk columnar archive of sensors history: each sensor (and period) has two fixed-width files,
+        times (int64, sorted) and values (float64) in native byte order. Readers get NumPy views of memory-mapped
+        files (without copy), range is found by binary search over times. Points newer than last stored one are
+        appended to the end of files, older ones are merged (files of next generation are written).
+
+        :param path: directory of archive
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def get_name(self, id_in, period):
+        return os.path.join(self.path, f'{id_in}.{period}'.replace(os.sep, '_'))
+
+    def get_generation(self, id_in, period):
+        """
+        Get generation of sensor column files, it's increased by each rewrite (0 - files were never rewritten)
+
+        :param id_in: sensor id
+        :param period: period of points
+        :return: int
+        """
+        try:
+            with open(f'{self.get_name(id_in, period)}.generation') as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def get_paths(self, id_in, period, generation=None):
+        """
+        Get paths of sensor column files
+
+        :param id_in: sensor id
+        :param period: period of points, i.e. 'hour' or 'day'
+        :param generation: (optional) generation of files, by default - current one
+        :return: tuple (times path, values path)
+        """
+        name = self.get_name(id_in, period)
+        if generation is None:
+            generation = self.get_generation(id_in, period)
+        if generation:
+            name = f'{name}.{generation}'
+        return f'{name}.time', f'{name}.value'
+
+    def get_length(self, id_in, period, paths=None):
+        """
+        Get count of stored points (incomplete tail after crash is ignored)
+
+        :param id_in: sensor id
+        :param period: period of points
+        :param paths: (optional) paths of column files, by default - files of current generation
+        :return: int
+        """
+        times_path, values_path = paths if paths is not None else self.get_paths(id_in, period)
+        if not os.path.exists(times_path) or not os.path.exists(values_path):
+            return 0
+        return min(os.path.getsize(times_path), os.path.getsize(values_path)) // 8
+
+    def get_last_time(self, id_in, period):
+        """
+        Get time of last stored point
+
+        :param id_in: sensor id
+        :param period: period of points
+        :return: utc timestamp or None if archive of sensor is empty
+        """
+        paths = self.get_paths(id_in, period)
+        length = self.get_length(id_in, period, paths)
+        if not length:
+            return None
+        with open(paths[0], 'rb') as file:
+            file.seek((length - 1) * 8)
+            return array('q', file.read(8))[0]
+
+    @staticmethod
+    def search(times_path, length, point_time):
+        """
+        Find position of first stored time which is not less than point_time (binary search over file)
+
+        :param times_path: path of times file
+        :param length: count of stored points
+        :param point_time: utc timestamp
+        :return: position
+        """
+        first, last = 0, length
+        with open(times_path, 'rb') as file:
+            while first < last:
+                middle = (first + last) // 2
+                file.seek(middle * 8)
+                if array('q', file.read(8))[0] < point_time:
+                    first = middle + 1
+                else:
+                    last = middle
+        return first
+
+    @staticmethod
+    def load_range(paths, first, last):
+        """
+        Load part of columns into memory
+
+        :param paths: paths of column files
+        :param first: first position
+        :param last: position after last one
+        :return: tuple (array of times, array of values)
+        """
+        columns = (array('q'), array('d'))
+        for path, column in zip(paths, columns):
+            if last > first:
+                with open(path, 'rb') as file:
+                    file.seek(first * 8)
+                    column.fromfile(file, last - first)
+        return columns
+
+    def append(self, id_in, period, points):
+        """
+        Store points, duplicates (by time) are replaced by new values. Points already stored with the same value
+        are skipped, changed values are overwritten in place, new points after last stored one are appended.
+        Files are rewritten only if new point is older than last stored one.
+
+        :param id_in: sensor id
+        :param period: period of points
+        :param points: list of dicts with time and value (i.e. data of sensorsHistory response)
+        :return: count of stored points
+        """
+        merged = {int(point['time']): float(point['value']) for point in points}
+        count = len(merged)
+        if not count:
+            return 0
+        with self.lock:
+            paths = self.get_paths(id_in, period)
+            length = self.get_length(id_in, period, paths)
+            position = self.search(paths[0], length, min(merged)) if length else 0
+            old_times, old_values = self.load_range(paths, position, length)
+            changed = []
+            for index, (point_time, value) in enumerate(zip(old_times, old_values)):
+                new_value = merged.pop(point_time, None)
+                if new_value is not None and new_value != value:
+                    changed.append((position + index, new_value))
+            if merged and len(old_times) and min(merged) < old_times[-1]:
+                times, values = self.load(id_in, period)
+                stored = dict(zip(times, values))
+                stored.update({int(point['time']): float(point['value']) for point in points})
+                times = sorted(stored)
+                self.write(id_in, period, times, [stored[point_time] for point_time in times])
+                return count
+            if changed:
+                with open(paths[1], 'r+b') as file:
+                    for index, value in changed:
+                        file.seek(index * 8)
+                        array('d', [value]).tofile(file)
+            if merged:
+                times = sorted(merged)
+                self.write(id_in, period, times, [merged[point_time] for point_time in times], mode='ab')
+        return count
+
+    def write(self, id_in, period, times, values, mode='wb'):
+        """
+        Write columns: append to the end of files ('ab') or replace files ('wb'). Replaced columns are written into
+        files of next generation, which becomes current by atomic replace of generation file, so reader never sees
+        columns of different generations. Files of previous generation are kept for readers which opened them
+        (they are removed by next rewrite).
+
+        :param id_in: sensor id
+        :param period: period of points
+        :param times: sorted list of utc timestamps
+        :param values: list of values
+        :param mode: 'ab' or 'wb'
+        """
+        columns = (array('q', times), array('d', values))
+        if mode == 'ab':
+            paths = self.get_paths(id_in, period)
+            length = self.get_length(id_in, period, paths)
+            for path, column in reversed(list(zip(paths, columns))):
+                with open(path, 'ab') as file:
+                    file.truncate(length * 8)
+                    column.tofile(file)
+            return
+        generation = self.get_generation(id_in, period)
+        for path, column in zip(self.get_paths(id_in, period, generation + 1), columns):
+            with open(path, 'wb') as file:
+                column.tofile(file)
+                file.flush()
+                os.fsync(file.fileno())
+        generation_path = f'{self.get_name(id_in, period)}.generation'
+        with open(f'{generation_path}.tmp', 'w') as file:
+            file.write(str(generation + 1))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f'{generation_path}.tmp', generation_path)
+        for path in self.get_paths(id_in, period, generation - 1) if generation else ():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def load(self, id_in, period):
+        """
+        Load columns into memory (without NumPy)
+
+        :param id_in: sensor id
+        :param period: period of points
+        :return: tuple (array of times, array of values)
+        """
+        paths = self.get_paths(id_in, period)
+        return self.load_range(paths, 0, self.get_length(id_in, period, paths))
+
+    def read(self, id_in, period, start=None, end=None):
+        """
+        Get points of time range. With NumPy - views of memory-mapped files (without copy),
+        otherwise - arrays loaded into memory
+
+        :param id_in: sensor id
+        :param period: period of points
+        :param start: (optional) start of range (utc timestamp, inclusive)
+        :param end: (optional) end of range (utc timestamp, inclusive)
+        :return: tuple (times, values)
+        """
+        paths = self.get_paths(id_in, period)
+        length = self.get_length(id_in, period, paths)
+        if numpy is None:
+            times, values = self.load_range(paths, 0, length)
+            first = bisect_left(times, start) if start is not None else 0
+            last = bisect_right(times, end) if end is not None else length
+            return times[first:last], values[first:last]
+        if not length:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.float64)
+        times_path, values_path = paths
+        times = numpy.memmap(times_path, dtype=numpy.int64, mode='r', shape=(length,))
+        values = numpy.memmap(values_path, dtype=numpy.float64, mode='r', shape=(length,))
+        first = numpy.searchsorted(times, start, side='left') if start is not None else 0
+        last = numpy.searchsorted(times, end, side='right') if end is not None else length
+        return times[first:last], values[first:last]
+
+    def __contains__(self, key):
+        """
+        Check if archive has points of (sensor id, period)
+        """
+        return self.get_length(*key) > 0
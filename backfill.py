@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+import threading
+import time
+
+from narodmon.tools import OK_CODES
+
+
+class BackfillJob:
+    def __init__(self, sync, ids, period, start, end=None, checkpoint=None, concurrency=4, on_progress=None,
+                 checkpoint_every=10):
+        """
+        Parallel backfill of sensors history: time range of each sensor is expanded into (id, period, offset)
+        tasks, tasks are requested concurrently (rate limits of transport are applied to each request).
+        Windows already stored in HistoryStore are not requested, so job resumes after crash from stored progress;
+        checkpoint file keeps counters and failed tasks of job.
+
+        :param sync: HistorySync
+        :param ids: sensor id's
+        :param period: 'hour', 'day', 'week', 'month' or 'year'
+        :param start: start of range (utc timestamp)
+        :param end: (optional) end of range (utc timestamp), by default - now
+        :param checkpoint: (optional) path to JSON checkpoint file
+        :param concurrency: maximum requests sent at the same time
+        :param on_progress: (optional) callback(progress dict) called after each task
+        :param checkpoint_every: write checkpoint after this count of tasks
+        """
+        self.sync = sync
+        self.ids = list(ids)
+        self.period = period
+        self.start = start
+        self.end = end
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.checkpoint_every = checkpoint_every
+        self.lock = threading.Lock()
+        self.state = {"done": 0, "total": 0, "points": 0, "failed": [], "elapsed": 0.0}
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                self.state.update(json.load(file))
+
+    def get_tasks(self):
+        """
+        Get tasks which are not stored yet
+
+        :return: list of (id, offset) tuples
+        """
+        end = self.end if self.end is not None else int(time.time())
+        return [(id_in, offset) for id_in in self.ids
+                for offset, _, _ in self.sync.missing_windows(id_in, self.period, self.start, end)]
+
+    def run_task(self, task):
+        id_in, offset = task
+        try:
+            return task, self.sync.fetch(id_in, self.period, offset)
+        except Exception as error:
+            return task, (0, error)
+
+    def run(self):
+        """
+        Run all remaining tasks
+
+        :return: progress dict (done, total, points, failed, elapsed, rate, eta)
+        """
+        tasks = self.get_tasks()
+        started = time.time() - self.state['elapsed']
+        with self.lock:
+            self.state['failed'] = []
+            self.state['total'] = self.state['done'] + len(tasks)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self.run_task, task) for task in tasks]
+            for future in as_completed(futures):
+                (id_in, offset), (count, response) = future.result()
+                with self.lock:
+                    self.state['done'] += 1
+                    self.state['points'] += count
+                    self.state['elapsed'] = time.time() - started
+                    if isinstance(response, Exception) or type(response) != dict or \
+                            response.get('errno', 200) not in OK_CODES:
+                        self.state['failed'].append([id_in, offset, response.get('errno') if type(response) == dict
+                                                     else str(response)])
+                    progress = self.get_progress()
+                    if self.state['done'] % self.checkpoint_every == 0:
+                        self.save()
+                if self.on_progress:
+                    self.on_progress(progress)
+        with self.lock:
+            self.state['elapsed'] = time.time() - started
+            self.save()
+            return self.get_progress()
+
+    def get_progress(self):
+        """
+        Get progress of job: throughput (tasks per second) and estimated time to finish (seconds)
+
+        :return: dict
+        """
+        state = self.state
+        rate = state['done'] / state['elapsed'] if state['elapsed'] else 0.0
+        remaining = state['total'] - state['done']
+        return dict(state, failed=list(state['failed']), rate=rate,
+                    eta=remaining / rate if rate else None)
+
+    def save(self):
+        if not self.checkpoint:
+            return
+        temp_path = f'{self.checkpoint}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.state, file)
+        os.replace(temp_path, self.checkpoint)
@@ -0,0 +1,137 @@
+from sys import stderr
+import queue
+import threading
+import time
+
+
+class BatchUploader:
+    FLUSH = object()
+    STOP = object()
+
+    def __init__(self, interface, max_readings=500, max_age=60.0, queue_size=10000, put_timeout=None,
+                 on_response=None):
+        """
+        Accumulates sensors data of any devices and sends them via send_bulk_data in background thread
+
+        :param interface: InterfaceJSON used for upload
+        :param max_readings: flush when count of pending readings reaches this value
+        :param max_age: flush when oldest pending reading is older than this value (seconds)
+        :param queue_size: maximum readings waiting in queue, add() blocks (backpressure) when queue is full
+        :param put_timeout: (optional) maximum seconds add() waits for free place, then queue.Full raised
+        :param on_response: (optional) callback(devices, response) called after each flush, response may be exception
+        """
+        self.interface = interface
+        self.max_readings = max_readings
+        self.max_age = max_age
+        self.put_timeout = put_timeout
+        self.on_response = on_response
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pending = {}
+        self.pending_count = 0
+        self.oldest = None
+        self.thread = None
+
+    def start(self):
+        """
+        Start background upload thread
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='narodmon-batch-uploader', daemon=True)
+            self.thread.start()
+        return self
+
+    def add(self, sensors, mac=None):
+        """
+        Add sensors data of device to batch
+
+        :param sensors: sensors list or one sensor data (dict), may be prepared via prepare_sensor_data
+        :param mac: (optional) mac address of device
+        """
+        if type(sensors) == dict:
+            sensors = [sensors]
+        if not mac:
+            mac = self.interface.mac
+        self.start()
+        for sensor in sensors:
+            self.queue.put((mac, sensor), timeout=self.put_timeout)
+
+    def flush(self, timeout=None):
+        """
+        Send all pending readings now and wait until they are sent
+
+        :param timeout: (optional) maximum seconds to wait
+        :return: True if flushed in time
+        """
+        self.start()
+        done = threading.Event()
+        self.queue.put((self.FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """
+        Send all pending readings and stop background thread
+
+        :param timeout: (optional) maximum seconds to wait
+        """
+        if self.thread is not None and self.thread.is_alive():
+            self.queue.put((self.STOP, None))
+            self.thread.join(timeout)
+
+    def run(self):
+        while True:
+            try:
+                wait = None if self.oldest is None else max(0.0, self.oldest + self.max_age - time.monotonic())
+                mac, item = self.queue.get(timeout=wait)
+            except queue.Empty:
+                self.send()
+                continue
+            if mac is self.FLUSH:
+                self.send()
+                item.set()
+            elif mac is self.STOP:
+                self.send()
+                return
+            else:
+                self.merge(mac, item)
+                if self.pending_count >= self.max_readings:
+                    self.send()
+
+    def merge(self, mac, sensor):
+        """
+        Merge reading into pending device data, reading of the same sensor and time replaces previous one
+
+        :param mac: mac address of device
+        :param sensor: sensor data (dict)
+        """
+        device = self.pending.setdefault(mac, {})
+        key = (sensor.get('id'), sensor.get('time'))
+        if key not in device:
+            self.pending_count += 1
+        device[key] = sensor
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+
+    def send(self):
+        """
+        Send pending readings as one bulk request
+        """
+        if not self.pending:
+            self.oldest = None
+            return
+        devices = [{"mac": mac, "sensors": list(sensors.values())} for mac, sensors in self.pending.items()]
+        self.pending = {}
+        self.pending_count = 0
+        self.oldest = None
+        try:
+            response = self.interface.send_bulk_data(devices)
+        except Exception as error:
+            stderr.write(f"\nNarodmon batch upload failed: {error}\n")
+            response = error
+        if self.on_response:
+            self.on_response(devices, response)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+import threading
+import time
+
+from narodmon.tools import encode_json, OK_CODES
+
+
+class Entry:
+    __slots__ = ('value', 'expires', 'size')
+
+    def __init__(self, value, expires, size):
+        self.value = value
+        self.expires = expires
+        self.size = size
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024, default_ttl=60.0, min_ttl=10.0, max_ttl=900.0,
+                 max_cadences=100000):
+        """
+        In-process read-through cache of API responses with LRU eviction and memory cap.
+        Freshness of item (sensor, webcam) is its reported time (or changed) plus its observed update cadence,
+        i.e. sensor updated every 5 minutes and reported 1 minute ago is fresh for 4 more minutes.
+
+        :param max_bytes: memory cap, estimated size of cached JSON in bytes
+        :param default_ttl: lifetime (seconds) of item which update cadence is unknown yet
+        :param min_ttl: minimal lifetime (seconds) of item, also used for overdue items
+        :param max_ttl: maximum lifetime (seconds) of item
+        :param max_cadences: maximum count of items which update cadence is remembered
+        """
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.max_cadences = max_cadences
+        self.entries = OrderedDict()
+        self.cadences = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, now=None):
+        """
+        Get cached value if it's still fresh
+
+        :param key: cache key (tuple)
+        :param now: (optional) current time
+        :return: cached value or None
+        """
+        now = now if now is not None else time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= now:
+                self.pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry.value
+
+    def put(self, key, value, ttl):
+        """
+        Store value, least recently used values are evicted to fit memory cap
+
+        :param key: cache key (tuple)
+        :param value: JSON-serializable value
+        :param ttl: lifetime in seconds
+        """
+        size = len(encode_json(value)) + 100
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            self.pop(key)
+            self.entries[key] = Entry(value, time.time() + ttl, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.pop(next(iter(self.entries)))
+
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def observe(self, kind, item):
+        """
+        Update cadence of item by its reported time
+
+        :param kind: item kind, i.e. 'sensor' or 'webcam'
+        :param item: item dict with id and time (or changed)
+        :return: tuple (reported time, cadence in seconds or None)
+        """
+        reported = item.get('time') or item.get('changed')
+        key = (kind, item.get('id'))
+        with self.lock:
+            last_time, cadence = self.cadences.pop(key, (None, None))
+            if reported and last_time and reported > last_time:
+                interval = reported - last_time
+                cadence = interval if cadence is None else 0.7 * cadence + 0.3 * interval
+            self.cadences[key] = (max(reported or 0, last_time or 0) or None, cadence)
+            if len(self.cadences) > self.max_cadences:
+                self.cadences.popitem(last=False)
+        return reported, cadence
+
+    def item_ttl(self, kind, item, now=None):
+        """
+        Get lifetime of item: time until its next expected update
+
+        :param kind: item kind, i.e. 'sensor' or 'webcam'
+        :param item: item dict with id and time (or changed)
+        :param now: (optional) current time
+        :return: lifetime in seconds
+        """
+        now = now if now is not None else time.time()
+        reported, cadence = self.observe(kind, item)
+        if not reported or cadence is None:
+            return self.default_ttl
+        return min(max(reported + cadence - now, self.min_ttl), self.max_ttl)
+
+    def items_ttl(self, kind, items):
+        """
+        Get lifetime of response with several items: lifetime of item which will be updated first
+
+        :param kind: item kind
+        :param items: list of item dicts
+        :return: lifetime in seconds
+        """
+        now = time.time()
+        return min((self.item_ttl(kind, item, now) for item in items if type(item) == dict),
+                   default=self.default_ttl)
+
+    def split_sensors(self, scope, sensors):
+        """
+        Split requested sensors into cached and stale ones (id's are compared as strings, so 101 and '101' are
+        the same sensor)
+
+        :param scope: cache scope of request (i.e. api key and trends flag)
+        :param sensors: list of sensor id's
+        :return: tuple (dict {str(id): cached sensor data}, list of stale id's)
+        """
+        now = time.time()
+        cached = {}
+        stale = {}
+        for id_in in sensors:
+            key = str(id_in)
+            sensor = self.get(('sensor', scope, key), now)
+            if sensor is None:
+                stale.setdefault(key, id_in)
+            else:
+                cached[key] = sensor
+        return cached, list(stale.values())
+
+    def merge_sensors(self, scope, sensors, cached, response):
+        """
+        Store fetched sensors and merge them with cached ones in requested order
+
+        :param scope: cache scope of request
+        :param sensors: list of requested sensor id's
+        :param cached: dict {str(id): cached sensor data}
+        :param response: sensorsValues response JSON for stale sensors
+        :return: response JSON with all requested sensors
+        """
+        if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+            return response
+        fetched = {}
+        now = time.time()
+        for sensor in response.get('sensors', []):
+            key = str(sensor['id'])
+            fetched[key] = sensor
+            self.put(('sensor', scope, key), sensor, self.item_ttl('sensor', sensor, now))
+        answer = dict(response)
+        keys = dict.fromkeys(str(id_in) for id_in in sensors)
+        answer['sensors'] = [cached[key] if key in cached else fetched[key]
+                             for key in keys if key in cached or key in fetched]
+        return answer
+
+    def store(self, key, kind, items_name, response):
+        """
+        Store whole response, its lifetime is lifetime of item which will be updated first
+
+        :param key: cache key
+        :param kind: kind of items in response
+        :param items_name: name of items list in response, i.e. 'sensors' or 'webcams'
+        :param response: response JSON
+        :return: response JSON
+        """
+        if type(response) == dict and response.get('errno', 200) in OK_CODES:
+            self.put(key, response, self.items_ttl(kind, response.get(items_name) or []))
+        return response
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from narodmon.tools import OK_CODES
+
+
+class Catalog:
+    def __init__(self, interface, path, max_age=86400, lang=None, check_interval=600):
+        """
+        appInit response (sensor types dictionary, favorites) cached in file shared by processes of host:
+        only one process requests appInit when cache file is older than max_age, others read the file.
+        Data is served from memory, background thread keeps it fresh. After failed request appInit is not requested
+        again during check_interval.
+
+        :param interface: InterfaceAPI used for requests
+        :param path: path to cache file
+        :param max_age: maximum age of cached response in seconds (by default - one day)
+        :param lang: (optional) language, string, possible values are: "ru","en","uk"
+        :param check_interval: how often (seconds) background thread checks age of cache, also delay before retry
+            of failed request
+        """
+        self.interface = interface
+        self.path = path
+        self.max_age = max_age
+        self.lang = lang
+        self.check_interval = check_interval
+        self.response = None
+        self.fetched = 0
+        self.attempted = None
+        self.types = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def favorites(self):
+        self.load()
+        return (self.response or {}).get('favorites') or []
+
+    def get_type(self, type_code):
+        """
+        Get sensor type by its code
+
+        :param type_code: type code (see sensors[type] of responses)
+        :return: dict with type, name and unit, None if unknown
+        """
+        self.load()
+        return self.types.get(type_code)
+
+    def is_fresh(self):
+        return self.response is not None and time.time() - self.fetched < self.max_age
+
+    def is_backing_off(self):
+        return self.attempted is not None and time.monotonic() - self.attempted < self.check_interval
+
+    def read(self):
+        """
+        Read cache file into memory
+
+        :return: True if file exists and is readable
+        """
+        try:
+            with open(self.path) as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return False
+        self.set_response(cached['response'], cached['fetched'])
+        return True
+
+    def set_response(self, response, fetched):
+        self.response = response
+        self.fetched = fetched
+        self.types = {item.get('type'): item for item in response.get('types') or [] if type(item) == dict}
+
+    def load(self, force=False):
+        """
+        Get fresh data: from memory, from cache file, or request appInit (under file lock, so only one process of
+        host sends request)
+
+        :param force: if True - appInit is requested anyway (even if previous request failed recently)
+        :return: appInit response JSON (cached), None if it was never received
+        """
+        if not force and (self.is_fresh() or self.is_backing_off()):
+            return self.response
+        with self.lock:
+            if not force and (self.is_fresh() or self.is_backing_off() or (self.read() and self.is_fresh())):
+                return self.response
+            with open(f'{self.path}.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    if not force and self.read() and self.is_fresh():
+                        return self.response
+                    self.fetch()
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return self.response
+
+    def fetch(self):
+        """
+        Request appInit and store response into cache file, previous data is kept if request failed (time of failed
+        request is stored in attempted)
+        """
+        try:
+            response = self.interface.app_init(lang=self.lang)
+        except Exception:
+            response = None
+        if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+            self.attempted = time.monotonic()
+            return
+        self.attempted = None
+        fetched = time.time()
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({"fetched": fetched, "response": response}, file)
+        os.replace(temp_path, self.path)
+        self.set_response(response, fetched)
+
+    def start(self):
+        """
+        Start background thread which refreshes data when it's older than max_age
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.load()
+            self.stop_event.wait(self.check_interval)
+
+    def stop(self, timeout=None):
+        """
+        Stop background thread
+
+        :param timeout: (optional) maximum seconds to wait for thread
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
@@ -0,0 +1,85 @@
+from functools import lru_cache
+
+from narodmon.settings import sensor_dict, unit_dict
+
+
+class SensorClassifier:
+    def __init__(self, patterns=None, units=None, memo_size=65536):
+        """
+        Classifier of sensor IDs compiled from patterns (exact names and '*' wildcards): exact name has precedence,
+        otherwise the longest matching wildcard prefix wins. Prefixes are kept in trie, so ID is resolved in time
+        proportional to its length.
+
+        :param patterns: (optional) dict {class name: patterns}, by default - settings.sensor_dict
+        :param units: (optional) dict {class name or exact ID: unit}, by default - settings.unit_dict
+        :param memo_size: size of LRU memo used by classify_many
+        """
+        self.exact = {}
+        self.trie = {}
+        for class_name, class_patterns in (patterns if patterns is not None else sensor_dict).items():
+            for pattern in class_patterns:
+                pattern = pattern.upper()
+                if not pattern.endswith('*'):
+                    self.exact.setdefault(pattern, class_name)
+                    continue
+                node = self.trie
+                for char in pattern[:-1]:
+                    node = node.setdefault(char, {})
+                node.setdefault('', class_name)
+        self.units = units if units is not None else unit_dict
+        self.memo = lru_cache(maxsize=memo_size)(self.classify)
+
+    def classify(self, id_in):
+        """
+        Get class of sensor by its ID
+
+        :param id_in: sensor ID, i.e. 'TEMPC', 'T1', 'DS18T2'
+        :return: class name, i.e. 'temperature', None if unknown
+        """
+        id_in = str(id_in).upper()
+        found = self.exact.get(id_in)
+        if found is not None:
+            return found
+        node = self.trie
+        found = node.get('')
+        for char in id_in:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get('', found)
+        return found
+
+    def classify_many(self, ids):
+        """
+        Get classes of many sensors (results are memoized)
+
+        :param ids: sensor IDs
+        :return: list of class names (None if unknown)
+        """
+        memo = self.memo
+        return [memo(id_in) for id_in in ids]
+
+    def get_unit(self, id_in, class_name=None):
+        """
+        Get default unit of sensor: unit of exact ID, otherwise unit of its class
+
+        :param id_in: sensor ID
+        :param class_name: (optional) class of sensor, if already known
+        :return: unit, None if unknown
+        """
+        unit = self.units.get(str(id_in).upper())
+        if unit is not None:
+            return unit
+        return self.units.get(class_name if class_name is not None else self.memo(id_in))
+
+    def get_units(self, ids):
+        """
+        Get default units of many sensors
+
+        :param ids: sensor IDs
+        :return: list of units (None if unknown)
+        """
+        return [self.get_unit(id_in, class_name) for id_in, class_name in zip(ids, self.classify_many(ids))]
+
+
+default_classifier = SensorClassifier()
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from narodmon.cache import ResponseCache
+from narodmon.tools import OK_CODES
+
+
+class MapCrawler:
+    def __init__(self, interface, limit=50, max_depth=8, concurrency=4, ttl=600, cache=None, lang=None):
+        """
+        Crawler of all devices and webcams in region via mapBounds: tile which response is saturated (contains limit
+        items, so server clustered or cut it) is split into four quadrants, tiles are requested concurrently
+        (rate limits of transport are applied to each request), items are deduplicated by id
+
+        :param interface: InterfaceAPI used for requests
+        :param limit: limit of items in one mapBounds response (max 50)
+        :param max_depth: maximum count of tile splits
+        :param concurrency: maximum requests sent at the same time
+        :param ttl: lifetime of tile response in cache (seconds)
+        :param cache: (optional) ResponseCache for tile responses, by default - own cache
+        :param lang: (optional) language, string, possible values are: "ru","en","uk"
+        """
+        self.interface = interface
+        self.limit = limit
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.cache = cache if cache is not None else ResponseCache()
+        self.lang = lang
+
+    @staticmethod
+    def split(bounds):
+        """
+        Split tile into four quadrants
+
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        :return: list of four bounds
+        """
+        lat_min, lon_min, lat_max, lon_max = bounds
+        lat_mid = (lat_min + lat_max) / 2
+        lon_mid = (lon_min + lon_max) / 2
+        return [[lat_min, lon_min, lat_mid, lon_mid], [lat_min, lon_mid, lat_mid, lon_max],
+                [lat_mid, lon_min, lat_max, lon_mid], [lat_mid, lon_mid, lat_max, lon_max]]
+
+    def is_saturated(self, response):
+        return len(response.get('devices') or []) >= self.limit or len(response.get('webcams') or []) >= self.limit
+
+    def fetch(self, bounds):
+        """
+        Get mapBounds response of tile (from cache if it's still fresh)
+
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        :return: tuple (response JSON or exception, True if request was sent)
+        """
+        key = ('mapBounds', tuple(round(coordinate, 7) for coordinate in bounds), self.limit, self.lang)
+        response = self.cache.get(key)
+        if response is not None:
+            return response, False
+        try:
+            response = self.interface.map_bounds(list(bounds), self.limit, lang=self.lang)
+        except Exception as error:
+            return error, True
+        if type(response) == dict and response.get('errno', 200) in OK_CODES:
+            self.cache.put(key, response, self.ttl)
+        return response, True
+
+    def crawl(self, bounds):
+        """
+        Get all devices and webcams of region
+
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        :return: dict with devices, webcams (deduplicated by id), count of tiles, requests, failed tiles and truncated
+            tiles (bounds of tiles still saturated at max_depth, their items may be incomplete)
+        """
+        devices = {}
+        webcams = {}
+        answer = {"tiles": 0, "requests": 0, "failed": [], "truncated": []}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            pending = {executor.submit(self.fetch, bounds): (list(bounds), 0)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tile, depth = pending.pop(future)
+                    response, requested = future.result()
+                    answer['tiles'] += 1
+                    answer['requests'] += requested
+                    if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+                        answer['failed'].append({"bounds": tile, "error": response if type(response) == dict
+                                                 else str(response)})
+                        continue
+                    for device in response.get('devices') or []:
+                        devices.setdefault(device.get('id'), device)
+                    for webcam in response.get('webcams') or []:
+                        webcams.setdefault(webcam.get('id'), webcam)
+                    if not self.is_saturated(response):
+                        continue
+                    if depth >= self.max_depth:
+                        answer['truncated'].append(tile)
+                        continue
+                    for quadrant in self.split(tile):
+                        pending[executor.submit(self.fetch, quadrant)] = (quadrant, depth + 1)
+        answer.update({"devices": list(devices.values()), "webcams": list(webcams.values())})
+        return answer
@@ -0,0 +1,61 @@
+class NarodmonError(Exception):
+    description = 'Something nasty happened'
+
+    def __init__(self, errno, error=None, body=None, status_code=200):
+        """
+        Base error of narodmon response
+
+        :param errno: errno from response body (or HTTP status code if body is not JSON)
+        :param error: error text from response body
+        :param body: decoded response body
+        :param status_code: HTTP status code
+        """
+        self.errno = errno
+        self.error = error
+        self.body = body
+        self.status_code = status_code
+        super().__init__(f'Server response is {errno} == {self.description} | Original: \n{error}')
+
+
+class BadRequestError(NarodmonError):
+    description = 'Syntax error'
+
+
+class AuthRequiredError(NarodmonError):
+    description = 'Auth required'
+
+
+class ForbiddenError(NarodmonError):
+    description = 'Forbidden'
+
+
+class NotFoundError(NarodmonError):
+    description = 'Not found'
+
+
+class KeyBlockedError(NarodmonError):
+    description = 'API key blocked'
+
+
+class RateLimitedError(NarodmonError):
+    description = 'Too fast'
+
+
+class OfflineError(NarodmonError):
+    description = 'Offline'
+
+
+class MaintenanceError(NarodmonError):
+    description = 'Maintenance'
+
+
+ERRNO_EXCEPTIONS = {
+    400: BadRequestError,
+    401: AuthRequiredError,
+    403: ForbiddenError,
+    404: NotFoundError,
+    423: KeyBlockedError,
+    429: RateLimitedError,
+    434: OfflineError,
+    503: MaintenanceError
+}
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from narodmon.settings import deadband_dict
+from narodmon.tools import sensor_class
+
+
+class DeadbandFilter:
+    def __init__(self, deadbands=None, heartbeat=900, default=(0, 0)):
+        """
+        Change-only filter for sensors data: reading is dropped while it stays inside deadband of last sent value
+        of the same (mac, sensor id), but anyway sent after heartbeat seconds of silence.
+
+        :param deadbands: (optional) dict {class name or sensor id: (absolute, percent)}, overrides
+                          settings.deadband_dict
+        :param heartbeat: maximum silence interval in seconds
+        :param default: deadband for unknown sensors, (0, 0) drops only repeated values
+        """
+        self.deadbands = dict(deadband_dict)
+        if deadbands:
+            self.deadbands.update(deadbands)
+        self.heartbeat = heartbeat
+        self.default = default
+        self.last = {}
+        self.lock = threading.Lock()
+
+    def get_deadband(self, id_in):
+        """
+        Get deadband of sensor (by sensor id first, then by its class)
+
+        :param id_in: sensor ID
+        :return: tuple (absolute, percent)
+        """
+        if id_in in self.deadbands:
+            return self.deadbands[id_in]
+        return self.deadbands.get(sensor_class(id_in), self.default)
+
+    def is_changed(self, mac, sensor, now):
+        last = self.last.get((mac, sensor.get('id')))
+        if last is None:
+            return True
+        last_value, last_time = last
+        if sensor.get('time', now) - last_time >= self.heartbeat:
+            return True
+        try:
+            diff = abs(float(sensor['value']) - float(last_value))
+        except (TypeError, ValueError):
+            return sensor['value'] != last_value
+        absolute, percent = self.get_deadband(sensor.get('id'))
+        return diff > max(absolute, abs(float(last_value)) * percent / 100)
+
+    def apply(self, devices):
+        """
+        Drop readings which are not changed enough
+
+        :param devices: list of device data (dicts with mac and sensors)
+        :return: list of device data with changed readings only (devices without readings are dropped)
+        """
+        now = int(time.time())
+        filtered = []
+        with self.lock:
+            for device in devices:
+                sensors = [sensor for sensor in device['sensors'] if self.is_changed(device.get('mac'), sensor, now)]
+                if sensors:
+                    filtered.append(dict(device, sensors=sensors))
+        return filtered
+
+    def commit(self, devices):
+        """
+        Remember readings confirmed by server as last sent values
+
+        :param devices: list of device data (dicts with mac and sensors)
+        """
+        now = int(time.time())
+        with self.lock:
+            for device in devices:
+                for sensor in device['sensors']:
+                    self.last[(device.get('mac'), sensor.get('id'))] = (sensor['value'], sensor.get('time', now))
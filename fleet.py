@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from narodmon.tools import OK_CODES
+
+
+class Device:
+    __slots__ = ('mac', 'name', 'owner', 'lat', 'lon', 'alt')
+
+    def __init__(self, mac, name=None, owner=None, lat=None, lon=None, alt=None):
+        self.mac = mac
+        self.name = name
+        self.owner = owner
+        self.lat = lat
+        self.lon = lon
+        self.alt = alt
+
+
+class FleetManager:
+    def __init__(self, interface, max_devices=50, max_bytes=65536, concurrency=4):
+        """
+        Uploader for thousands of devices: packs pending sensors data of devices into bulk requests (shards)
+        limited by count of devices and payload size, and sends shards concurrently.
+
+        :param interface: InterfaceJSON used for upload
+        :param max_devices: maximum devices in one bulk request
+        :param max_bytes: maximum size of one bulk request body (estimated) in bytes
+        :param concurrency: maximum bulk requests sent at the same time
+        """
+        self.interface = interface
+        self.max_devices = max_devices
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.devices = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add_device(self, mac, name=None, owner=None, lat=None, lon=None, alt=None):
+        """
+        Add device or update its metadata
+
+        :param mac: mac address of device
+        :param name: (optional) name of device
+        :param owner: (optional) owner name of device
+        :param lat: (optional) latitude (float)
+        :param lon: (optional) longitude (float)
+        :param alt: (optional) altitude (float)
+        """
+        self.devices[mac] = Device(mac, name=name, owner=owner, lat=lat, lon=lon, alt=alt)
+
+    def remove_device(self, mac):
+        """
+        Remove device and its pending readings
+
+        :param mac: mac address of device
+        """
+        self.devices.pop(mac, None)
+        with self.lock:
+            self.pending.pop(mac, None)
+
+    def add(self, mac, sensors):
+        """
+        Add sensors data of device, it will be sent on next flush
+
+        :param mac: mac address of device
+        :param sensors: sensors list or one sensor data (dict)
+        """
+        if type(sensors) == dict:
+            sensors = [sensors]
+        with self.lock:
+            self.pending.setdefault(mac, []).extend(sensors)
+
+    def shards(self, pending):
+        """
+        Pack devices data into bulk requests, metadata is taken only from device record (device without metadata is
+        sent in short format)
+
+        :param pending: dict {mac: sensors list}
+        :return: list of device data lists
+        """
+        shards = []
+        shard = []
+        size = len('{"devices":[]}')
+        for mac, sensors in pending.items():
+            device = self.devices.get(mac) or Device(mac)
+            data = self.interface.prepare_device_data(sensors, mac=mac, name=device.name, owner=device.owner,
+                                                      lat=device.lat, lon=device.lon, alt=device.alt, defaults=False)
+            data_size = len(self.interface.encode_device(data)) + 1
+            if shard and (len(shard) >= self.max_devices or size + data_size > self.max_bytes):
+                shards.append(shard)
+                shard = []
+                size = len('{"devices":[]}')
+            shard.append(data)
+            size += data_size
+        if shard:
+            shards.append(shard)
+        return shards
+
+    def send_shard(self, shard):
+        try:
+            response = self.interface.send_payload({"devices": shard})
+        except Exception as error:
+            response = error
+        return shard, response
+
+    def flush(self):
+        """
+        Send all pending sensors data. Readings of shard which was not delivered (connection error, errno 429 or
+        5xx) are returned to pending and sent on next flush, readings rejected by server (other errno) are dropped.
+
+        :return: dict {mac: (success, response)}, response is response JSON of shard or exception
+        """
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+        results = {}
+        if not pending:
+            return results
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for shard, response in executor.map(self.send_shard, self.shards(pending)):
+                success = type(response) == dict and response.get('errno') in OK_CODES
+                for device in shard:
+                    results[device['mac']] = (success, response)
+                if not success and self.is_retryable(response):
+                    self.requeue({device['mac']: pending[device['mac']] for device in shard})
+        return results
+
+    @staticmethod
+    def is_retryable(response):
+        if type(response) != dict:
+            return True
+        errno = response.get('errno')
+        return errno == 429 or (type(errno) == int and errno >= 500)
+
+    def requeue(self, readings):
+        """
+        Return readings to pending (before readings added since flush started)
+
+        :param readings: dict {mac: sensors list}
+        """
+        with self.lock:
+            for mac, sensors in readings.items():
+                self.pending[mac] = list(sensors) + self.pending.get(mac, [])
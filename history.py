@@ -0,0 +1,269 @@
+import sqlite3
+import threading
+import time
+
+from narodmon.backfill import BackfillJob
+from narodmon.series import HistorySeries
+from narodmon.tools import OK_CODES
+
+PERIODS = {'hour': 3600, 'day': 86400, 'week': 604800, 'month': 2592000, 'year': 31536000}
+
+
+class HistoryStore:
+    def __init__(self, path, synchronous='NORMAL'):
+        """
+        Local store of sensors history (SQLite in WAL mode): points are deduplicated by time, covered time ranges
+        are remembered per sensor and period, so already synced windows are not requested again
+
+        :param path: path to store file
+        :param synchronous: SQLite synchronous mode, 'NORMAL' or 'FULL'
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(f'PRAGMA synchronous={synchronous}')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS points (id, period TEXT, time INTEGER, value REAL, '
+                                'PRIMARY KEY (id, period, time)) WITHOUT ROWID')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS coverage (id, period TEXT, start INTEGER, end INTEGER)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS coverage_sensor ON coverage (id, period)')
+
+    def add(self, id_in, period, points, start=None, end=None):
+        """
+        Store points and mark time range as covered in one transaction
+
+        :param id_in: sensor id
+        :param period: period of points, 'hour', 'day', 'week', 'month' or 'year'
+        :param points: list of dicts with time and value
+        :param start: (optional) start of covered range (utc timestamp)
+        :param end: (optional) end of covered range (utc timestamp)
+        :return: count of new points
+        """
+        rows = [(id_in, period, int(point['time']), point['value']) for point in points]
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN')
+            before = self.connection.total_changes
+            cursor.executemany('INSERT OR IGNORE INTO points (id, period, time, value) VALUES (?, ?, ?, ?)', rows)
+            added = self.connection.total_changes - before
+            if start is not None and end is not None:
+                ranges = self.merge(self.get_coverage(id_in, period) + [(start, end)])
+                cursor.execute('DELETE FROM coverage WHERE id = ? AND period = ?', (id_in, period))
+                cursor.executemany('INSERT INTO coverage (id, period, start, end) VALUES (?, ?, ?, ?)',
+                                   [(id_in, period, range_start, range_end) for range_start, range_end in ranges])
+            cursor.execute('COMMIT')
+        return added
+
+    @staticmethod
+    def merge(ranges):
+        """
+        Merge overlapping time ranges
+
+        :param ranges: list of (start, end) tuples
+        :return: sorted list of non-overlapping (start, end) tuples
+        """
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def get_coverage(self, id_in, period):
+        """
+        Get covered time ranges of sensor
+
+        :param id_in: sensor id
+        :param period: period of points
+        :return: sorted list of (start, end) tuples
+        """
+        with self.lock:
+            return [tuple(row) for row in self.connection.execute(
+                'SELECT start, end FROM coverage WHERE id = ? AND period = ? ORDER BY start', (id_in, period))]
+
+    def missing(self, id_in, period, start, end):
+        """
+        Get parts of time range which are not covered yet
+
+        :param id_in: sensor id
+        :param period: period of points
+        :param start: start of range (utc timestamp)
+        :param end: end of range (utc timestamp)
+        :return: list of (start, end) tuples
+        """
+        gaps = []
+        position = start
+        for range_start, range_end in self.get_coverage(id_in, period):
+            if range_end <= position:
+                continue
+            if range_start >= end:
+                break
+            if range_start > position:
+                gaps.append((position, range_start))
+            position = max(position, range_end)
+        if position < end:
+            gaps.append((position, end))
+        return gaps
+
+    def points(self, id_in, period, start=None, end=None):
+        """
+        Get stored points of sensor in time range
+
+        :param id_in: sensor id
+        :param period: period of points
+        :param start: (optional) start of range (utc timestamp)
+        :param end: (optional) end of range (utc timestamp)
+        :return: list of (time, value) tuples sorted by time
+        """
+        with self.lock:
+            return self.connection.execute('SELECT time, value FROM points WHERE id = ? AND period = ? AND time >= ? '
+                                           'AND time <= ? ORDER BY time',
+                                           (id_in, period, start if start is not None else -2 ** 63,
+                                            end if end is not None else 2 ** 63 - 1)).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class HistorySync:
+    def __init__(self, interface, store, min_gap=60, api_key=None, uuid=None, archive=None):
+        """
+        Incremental sync of sensors history into local store: only windows (period, offset) which are missing or
+        incomplete in store are requested. Window of offset N is treated as N period lengths back from now.
+
+        :param interface: InterfaceAPI used for requests
+        :param store: HistoryStore
+        :param min_gap: uncovered parts shorter than this value (seconds) are not requested
+        :param api_key: (optional) api key provided by narodmon
+        :param uuid: (optional) unique identifier MD5 hash
+        :param archive: (optional) HistoryArchive, fetched points are appended to it too
+        """
+        self.interface = interface
+        self.store = store
+        self.min_gap = min_gap
+        self.api_key = api_key
+        self.uuid = uuid
+        self.archive = archive
+
+    @staticmethod
+    def windows(period, start, end, now=None):
+        """
+        Get windows of period which cover time range
+
+        :param period: 'hour', 'day', 'week', 'month' or 'year'
+        :param start: start of range (utc timestamp)
+        :param end: end of range (utc timestamp)
+        :param now: (optional) current time
+        :return: list of (offset, window start, window end) tuples, newest first
+        """
+        now = int(now if now is not None else time.time())
+        length = PERIODS[period]
+        first = max(0, (now - min(end, now)) // length)
+        last = max(0, (now - start - 1) // length)
+        return [(offset, now - (offset + 1) * length, now - offset * length) for offset in range(first, last + 1)]
+
+    def missing_windows(self, id_in, period, start, end, now=None):
+        """
+        Get windows which are not synced yet (or synced before their end, i.e. current window)
+
+        :param id_in: sensor id
+        :param period: period of history
+        :param start: start of range (utc timestamp)
+        :param end: end of range (utc timestamp)
+        :param now: (optional) current time
+        :return: list of (offset, window start, window end) tuples
+        """
+        answer = []
+        for offset, window_start, window_end in self.windows(period, start, end, now=now):
+            gaps = self.store.missing(id_in, period, max(window_start, start), min(window_end, end))
+            if any(gap_end - gap_start >= self.min_gap for gap_start, gap_end in gaps):
+                answer.append((offset, window_start, window_end))
+        return answer
+
+    def fetch(self, id_in, period, offset):
+        """
+        Request one window and store its points (ids are compared as strings), window is not marked as covered
+        if response has only points of other sensors
+
+        :param id_in: sensor id
+        :param period: period of history
+        :param offset: offset of window
+        :return: tuple (count of new points, response JSON)
+        """
+        now = int(time.time())
+        response = self.interface.sensors_history(id_in, period, offset, api_key=self.api_key, uuid=self.uuid)
+        if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+            return 0, response
+        length = PERIODS[period]
+        data = response.get('data') or []
+        points = [point for point in data if str(point.get('id', id_in)) == str(id_in)]
+        if data and not points:
+            return 0, response
+        if self.archive is not None:
+            self.archive.append(id_in, period, points)
+        return self.store.add(id_in, period, points, now - (offset + 1) * length, now - offset * length), response
+
+    def sync(self, id_in, period, start=None, end=None):
+        """
+        Fetch missing windows of time range
+
+        :param id_in: sensor id
+        :param period: period of history
+        :param start: (optional) start of range (utc timestamp), by default - one period back
+        :param end: (optional) end of range (utc timestamp), by default - now
+        :return: count of new points
+        """
+        end = end if end is not None else int(time.time())
+        start = start if start is not None else end - PERIODS[period]
+        added = 0
+        for offset, _, _ in self.missing_windows(id_in, period, start, end):
+            count, response = self.fetch(id_in, period, offset)
+            if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+                break
+            added += count
+        return added
+
+    def history(self, id_in, period, start=None, end=None):
+        """
+        Get history of time range from local store, missing windows are synced first
+
+        :param id_in: sensor id
+        :param period: period of history
+        :param start: (optional) start of range (utc timestamp), by default - one period back
+        :param end: (optional) end of range (utc timestamp), by default - now
+        :return: list of (time, value) tuples sorted by time
+        """
+        end = end if end is not None else int(time.time())
+        start = start if start is not None else end - PERIODS[period]
+        self.sync(id_in, period, start, end)
+        return self.store.points(id_in, period, start, end)
+
+    def series(self, id_in, period, start=None, end=None):
+        """
+        Get history of time range from local store as HistorySeries, missing windows are synced first
+
+        :param id_in: sensor id
+        :param period: period of history
+        :param start: (optional) start of range (utc timestamp), by default - one period back
+        :param end: (optional) end of range (utc timestamp), by default - now
+        :return: HistorySeries
+        """
+        return HistorySeries.from_points(self.history(id_in, period, start=start, end=end), id_in=id_in)
+
+    def backfill(self, ids, period, start, end=None, checkpoint=None, concurrency=4, on_progress=None):
+        """
+        Create parallel resumable backfill job of several sensors
+
+        :param ids: sensor id's
+        :param period: 'hour', 'day', 'week', 'month' or 'year'
+        :param start: start of range (utc timestamp)
+        :param end: (optional) end of range (utc timestamp), by default - now
+        :param checkpoint: (optional) path to JSON checkpoint file
+        :param concurrency: maximum requests sent at the same time
+        :param on_progress: (optional) callback(progress dict) called after each task
+        :return: BackfillJob
+        """
+        return BackfillJob(self, ids, period, start, end=end, checkpoint=checkpoint, concurrency=concurrency,
+                           on_progress=on_progress)
@@ -1,12 +1,23 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
 
-from narodmon.tools import status_decode, generate_hash
-from narodmon.settings import BASE_API_URL
+from narodmon.catalog import Catalog
+from narodmon.crawler import MapCrawler
+from narodmon.history import HistorySync
+from narodmon.series import HistorySeries
+from narodmon.tools import status_decode, generate_hash, encode_json, OK_CODES
+from narodmon.settings import BASE_API_URL, MAX_SENSORS_VALUES
+from narodmon.transport import Transport
+from narodmon.webcams import WebcamDownloader
 
 
 class InterfaceAPI:
-    def __init__(self, uuid, api_key, lang, lat=None, lon=None):
+    def __init__(self, uuid, api_key, lang, lat=None, lon=None, transport=None, raise_errors=False, cache=None):
         self.endpoint = f'{BASE_API_URL}/api'
+        self.transport = transport if transport else Transport()
+        self.raise_errors = raise_errors
+        self.cache = cache
+        self.headers = {'Content-Type': 'application/json'}
+        self.envelopes = {}
         self.uuid = uuid,
         self.api_key = api_key
         self.lang = lang
@@ -49,6 +60,13 @@ class InterfaceAPI:
         """
         self.lon = lon
 
+    def set_cache(self, cache):
+        """
+        Set/update read-through cache of sensorsValues, sensorsOnDevice and webcamsNearby responses
+        :param cache: ResponseCache or None to disable
+        """
+        self.cache = cache
+
     def prepare_default_payload(self, uuid=None, api_key=None, lang=None, ignore_lang=False):
         """
         Generate dict with default payload (uuid, api key should be transmitted in every and each request).
@@ -70,15 +88,86 @@ class InterfaceAPI:
             payload.update({"lang": lang})
         return payload
 
+    @staticmethod
+    def request_keys(payload):
+        """
+        Get rate limiter keys of request: command and api key (or uuid if no api key)
+        :param payload: payload in json format
+        :return: list of (scope, name) tuples
+        """
+        key = payload.get('api_key') or payload.get('uuid')
+        return [('endpoint', payload.get('cmd')), ('key', key if type(key) != list else tuple(key))]
+
+    def encode_payload(self, payload):
+        """
+        Serialize payload into bytes. Envelope (uuid, api key, language) is encoded once for each its values and
+        reused, only command params are encoded on every request
+        :param payload: payload in json format
+        :return: bytes
+        """
+        envelope_keys = [key for key in ('uuid', 'api_key', 'lang') if key in payload]
+        key = tuple((name, payload[name]) for name in envelope_keys)
+        try:
+            envelope = self.envelopes.get(key)
+        except TypeError:
+            key = envelope = None
+        if envelope is None:
+            envelope = encode_json({name: payload[name] for name in envelope_keys})[1:-1]
+            if key is not None and len(self.envelopes) < 64:
+                self.envelopes[key] = envelope
+        params = encode_json({name: value for name, value in payload.items() if name not in envelope_keys})[1:-1]
+        return b'{' + b','.join(part for part in (envelope, params) if part) + b'}'
+
     def send_post_request(self, payload):
         """
         Send post request and check it response
         :param payload: payload in json format
         :return: response JSON
         """
-        response = requests.post(url=self.endpoint, json=payload)
-        status_decode(response)
-        return response.json()
+        response = self.transport.post(self.endpoint, data=self.encode_payload(payload), headers=self.headers,
+                                       keys=self.request_keys(payload))
+        return status_decode(response, raise_errors=self.raise_errors)
+
+    @staticmethod
+    def cache_key(payload, exclude=()):
+        """
+        Get cache key of request: all params of payload (except excluded)
+        :param payload: payload in json format
+        :param exclude: names of params to skip
+        :return: tuple
+        """
+        return tuple(sorted((name, repr(value)) for name, value in payload.items() if name not in exclude))
+
+    def send_cached_request(self, payload, kind, items_name):
+        """
+        Send post request if its response is not cached or not fresh already
+        :param payload: payload in json format
+        :param kind: kind of items in response, i.e. 'sensor' or 'webcam'
+        :param items_name: name of items list in response, i.e. 'sensors' or 'webcams'
+        :return: response JSON
+        """
+        if self.cache is None:
+            return self.send_post_request(payload)
+        key = self.cache_key(payload)
+        response = self.cache.get(key)
+        if response is not None:
+            return response
+        return self.cache.store(key, kind, items_name, self.send_post_request(payload))
+
+    def send_values_request(self, payload):
+        """
+        Send sensorsValues request only for sensors which are not cached or not fresh already
+        :param payload: payload in json format
+        :return: response JSON with all requested sensors
+        """
+        if self.cache is None:
+            return self.send_post_request(payload)
+        scope = self.cache_key(payload, exclude=('sensors',))
+        cached, stale = self.cache.split_sensors(scope, payload['sensors'])
+        if not stale:
+            return self.cache.merge_sensors(scope, payload['sensors'], cached, {"sensors": []})
+        return self.cache.merge_sensors(scope, payload['sensors'], cached,
+                                        self.send_post_request(dict(payload, sensors=stale)))
 
     def app_init(self, lang=None, version=None, platform=None, model=None, width=None, utc=None, api_key=None,
                  uuid=None):
@@ -134,6 +223,17 @@ class InterfaceAPI:
 
         return self.send_post_request(payload)
 
+    def catalog(self, path, max_age=86400, lang=None, check_interval=600):
+        """
+        Create appInit catalog (sensor types, favorites) cached in file shared by processes of host
+        :param path: path to cache file
+        :param max_age: maximum age of cached response in seconds (by default - one day)
+        :param lang: (optional) language, string, possible values are: "ru","en","uk"
+        :param check_interval: how often (seconds) background thread checks age of cache
+        :return: Catalog
+        """
+        return Catalog(self, path, max_age=max_age, lang=lang, check_interval=check_interval)
+
     def map_bounds(self, bounds, limit, lang=None, api_key=None, uuid=None):
         """
         Запрос списка датчиков и веб-камер в указанной прямоугольной области карты
@@ -173,6 +273,33 @@ class InterfaceAPI:
         payload.update({"bounds": bounds, "limit": limit, "lang": lang})
         return self.send_post_request(payload)
 
+    def map_crawler(self, limit=50, max_depth=8, concurrency=4, ttl=600, cache=None, lang=None):
+        """
+        Create crawler of all devices and webcams in region (saturated mapBounds tiles are split into quadrants)
+        :param limit: limit of items in one mapBounds response (max 50)
+        :param max_depth: maximum count of tile splits
+        :param concurrency: maximum requests sent at the same time
+        :param ttl: lifetime of tile response in cache (seconds)
+        :param cache: (optional) ResponseCache for tile responses, by default - own cache
+        :param lang: (optional) language, string, possible values are: "ru","en","uk"
+        :return: MapCrawler
+        """
+        return MapCrawler(self, limit=limit, max_depth=max_depth, concurrency=concurrency, ttl=ttl, cache=cache,
+                          lang=lang)
+
+    def webcam_downloader(self, path, concurrency=8, keep=100, chunk_size=65536, max_attempts=3):
+        """
+        Create downloader of webcam snapshots (streamed by chunks, stored by content hash, resumable)
+        :param path: directory of storage
+        :param concurrency: maximum downloads at the same time
+        :param keep: maximum snapshots kept for each camera, None - keep all
+        :param chunk_size: size of chunk read from connection (bytes)
+        :param max_attempts: attempts to download image (next attempt continues partial file)
+        :return: WebcamDownloader
+        """
+        return WebcamDownloader(self, path, concurrency=concurrency, keep=keep, chunk_size=chunk_size,
+                                max_attempts=max_attempts)
+
     def sensors_nearby(self, lang=None, lat=None, lon=None, my=None, pub=None, radius=None, limit=None, types=None,
                        trends=None, uuid=None, api_key=None):
         """
@@ -300,7 +427,7 @@ class InterfaceAPI:
             payload.update({"trends": trends})
         if info:
             payload.update({"trends": info})
-        return self.send_post_request(payload)
+        return self.send_cached_request(payload, 'sensor', 'sensors')
 
     def sensors_values(self, sensors, trends=None, api_key=None, uuid=None):
         """
@@ -331,7 +458,70 @@ class InterfaceAPI:
         payload.update(self.prepare_default_payload(uuid=uuid, api_key=api_key, ignore_lang=True))
         if trends:
             payload.update({"trends": trends})
-        return self.send_post_request(payload)
+        return self.send_values_request(payload)
+
+    def sensors_values_many(self, sensors, trends=None, chunk_size=MAX_SENSORS_VALUES, concurrency=4, api_key=None,
+                            uuid=None):
+        """
+        Get values of any count of sensors: sensor id's are split into chunks allowed by server, chunks are requested
+        concurrently (rate limits of transport are applied to each request)
+        :param sensors: array with sensor id's [id1, id2 ..]
+        :param trends: if == 1 then trending data will be selected
+        :param chunk_size: maximum sensors in one request
+        :param concurrency: maximum requests sent at the same time
+        :param api_key: (optional) api key provided by narodmon
+        :param uuid: (optional) unique identifier MD5 hash
+        :return: dict with errno (200 if all chunks succeeded, otherwise errno of first failed chunk),
+                 sensors {id: sensor data} and failed [{"sensors": chunk, "errno": errno, "error": error}]
+        """
+        chunks = self.split_chunks(sensors, chunk_size)
+
+        def request(chunk):
+            try:
+                return self.sensors_values(chunk, trends=trends, api_key=api_key, uuid=uuid)
+            except Exception as error:
+                return error
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(request, chunks))
+        return self.merge_sensors_values(chunks, responses)
+
+    @staticmethod
+    def split_chunks(items, size):
+        """
+        Split list into chunks
+        :param items: list
+        :param size: maximum length of chunk
+        :return: list of lists
+        """
+        items = list(items)
+        return [items[index:index + size] for index in range(0, len(items), size)]
+
+    @staticmethod
+    def merge_sensors_values(chunks, responses):
+        """
+        Merge sensorsValues responses of chunks into one response keyed by sensor id as it was requested (i.e. '123' if
+        string id was requested, server responds integer id)
+        :param chunks: list of sensor id's chunks
+        :param responses: response JSON (or raised exception) of each chunk
+        :return: dict with errno, sensors {id: sensor data} and failed chunks list
+        """
+        answer = {"errno": 200, "sensors": {}, "failed": []}
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, Exception):
+                answer['failed'].append({"sensors": chunk, "errno": getattr(response, 'errno', None),
+                                         "error": str(response)})
+            elif type(response) != dict or response.get('errno', 200) not in OK_CODES:
+                answer['failed'].append({"sensors": chunk,
+                                         "errno": response.get('errno') if type(response) == dict else None,
+                                         "error": response.get('error') if type(response) == dict else response})
+            else:
+                requested = {str(id_in): id_in for id_in in chunk}
+                for sensor in response.get('sensors', []):
+                    answer['sensors'][requested.get(str(sensor['id']), sensor['id'])] = sensor
+        if answer['failed']:
+            answer['errno'] = answer['failed'][0]['errno']
+        return answer
 
     def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
         """
@@ -365,6 +555,34 @@ class InterfaceAPI:
         payload.update(self.prepare_default_payload(uuid=uuid, api_key=api_key, ignore_lang=True))
         return self.send_post_request(payload)
 
+    def sensors_history_series(self, id_in, period, offset, api_key=None, uuid=None):
+        """
+        Get sensor history as HistorySeries (time and value arrays with resample, rolling statistics and trend)
+        :param id_in: id of sensor
+        :param period: type of period, may be 'hour','day','week','month','year'
+        :param offset: offset back in history (depend on period type) (int)
+        :param api_key: (optional) api key provided by narodmon
+        :param uuid: (optional) unique identifier MD5 hash
+        :return: HistorySeries, response JSON if request failed
+        """
+        return self.to_series(self.sensors_history(id_in, period, offset, api_key=api_key, uuid=uuid), id_in)
+
+    @staticmethod
+    def to_series(response, id_in):
+        if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+            return response
+        return HistorySeries.from_response(response, id_in=id_in)
+
+    def history_sync(self, store, min_gap=60, archive=None):
+        """
+        Create incremental sync of sensors history into local store, only missing windows will be requested
+        :param store: HistoryStore
+        :param min_gap: uncovered parts shorter than this value (seconds) are not requested
+        :param archive: (optional) HistoryArchive, fetched points are appended to it too
+        :return: HistorySync
+        """
+        return HistorySync(self, store, min_gap=min_gap, archive=archive)
+
     def name_sensor(self, id_in, name=None, api_key=None, uuid=None):
         """
         Смена имени датчика (для владельца) или создание алиаса для остальных
@@ -433,7 +651,7 @@ class InterfaceAPI:
             payload.update({"radius": radius})
         if width:
             payload.update({"width": width})
-        return self.send_post_request(payload)
+        return self.send_cached_request(payload, 'webcam', 'webcams')
 
     def webcam_images(self, id_in, limit=None, since=None, latest=None, width=None, uuid=None, api_key=None):
         """
@@ -0,0 +1,295 @@
+import asyncio
+from sys import stderr
+
+from narodmon.interface_api import InterfaceAPI
+from narodmon.interface_json import InterfaceJSON
+from narodmon.settings import MAX_SENSORS_VALUES
+from narodmon.tools import status_decode, OK_CODES
+from narodmon.transport import AsyncTransport
+
+
+def sync_only(name, interface):
+    """
+    Create error for helper which calls interface from plain threads, so it can't be used with coroutines
+
+    :param name: name of factory method
+    :param interface: name of sync interface of Narodmon
+    :return: TypeError
+    """
+    return TypeError(f'{name} works only with sync interface, use Narodmon.{interface}.{name} instead')
+
+
+class AsyncInterfaceAPI(InterfaceAPI):
+    def __init__(self, uuid, api_key, lang, lat=None, lon=None, transport=None, raise_errors=False, cache=None):
+        """
+        asyncio version of InterfaceAPI: every command is coroutine with the same params and payload
+
+        :param transport: (optional) AsyncTransport, may be shared with AsyncInterfaceJSON
+        """
+        super().__init__(uuid=uuid, api_key=api_key, lang=lang, lat=lat, lon=lon,
+                         transport=transport if transport else AsyncTransport(), raise_errors=raise_errors,
+                         cache=cache)
+
+    async def send_post_request(self, payload):
+        """
+        Send post request and check it response
+        :param payload: payload in json format
+        :return: response JSON
+        """
+        response = await self.transport.post(self.endpoint, data=self.encode_payload(payload), headers=self.headers,
+                                             keys=self.request_keys(payload))
+        return status_decode(response, raise_errors=self.raise_errors)
+
+    async def send_cached_request(self, payload, kind, items_name):
+        if self.cache is None:
+            return await self.send_post_request(payload)
+        key = self.cache_key(payload)
+        response = self.cache.get(key)
+        if response is not None:
+            return response
+        return self.cache.store(key, kind, items_name, await self.send_post_request(payload))
+
+    async def send_values_request(self, payload):
+        if self.cache is None:
+            return await self.send_post_request(payload)
+        scope = self.cache_key(payload, exclude=('sensors',))
+        cached, stale = self.cache.split_sensors(scope, payload['sensors'])
+        if not stale:
+            return self.cache.merge_sensors(scope, payload['sensors'], cached, {"sensors": []})
+        return self.cache.merge_sensors(scope, payload['sensors'], cached,
+                                        await self.send_post_request(dict(payload, sensors=stale)))
+
+    def catalog(self, *args, **kwargs):
+        raise sync_only('catalog', 'via_api')
+
+    def map_crawler(self, *args, **kwargs):
+        raise sync_only('map_crawler', 'via_api')
+
+    def webcam_downloader(self, *args, **kwargs):
+        raise sync_only('webcam_downloader', 'via_api')
+
+    def history_sync(self, *args, **kwargs):
+        raise sync_only('history_sync', 'via_api')
+
+    async def app_init(self, lang=None, version=None, platform=None, model=None, width=None, utc=None, api_key=None,
+                       uuid=None):
+        return await super().app_init(lang=lang, version=version, platform=platform, model=model, width=width,
+                                      utc=utc, api_key=api_key, uuid=uuid)
+
+    async def map_bounds(self, bounds, limit, lang=None, api_key=None, uuid=None):
+        return await super().map_bounds(bounds, limit, lang=lang, api_key=api_key, uuid=uuid)
+
+    async def sensors_nearby(self, lang=None, lat=None, lon=None, my=None, pub=None, radius=None, limit=None,
+                             types=None, trends=None, uuid=None, api_key=None):
+        return await super().sensors_nearby(lang=lang, lat=lat, lon=lon, my=my, pub=pub, radius=radius, limit=limit,
+                                            types=types, trends=trends, uuid=uuid, api_key=api_key)
+
+    async def sensors_on_device(self, id_in, trends=None, info=None, api_key=None, uuid=None, lang=None):
+        return await super().sensors_on_device(id_in, trends=trends, info=info, api_key=api_key, uuid=uuid,
+                                               lang=lang)
+
+    async def sensors_values(self, sensors, trends=None, api_key=None, uuid=None):
+        return await super().sensors_values(sensors, trends=trends, api_key=api_key, uuid=uuid)
+
+    async def sensors_values_many(self, sensors, trends=None, chunk_size=MAX_SENSORS_VALUES, concurrency=4,
+                                  api_key=None, uuid=None):
+        chunks = self.split_chunks(sensors, chunk_size)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(chunk):
+            async with semaphore:
+                try:
+                    return await self.sensors_values(chunk, trends=trends, api_key=api_key, uuid=uuid)
+                except Exception as error:
+                    return error
+
+        responses = await asyncio.gather(*(request(chunk) for chunk in chunks))
+        return self.merge_sensors_values(chunks, responses)
+
+    async def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
+        return await super().sensors_history(id_in, period, offset, api_key=api_key, uuid=uuid)
+
+    async def sensors_history_series(self, id_in, period, offset, api_key=None, uuid=None):
+        return self.to_series(await self.sensors_history(id_in, period, offset, api_key=api_key, uuid=uuid), id_in)
+
+    async def name_sensor(self, id_in, name=None, api_key=None, uuid=None):
+        return await super().name_sensor(id_in, name=name, api_key=api_key, uuid=uuid)
+
+    async def webcams_nearby(self, lat=None, lon=None, limit=None, radius=None, width=None,
+                             lang=None, api_key=None, uuid=None):
+        return await super().webcams_nearby(lat=lat, lon=lon, limit=limit, radius=radius, width=width,
+                                            lang=lang, api_key=api_key, uuid=uuid)
+
+    async def webcam_images(self, id_in, limit=None, since=None, latest=None, width=None, uuid=None, api_key=None):
+        return await super().webcam_images(id_in, limit=limit, since=since, latest=latest, width=width, uuid=uuid,
+                                           api_key=api_key)
+
+    async def user_logon(self, login, hash, lang=None, api_key=None, uuid=None):
+        return await super().user_logon(login, hash, lang=lang, api_key=api_key, uuid=uuid)
+
+    async def username(self, api_key=None, uuid=None, lang=None):
+        payload = {"cmd": "userLogon"}
+        payload.update(self.prepare_default_payload(uuid=uuid, api_key=api_key, lang=lang))
+        response = await self.send_post_request(payload)
+        return response['login']
+
+    async def register_user(self, login, api_key=None, uuid=None, lang=None):
+        return await super().register_user(login, api_key=api_key, uuid=uuid, lang=lang)
+
+    async def user_location(self, lat=None, lon=None, addr=None, wifi=None, cells=None, gui=None,
+                            lang=None, api_key=None, uuid=None):
+        return await super().user_location(lat=lat, lon=lon, addr=addr, wifi=wifi, cells=cells, gui=gui,
+                                           lang=lang, api_key=api_key, uuid=uuid)
+
+    async def user_favorites(self, sensors=None, webcams=None, lang=None, api_key=None, uuid=None):
+        return await super().user_favorites(sensors=sensors, webcams=webcams, lang=lang, api_key=api_key, uuid=uuid)
+
+    async def user_logout(self, api_key=None, uuid=None):
+        return await super().user_logout(api_key=api_key, uuid=uuid)
+
+    async def add_like(self, id_in, api_key=None, uuid=None):
+        return await super().add_like(id_in, api_key=api_key, uuid=uuid)
+
+    async def dis_like(self, id_in, api_key=None, uuid=None):
+        return await super().dis_like(id_in, api_key=api_key, uuid=uuid)
+
+    async def set_push_token(self, token, api_key=None, uuid=None):
+        return await super().set_push_token(token, api_key=api_key, uuid=uuid)
+
+    async def set_push_uri(self, uri, api_key=None, uuid=None):
+        return await super().set_push_uri(uri, api_key=api_key, uuid=uuid)
+
+    async def set_push_status(self, states, api_key=None, uuid=None):
+        return await super().set_push_status(states, api_key=api_key, uuid=uuid)
+
+    async def send_command(self, id_in, command, api_key=None, uuid=None):
+        return await super().send_command(id_in, command, api_key=api_key, uuid=uuid)
+
+    async def send_complaint(self, id_in, problem_time, name, email, problem, value, api_key=None, uuid=None):
+        return await super().send_complaint(id_in, problem_time, name, email, problem, value, api_key=api_key,
+                                            uuid=uuid)
+
+    async def send_message(self, subj, mess, uid=None, name=None, chat=None, email=None, images=None,
+                           api_key=None, uuid=None):
+        return await super().send_message(subj, mess, uid=uid, name=name, chat=chat, email=email, images=images,
+                                          api_key=api_key, uuid=uuid)
+
+    async def weather_report(self, lat=None, lon=None, temp=None, humid=None, press=None, wind=None,
+                             lang=None, api_key=None, uuid=None):
+        return await super().weather_report(lat=lat, lon=lon, temp=temp, humid=humid, press=press, wind=wind,
+                                            lang=lang, api_key=api_key, uuid=uuid)
+
+    async def bug_report(self, time=None, name=None, email=None, mess=None, logs=None, images=None, api_key=None,
+                         uuid=None):
+        return await super().bug_report(time=time, name=name, email=email, mess=mess, logs=logs, images=images,
+                                        api_key=api_key, uuid=uuid)
+
+    async def get_help(self, topic=None, lang=None, api_key=None, uuid=None):
+        return await super().get_help(topic=topic, lang=lang, api_key=api_key, uuid=uuid)
+
+
+class AsyncInterfaceJSON(InterfaceJSON):
+    def __init__(self, mac=None, name=None, owner=None, lat=None, lon=None, alt=None, transport=None,
+                 raise_errors=False, spool=None, deadband=None, registry=None, aggregator=None, classifier=None):
+        """
+        asyncio version of InterfaceJSON: every send method is coroutine with the same params and payload
+
+        :param transport: (optional) AsyncTransport, may be shared with AsyncInterfaceAPI
+        """
+        super().__init__(mac=mac, name=name, owner=owner, lat=lat, lon=lon, alt=alt,
+                         transport=transport if transport else AsyncTransport(), raise_errors=raise_errors,
+                         spool=spool, deadband=deadband, registry=registry, aggregator=aggregator,
+                         classifier=classifier)
+
+    def batch_uploader(self, *args, **kwargs):
+        raise sync_only('batch_uploader', 'via_json')
+
+    def fleet_manager(self, *args, **kwargs):
+        raise sync_only('fleet_manager', 'via_json')
+
+    async def send_payload(self, payload, aggregate=True):
+        """
+        Send prepared payload to json endpoint and check it response.
+        If aggregator is set, samples are collected and only readings of closed windows are sent.
+        If deadband filter is set, unchanged readings are dropped first.
+        If spool is set, payload is stored first and removed only after server confirmed it.
+
+        :param payload: dict with devices list
+        :param aggregate: if False - payload is not passed through aggregator (already aggregated)
+        :return: response JSON
+        """
+        payload, seqs = self.before_send(payload, aggregate=aggregate)
+        if payload is None:
+            return {"errno": 200, "error": "Nothing to send, aggregated or filtered by deadband"}
+        response = await self.post_payload(payload)
+        self.after_send(payload, seqs, response)
+        return response
+
+    async def flush_aggregator(self, force=False):
+        if self.aggregator is None:
+            return None
+        closed = self.aggregator.flush(force=force)
+        if not closed:
+            return None
+        return await self.send_payload({"devices": [{"mac": mac, "sensors": sensors}
+                                                    for mac, sensors in closed.items()]}, aggregate=False)
+
+    async def replay_spool(self, max_readings=1000):
+        """
+        Send readings stored in spool as bulk requests (with original measurement time)
+
+        :param max_readings: maximum readings in one bulk request
+        :return: count of confirmed readings
+        """
+        confirmed = 0
+        while self.spool is not None:
+            seqs, devices = self.spool.peek(max_readings)
+            if not seqs:
+                break
+            response = await self.post_payload({"devices": devices})
+            if type(response) != dict or response.get('errno') not in OK_CODES:
+                break
+            self.spool.remove(seqs)
+            confirmed += len(seqs)
+        return confirmed
+
+    async def post_payload(self, payload):
+        """
+        Send payload to json endpoint and check it response
+
+        :param payload: dict with devices list
+        :return: response JSON
+        """
+        response = await self.transport.post(self.endpoint, headers=self.headers, keys=self.request_keys(payload),
+                                             **self.request_body(payload))
+        return status_decode(response, raise_errors=self.raise_errors)
+
+    async def send_bulk_data(self, data):
+        if type(data) == list:
+            return await super().send_bulk_data(data)
+        else:
+            stderr.write("Narodmon sensors data is wrong!")
+            return ''
+
+    async def send_bulk_arrays(self, macs, ids=None, values=None, times=None, units=None, decimals=None):
+        devices = self.prepare_bulk_arrays(macs, ids=ids, values=values, times=times, units=units, decimals=decimals)
+        if not devices:
+            return {"errno": 200, "error": "Nothing to send"}
+        return await self.send_bulk_data(devices)
+
+    async def send_full_data(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None):
+        payload = {"devices": [self.prepare_device_data_full(sensors=sensors, mac=mac, name=name, owner=owner,
+                                                             lat=lat, lon=lon, alt=alt)]}
+        return await self.send_payload(payload)
+
+    async def send_short_data(self, sensors, mac=None):
+        device = self.prepare_device_data_short(sensors, mac=mac)
+        if not device:
+            return ''
+        return await self.send_payload(device)
+
+    async def send_data(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None):
+        device = self.prepare_device_data(sensors, mac=mac, name=name, owner=owner, lat=lat, lon=lon, alt=alt)
+        if not device:
+            return ''
+        return await self.send_payload({"devices": [device]})
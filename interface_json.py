@@ -1,15 +1,27 @@
 from sys import stderr
 
-import requests
-
-from narodmon.tools import status_decode
+from narodmon.batching import BatchUploader
+from narodmon.fleet import FleetManager
+from narodmon.registry import DeviceRegistry
+from narodmon.sensor_batch import SensorBatch, group_by_mac
+from narodmon.tools import status_decode, encode_json, OK_CODES
 from narodmon.settings import BASE_API_URL
+from narodmon.transport import Transport
 
 
 class InterfaceJSON:
-    def __init__(self, mac=None, name=None, owner=None, lat=None, lon=None, alt=None):
+    def __init__(self, mac=None, name=None, owner=None, lat=None, lon=None, alt=None, transport=None,
+                 raise_errors=False, spool=None, deadband=None, registry=None, aggregator=None, classifier=None):
         self.endpoint = f'{BASE_API_URL}/json'
+        self.transport = transport if transport else Transport()
+        self.raise_errors = raise_errors
+        self.spool = spool
+        self.deadband = deadband
+        self.aggregator = aggregator
+        self.classifier = classifier
+        self.registry = registry if registry is not None else DeviceRegistry()
         self.headers = {'Content-type': 'application/x-www-form-urlencoded'}
+        self.device_headers = {}
         self.name = name
         self.mac = mac
         self.owner = owner
@@ -59,6 +71,246 @@ class InterfaceJSON:
         """
         self.alt = alt
 
+    def set_spool(self, spool):
+        """
+        Set/update durable spool, all uploads will be stored in it until server confirms them
+        :param spool: Spool or None to disable
+        """
+        self.spool = spool
+
+    def set_registry(self, registry):
+        """
+        Set/update registry of devices, used to choose full or short data format
+        :param registry: DeviceRegistry
+        """
+        self.registry = registry
+
+    def set_deadband(self, deadband):
+        """
+        Set/update change-only filter, unchanged readings will not be sent
+        :param deadband: DeadbandFilter or None to disable
+        """
+        self.deadband = deadband
+
+    def set_aggregator(self, aggregator):
+        """
+        Set/update aggregation windows, samples will be sent as one reading per sensor per window
+        :param aggregator: Aggregator or None to disable
+        """
+        self.aggregator = aggregator
+
+    def set_classifier(self, classifier):
+        """
+        Set/update sensor classifier, readings without unit will be sent with default unit of sensor class
+        :param classifier: SensorClassifier or None to disable
+        """
+        self.classifier = classifier
+
+    @staticmethod
+    def iter_devices(payload):
+        """
+        Iterate over device data in payload (including nested short format)
+
+        :param payload: dict with devices list
+        :return: generator of device data dicts
+        """
+        devices = list(reversed(payload.get('devices', [])))
+        while devices:
+            device = devices.pop()
+            if 'devices' in device:
+                devices.extend(reversed(device['devices']))
+            else:
+                yield device
+
+    @classmethod
+    def request_keys(cls, payload):
+        """
+        Get rate limiter keys of request: json endpoint and mac of each device in payload
+
+        :param payload: dict with devices list
+        :return: list of (scope, name) tuples
+        """
+        return [('endpoint', 'json')] + [('mac', device.get('mac')) for device in cls.iter_devices(payload)]
+
+    def send_payload(self, payload, aggregate=True):
+        """
+        Send prepared payload to json endpoint and check it response.
+        If aggregator is set, samples are collected and only readings of closed windows are sent.
+        If deadband filter is set, unchanged readings are dropped first.
+        If spool is set, payload is stored first and removed only after server confirmed it.
+
+        :param payload: dict with devices list
+        :param aggregate: if False - payload is not passed through aggregator (already aggregated)
+        :return: response JSON
+        """
+        payload, seqs = self.before_send(payload, aggregate=aggregate)
+        if payload is None:
+            return {"errno": 200, "error": "Nothing to send, aggregated or filtered by deadband"}
+        response = self.post_payload(payload)
+        self.after_send(payload, seqs, response)
+        return response
+
+    def before_send(self, payload, aggregate=True):
+        """
+        Fill default units, pass payload through aggregator, deadband filter and spool (if they are set)
+
+        :param payload: dict with devices list
+        :param aggregate: if False - aggregator is skipped
+        :return: tuple (payload to send or None if nothing to send, spool seq numbers)
+        """
+        if self.classifier is not None:
+            payload = self.fill_units(payload)
+        if self.aggregator is not None and aggregate:
+            payload = self.aggregate(payload)
+            if payload is None:
+                return None, None
+        if self.deadband is not None:
+            devices = self.deadband.apply(list(self.iter_devices(payload)))
+            if not devices:
+                return None, None
+            payload = {"devices": devices}
+        if self.spool is None:
+            return payload, None
+        seqs, devices = self.spool.append(list(self.iter_devices(payload)))
+        return {"devices": devices}, seqs
+
+    def fill_units(self, payload):
+        """
+        Set default unit (by sensor class) of readings sent without unit
+
+        :param payload: dict with devices list
+        :return: payload with units (readings of source payload are not changed)
+        """
+        devices = []
+        for device in self.iter_devices(payload):
+            sensors = device.get('sensors')
+            if type(sensors) == SensorBatch:
+                units = sensors.units if sensors.units is not None else [None] * len(sensors)
+                units = [unit or default for unit, default in zip(units, self.classifier.get_units(sensors.ids))]
+                sensors = SensorBatch.from_columns(sensors.ids, sensors.values, times=sensors.times, units=units,
+                                                   names=sensors.names)
+            elif type(sensors) == list:
+                defaults = self.classifier.get_units([sensor.get('id') for sensor in sensors])
+                sensors = [dict(sensor, unit=default) if default and not sensor.get('unit') else sensor
+                           for sensor, default in zip(sensors, defaults)]
+            devices.append(dict(device, sensors=sensors))
+        return {"devices": devices}
+
+    def aggregate(self, payload):
+        """
+        Add samples of payload to aggregator
+
+        :param payload: dict with devices list
+        :return: payload with readings of closed windows (device headers are kept), None if no window closed
+        """
+        devices = list(self.iter_devices(payload))
+        closed = self.aggregator.add(devices)
+        if not closed:
+            return None
+        answer = []
+        for device in devices:
+            if device.get('mac') in closed:
+                answer.append(dict(device, sensors=closed.pop(device.get('mac'))))
+        return {"devices": answer}
+
+    def flush_aggregator(self, force=False):
+        """
+        Send readings of aggregation windows finished by now (if no new samples came to close them)
+
+        :param force: if True - current (unfinished) windows are sent too
+        :return: response JSON, None if nothing to send
+        """
+        if self.aggregator is None:
+            return None
+        closed = self.aggregator.flush(force=force)
+        if not closed:
+            return None
+        return self.send_payload({"devices": [{"mac": mac, "sensors": sensors} for mac, sensors in closed.items()]},
+                                 aggregate=False)
+
+    def after_send(self, payload, seqs, response):
+        """
+        Confirm sent payload in spool and deadband filter and register devices sent with full data, if server
+        accepted it (only devices really posted are registered, not ones aggregated or filtered by deadband)
+
+        :param payload: sent payload
+        :param seqs: spool seq numbers of payload
+        :param response: response JSON
+        """
+        if type(response) != dict or response.get('errno') not in OK_CODES:
+            return
+        if seqs:
+            self.spool.remove(seqs)
+        devices = list(self.iter_devices(payload))
+        if self.deadband is not None:
+            self.deadband.commit(devices)
+        self.register_devices(devices, response)
+
+    def replay_spool(self, max_readings=1000):
+        """
+        Send readings stored in spool as bulk requests (with original measurement time)
+
+        :param max_readings: maximum readings in one bulk request
+        :return: count of confirmed readings
+        """
+        if self.spool is None:
+            return 0
+        return self.spool.replay(self.post_payload, max_readings=max_readings)
+
+    def post_payload(self, payload):
+        """
+        Send payload to json endpoint and check it response
+
+        :param payload: dict with devices list
+        :return: response JSON
+        """
+        response = self.transport.post(self.endpoint, headers=self.headers, keys=self.request_keys(payload),
+                                       **self.request_body(payload))
+        return status_decode(response, raise_errors=self.raise_errors)
+
+    def request_body(self, payload):
+        """
+        Get body params of request: payload is serialized into bytes (SensorBatch directly, without dicts)
+
+        :param payload: dict with devices list
+        :return: dict with data param of transport.post
+        """
+        return {"data": self.encode_payload(payload)}
+
+    def encode_payload(self, payload):
+        """
+        Serialize payload into bytes, device headers are encoded once and reused
+
+        :param payload: dict with devices list
+        :return: bytes
+        """
+        if list(payload) != ['devices'] or type(payload['devices']) != list:
+            return encode_json(payload)
+        return b'{"devices":[' + b','.join(self.encode_device(device) for device in payload['devices']) + b']}'
+
+    def encode_device(self, device):
+        """
+        Serialize device data into bytes. Header (mac, name, owner, coordinates) is encoded once for each its values,
+        only sensors are encoded every time
+
+        :param device: dict with device data
+        :return: bytes
+        """
+        if type(device) != dict or 'sensors' not in device or 'devices' in device:
+            return encode_json(device)
+        key = tuple((name, value) for name, value in device.items() if name != 'sensors')
+        try:
+            header = self.device_headers.get(key)
+        except TypeError:
+            key = header = None
+        if header is None:
+            header = encode_json(dict(key) if key is not None else
+                                 {name: value for name, value in device.items() if name != 'sensors'})
+            header = header[:-1] + b',' if len(header) > 2 else b'{'
+            if key is not None and len(self.device_headers) < 4096:
+                self.device_headers[key] = header
+        return header + b'"sensors":' + encode_json(device['sensors']) + b'}'
+
     def send_bulk_data(self, data):
         """
         Send data for several devices
@@ -68,18 +320,41 @@ class InterfaceJSON:
         """
         if type(data) == list:
             payload = {"devices": data}
-            response = requests.post(self.endpoint, json=payload, headers=self.headers)
-            status_decode(response)
-            return response.json()
+            return self.send_payload(payload)
         else:
             stderr.write("Narodmon sensors data is wrong!")
             return ''
 
+    def batch_uploader(self, max_readings=500, max_age=60.0, queue_size=10000, put_timeout=None, on_response=None):
+        """
+        Create background uploader which merges sensors data of any devices into bulk requests
+
+        :param max_readings: flush when count of pending readings reaches this value
+        :param max_age: flush when oldest pending reading is older than this value (seconds)
+        :param queue_size: maximum readings waiting in queue, add() blocks when queue is full
+        :param put_timeout: (optional) maximum seconds add() waits for free place, then queue.Full raised
+        :param on_response: (optional) callback(devices, response) called after each flush
+        :return: BatchUploader
+        """
+        return BatchUploader(self, max_readings=max_readings, max_age=max_age, queue_size=queue_size,
+                             put_timeout=put_timeout, on_response=on_response)
+
+    def fleet_manager(self, max_devices=50, max_bytes=65536, concurrency=4):
+        """
+        Create uploader for many devices, which packs them into bulk requests and sends them concurrently
+
+        :param max_devices: maximum devices in one bulk request
+        :param max_bytes: maximum size of one bulk request body (estimated) in bytes
+        :param concurrency: maximum bulk requests sent at the same time
+        :return: FleetManager
+        """
+        return FleetManager(self, max_devices=max_devices, max_bytes=max_bytes, concurrency=concurrency)
+
     def send_full_data(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None):
         """
         Send long data (sensors) from device to server
 
-        :param sensors: sensors list or one sensor data (dict)
+        :param sensors: sensors list, SensorBatch or one sensor data (dict)
         :param mac: (optional) mac address of device
         :param name: (optional) name of device
         :param owner: (optional) owner name of device
@@ -90,39 +365,98 @@ class InterfaceJSON:
         """
         payload = {"devices": [self.prepare_device_data_full(sensors=sensors, mac=mac, name=name, owner=owner,
                                                              lat=lat, lon=lon, alt=alt)]}
-        response = requests.post(self.endpoint, json=payload, headers=self.headers)
-        status_decode(response)
-        return response.json()
+        return self.send_payload(payload)
 
     def send_short_data(self, sensors, mac=None):
         """
         Send short data (sensors) from device to server
 
-        :param sensors: sensors list or one sensor data (dict)
+        :param sensors: sensors list, SensorBatch or one sensor data (dict)
         :param mac: (optional) mac address of device
         :return: response JSON
         """
-        payload = {"devices": [self.prepare_device_data_short(sensors, mac=mac)]}
-        response = requests.post(self.endpoint, json=payload, headers=self.headers)
-        status_decode(response)
-        return response.json()
+        device = self.prepare_device_data_short(sensors, mac=mac)
+        if not device:
+            return ''
+        return self.send_payload(device)
+
+    def send_data(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None):
+        """
+        Send data (sensors) from device to server: full data if device is not registered yet or its metadata
+        changed (according to registry), otherwise short data
+
+        :param sensors: sensors list, SensorBatch or one sensor data (dict)
+        :param mac: (optional) mac address of device
+        :param name: (optional) name of device
+        :param owner: (optional) owner name of device
+        :param lat: (optional) latitude (float)
+        :param lon: (optional) longitude (float)
+        :param alt: (optional) altitude (float)
+        :return: response JSON
+        """
+        device = self.prepare_device_data(sensors, mac=mac, name=name, owner=owner, lat=lat, lon=lon, alt=alt)
+        if not device:
+            return ''
+        return self.send_payload({"devices": [device]})
+
+    def prepare_device_data(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None,
+                            defaults=True):
+        """
+        Prepare data dict for device: full format if device is not registered yet or its metadata changed
+        (according to registry), otherwise short format
+
+        :param sensors: sensors list, SensorBatch or one sensor data (dict)
+        :param mac: (optional) mac address of device
+        :param name: (optional) name of device
+        :param owner: (optional) owner name of device
+        :param lat: (optional) latitude (float)
+        :param lon: (optional) longitude (float)
+        :param alt: (optional) altitude (float)
+        :param defaults: if False - empty metadata is not filled from interface defaults (used for other devices than
+                         this one), device without metadata is sent in short format
+        :return: dict with device data
+        """
+        device = self.prepare_device_data_full(sensors=sensors, mac=mac, name=name, owner=owner,
+                                               lat=lat, lon=lon, alt=alt, defaults=defaults)
+        if device and not defaults and all(device[key] is None for key in ('name', 'owner', 'lat', 'lon', 'alt')):
+            return {"mac": device['mac'], "sensors": device['sensors']}
+        if not device or self.registry.needs_full(device['mac'], device['name'], device['owner'], device['lat'],
+                                                  device['lon'], device['alt']):
+            return device
+        return {"mac": device['mac'], "sensors": device['sensors']}
+
+    def register_devices(self, devices, response):
+        """
+        Remember devices sent with full data in registry, if server accepted them
+
+        :param devices: list of device data
+        :param response: response JSON
+        """
+        if type(response) != dict or response.get('errno') not in OK_CODES:
+            return
+        for device in devices:
+            if type(device) == dict and 'name' in device:
+                self.registry.register(device['mac'], device['name'], device['owner'], device['lat'], device['lon'],
+                                       device['alt'])
 
-    def prepare_device_data_full(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None):
+    def prepare_device_data_full(self, sensors, mac=None, name=None, owner=None, lat=None, lon=None, alt=None,
+                                 defaults=True):
         """
         Prepare data dict for device (long (create) format)
 
-        :param sensors: sensors list or one sensor data (dict)
+        :param sensors: sensors list, SensorBatch or one sensor data (dict)
         :param mac: (optional) mac address of device
         :param name: (optional) name of device
         :param owner: (optional) owner name of device
         :param lat: (optional) latitude (float)
         :param lon: (optional) longitude (float)
         :param alt: (optional) altitude (float)
+        :param defaults: if False - empty metadata is not filled from interface defaults
         :return: dict with device data
         """
         if type(sensors) == dict:
             sensors = [sensors]
-        elif type(sensors) == list:
+        elif type(sensors) == list or type(sensors) == SensorBatch:
             pass
         else:
             stderr.write("Narodmon sensors data is wrong!")
@@ -130,6 +464,8 @@ class InterfaceJSON:
 
         if not mac:
             mac = self.mac
+        if not defaults:
+            return {"mac": mac, "name": name, "owner": owner, "lat": lat, "lon": lon, "alt": alt, "sensors": sensors}
         if not name:
             name = self.name
         if not owner:
@@ -147,13 +483,13 @@ class InterfaceJSON:
         """
         Prepare data dict for device (short (update) format)
 
-        :param sensors: sensors list or one sensor data (dict)
+        :param sensors: sensors list, SensorBatch or one sensor data (dict)
         :param mac: (optional) mac address of device
         :return: dict with device data
         """
         if type(sensors) == dict:
             sensors = [sensors]
-        elif type(sensors) == list:
+        elif type(sensors) == list or type(sensors) == SensorBatch:
             pass
         else:
             stderr.write("Narodmon sensors data is wrong!")
@@ -164,6 +500,50 @@ class InterfaceJSON:
 
         return {"devices": [{"mac": mac, "sensors": sensors}]}
 
+    def send_bulk_arrays(self, macs, ids=None, values=None, times=None, units=None, decimals=None):
+        """
+        Send data for several devices from equal-length arrays (one element per reading) or DataFrame with columns
+        mac, id, value, time, unit. NaN values are dropped, device format (full or short) is chosen via registry.
+
+        :param macs: mac addresses of devices (or DataFrame)
+        :param ids: sensor IDs
+        :param values: sensor values (float)
+        :param times: (optional) utc timestamps (0 or NaN if measurement for now)
+        :param units: (optional) units
+        :param decimals: (optional) round values to this count of decimals
+        :return: response JSON
+        """
+        devices = self.prepare_bulk_arrays(macs, ids=ids, values=values, times=times, units=units, decimals=decimals)
+        if not devices:
+            return {"errno": 200, "error": "Nothing to send"}
+        return self.send_bulk_data(devices)
+
+    def prepare_bulk_arrays(self, macs, ids=None, values=None, times=None, units=None, decimals=None):
+        """
+        Prepare device data list from equal-length arrays (same params as send_bulk_arrays), interface metadata
+        is used only for device with interface mac
+
+        :return: list of device data dicts
+        """
+        return [self.prepare_device_data(batch, mac=mac, defaults=mac == self.mac)
+                for mac, batch in group_by_mac(macs, ids, values, times=times, units=units,
+                                               decimals=decimals).items() if len(batch)]
+
+    @staticmethod
+    def prepare_sensor_batch(ids, values=None, times=None, units=None, decimals=None):
+        """
+        Prepare SensorBatch from equal-length arrays (NumPy arrays, lists) or DataFrame with columns
+        id, value, time, unit. Values are validated and rounded in vectorized way, NaN values are dropped.
+
+        :param ids: unique sensor IDs (codes) (or DataFrame)
+        :param values: sensor values (float)
+        :param times: (optional) utc timestamps (0 or NaN if measurement for now)
+        :param units: (optional) units
+        :param decimals: (optional) round values to this count of decimals
+        :return: SensorBatch
+        """
+        return SensorBatch.from_arrays(ids, values, times=times, units=units, decimals=decimals)
+
     @staticmethod
     def prepare_sensor_data(id_in, value, name=None, unit=None, utc_time=None):
         """
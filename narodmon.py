@@ -1,10 +1,67 @@
 from narodmon.interface_api import InterfaceAPI
 from narodmon.interface_json import InterfaceJSON
+from narodmon.interface_async import AsyncInterfaceAPI, AsyncInterfaceJSON
+from narodmon.ratelimit import RateLimiter
+from narodmon.retry import CircuitBreaker
+from narodmon.transport import Transport, AsyncTransport
 
 
 class Narodmon:
     def __init__(self,
                  mac=None, name=None, owner=None, lat=None, lon=None, alt=None,
-                 api_key=None, uuid=None, lang=None):
-        self.via_json = InterfaceJSON(mac=mac, owner=owner, name=name, lat=lat, lon=lon, alt=alt)
-        self.via_api = InterfaceAPI(uuid=uuid, api_key=api_key, lang=lang, lat=lat, lon=lon)
+                 api_key=None, uuid=None, lang=None,
+                 pool_connections=4, pool_maxsize=16, pool_block=False, keep_alive=True,
+                 connect_timeout=5.0, read_timeout=30.0, concurrency=100,
+                 raise_errors=False, json_decoder=None,
+                 rate_limiter=None, retry_policy=None, circuit_breaker=None, spool=None,
+                 deadband=None, registry=None, aggregator=None, cache=None, classifier=None):
+        self.rate_limiter = rate_limiter if rate_limiter else RateLimiter()
+        self.circuit_breaker = circuit_breaker if circuit_breaker else CircuitBreaker()
+        self.transport = Transport(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block, keep_alive=keep_alive,
+                                   connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                   json_decoder=json_decoder, rate_limiter=self.rate_limiter,
+                                   retry_policy=retry_policy, circuit_breaker=self.circuit_breaker)
+        self.via_json = InterfaceJSON(mac=mac, owner=owner, name=name, lat=lat, lon=lon, alt=alt,
+                                      transport=self.transport, raise_errors=raise_errors, spool=spool,
+                                      deadband=deadband, registry=registry, aggregator=aggregator,
+                                      classifier=classifier)
+        self.via_api = InterfaceAPI(uuid=uuid, api_key=api_key, lang=lang, lat=lat, lon=lon,
+                                    transport=self.transport, raise_errors=raise_errors, cache=cache)
+        self.async_transport = AsyncTransport(concurrency=concurrency, pool_maxsize=max(pool_maxsize, concurrency),
+                                              limit_per_host=max(pool_maxsize, concurrency), keep_alive=keep_alive,
+                                              connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                              json_decoder=json_decoder, rate_limiter=self.rate_limiter,
+                                              retry_policy=retry_policy, circuit_breaker=self.circuit_breaker)
+        self.via_async_json = AsyncInterfaceJSON(mac=mac, owner=owner, name=name, lat=lat, lon=lon, alt=alt,
+                                                 transport=self.async_transport, raise_errors=raise_errors,
+                                                 spool=spool, deadband=deadband, registry=registry,
+                                                 aggregator=aggregator, classifier=classifier)
+        self.via_async_api = AsyncInterfaceAPI(uuid=uuid, api_key=api_key, lang=lang, lat=lat, lon=lon,
+                                               transport=self.async_transport, raise_errors=raise_errors,
+                                               cache=cache)
+
+    def close(self):
+        """
+        Close pooled connections shared by json and api interfaces
+        """
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def aclose(self):
+        """
+        Close pooled connections shared by async json and api interfaces
+        """
+        await self.async_transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+        self.close()
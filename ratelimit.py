@@ -0,0 +1,154 @@
+import threading
+import time
+
+from narodmon.exceptions import RateLimitedError
+from narodmon.settings import RATE_BUDGETS, RATE_MAX_WAIT
+
+
+class Budget:
+    __slots__ = ('base_interval', 'interval', 'tat')
+
+    def __init__(self, interval):
+        """
+        Send budget of one key (GCRA: theoretical arrival time of next request)
+
+        :param interval: minimal interval between requests in seconds
+        """
+        self.base_interval = interval
+        self.interval = interval
+        self.tat = 0.0
+
+
+class RateLimiter:
+    def __init__(self, budgets=None, max_wait=RATE_MAX_WAIT, penalty=60.0, max_penalty=300.0, backoff=2.0, recovery=0.9):
+        """
+        Client-side scheduler for narodmon requests. Each request passes through budgets of several keys:
+        ('endpoint', name), ('key', api_key or uuid), ('mac', device mac). Budget of scope may be set via budgets,
+        i.e. {'mac': (1, 60)} means 1 request per 60 seconds for each device. By default settings.RATE_BUDGETS
+        are applied (json upload of each device - once per minute), budgets override them, i.e. {'mac': (1, 0)}
+        disables limit of devices. Request is not delayed longer than max_wait (settings.RATE_MAX_WAIT), otherwise
+        RateLimitedError is raised (transports return it as local response with errno 429).
+        On errno 429 interval of all request keys is increased (at least up to penalty), on success it slowly
+        returns to configured value.
+
+        :param budgets: (optional) dict {scope: (count, period)}, merged with settings.RATE_BUDGETS
+        :param max_wait: maximum wait in seconds, if request needs more - RateLimitedError raised, None - wait without
+            limit
+        :param penalty: minimal interval (seconds) applied to key after 429
+        :param max_penalty: maximum interval (seconds) applied to key after several 429
+        :param backoff: interval multiplier on each 429
+        :param recovery: interval multiplier on each successful request
+        """
+        self.budgets = dict(RATE_BUDGETS, **(budgets or {}))
+        self.overrides = {}
+        self.max_wait = max_wait
+        self.penalty = penalty
+        self.max_penalty = max_penalty
+        self.backoff = backoff
+        self.recovery = recovery
+        self.states = {}
+        self.lock = threading.Lock()
+
+    def set_budget(self, scope, count, period, name=None):
+        """
+        Set/update budget for whole scope or for one key of scope
+
+        :param scope: 'endpoint', 'key' or 'mac'
+        :param count: count of requests
+        :param period: period in seconds
+        :param name: (optional) name of key, i.e. 'sensorsValues' for 'endpoint' scope
+        """
+        with self.lock:
+            if name is None:
+                self.budgets[scope] = (count, period)
+                self.states = {key: state for key, state in self.states.items() if key[0] != scope}
+            else:
+                self.overrides[(scope, name)] = (count, period)
+                self.states.pop((scope, name), None)
+
+    def get_state(self, key):
+        state = self.states.get(key)
+        if state is None:
+            count, period = self.overrides.get(key, self.budgets.get(key[0], (1, 0.0)))
+            state = self.states[key] = Budget(period / count)
+        return state
+
+    def reserve(self, keys):
+        """
+        Reserve slot for request in all key budgets
+
+        :param keys: list of (scope, name) tuples
+        :return: delay in seconds before request may be sent
+        """
+        now = time.monotonic()
+        with self.lock:
+            states = [self.get_state(key) for key in keys if key[1] is not None]
+            start = max([state.tat for state in states] + [now])
+            delay = start - now
+            if self.max_wait is not None and delay > self.max_wait:
+                error = f'Client-side rate limit, retry in {delay:.1f} s'
+                raise RateLimitedError(429, error=error, body={"errno": 429, "error": error})
+            for state in states:
+                state.tat = start + state.interval
+        return delay
+
+    def get_delay(self, keys):
+        """
+        Get delay before request may be sent without reserving slot
+
+        :param keys: list of (scope, name) tuples
+        :return: delay in seconds
+        """
+        now = time.monotonic()
+        with self.lock:
+            states = [self.get_state(key) for key in keys if key[1] is not None]
+            return max([state.tat for state in states] + [now]) - now
+
+    def acquire(self, keys):
+        """
+        Wait until request is allowed by all key budgets
+
+        :param keys: list of (scope, name) tuples
+        """
+        delay = self.reserve(keys)
+        if delay > 0:
+            time.sleep(delay)
+
+    def throttle(self, keys):
+        """
+        Increase intervals of keys after server responded 429
+
+        :param keys: list of (scope, name) tuples
+        """
+        now = time.monotonic()
+        with self.lock:
+            for key in keys:
+                if key[1] is None:
+                    continue
+                state = self.get_state(key)
+                state.interval = min(max(state.interval * self.backoff, self.penalty), self.max_penalty)
+                state.tat = max(state.tat, now + state.interval)
+
+    def relax(self, keys):
+        """
+        Return intervals of keys back to configured values after successful request
+
+        :param keys: list of (scope, name) tuples
+        """
+        with self.lock:
+            for key in keys:
+                state = self.states.get(key)
+                if state is not None and state.interval > state.base_interval:
+                    state.interval = max(state.interval * self.recovery, state.base_interval)
+
+    def update(self, keys, errno):
+        """
+        Adapt key intervals to server response
+
+        :param keys: list of (scope, name) tuples
+        :param errno: errno of response
+        """
+        if errno == 429:
+            self.throttle(keys)
+        else:
+            self.relax(keys)
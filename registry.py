@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+
+
+class DeviceRegistry:
+    def __init__(self, path=None):
+        """
+        Registry of devices already registered on narodmon (sent with full data) and their metadata
+
+        :param path: (optional) path to JSON file, registry is stored there after each change
+        """
+        self.path = path
+        self.devices = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as file:
+                self.devices = json.load(file)
+
+    @staticmethod
+    def metadata(name=None, owner=None, lat=None, lon=None, alt=None):
+        return [name, owner, lat, lon, alt]
+
+    def needs_full(self, mac, name=None, owner=None, lat=None, lon=None, alt=None):
+        """
+        Check if device should be sent with full data: it's not registered yet or its metadata changed
+
+        :param mac: mac address of device
+        :param name: name of device
+        :param owner: owner name of device
+        :param lat: latitude (float)
+        :param lon: longitude (float)
+        :param alt: altitude (float)
+        :return: bool
+        """
+        device = self.devices.get(mac)
+        return device is None or device['metadata'] != self.metadata(name, owner, lat, lon, alt)
+
+    def register(self, mac, name=None, owner=None, lat=None, lon=None, alt=None):
+        """
+        Remember that device registered with metadata
+
+        :param mac: mac address of device
+        :param name: name of device
+        :param owner: owner name of device
+        :param lat: latitude (float)
+        :param lon: longitude (float)
+        :param alt: altitude (float)
+        """
+        metadata = self.metadata(name, owner, lat, lon, alt)
+        now = int(time.time())
+        with self.lock:
+            device = self.devices.get(mac)
+            if device is not None and device['metadata'] == metadata:
+                return
+            self.devices[mac] = {"metadata": metadata, "registered": device['registered'] if device else now,
+                                 "changed": now}
+            self.save()
+
+    def forget(self, mac):
+        """
+        Remove device from registry, so it will be sent with full data next time
+
+        :param mac: mac address of device
+        """
+        with self.lock:
+            if self.devices.pop(mac, None) is not None:
+                self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.devices, file)
+        os.replace(temp_path, self.path)
+
+    def __contains__(self, mac):
+        return mac in self.devices
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, base_delay=1.0, max_delay=60.0, max_elapsed=120.0,
+                 retry_errno=(429, 503), retry_status=(429, 500, 502, 503, 504), retry_connection_errors=True):
+        """
+        Retry policy with exponential backoff and full jitter
+
+        :param max_attempts: maximum attempts of request (including first one)
+        :param base_delay: delay before first retry in seconds (before jitter)
+        :param max_delay: maximum delay between attempts in seconds
+        :param max_elapsed: maximum total time of request in seconds (since first attempt, including waits for
+            rate limiter)
+        :param retry_errno: errno of response body which should be retried
+        :param retry_status: HTTP status codes which should be retried
+        :param retry_connection_errors: if True - connection errors and timeouts will be retried
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+        self.retry_errno = retry_errno
+        self.retry_status = retry_status
+        self.retry_connection_errors = retry_connection_errors
+
+    def is_retryable(self, response):
+        """
+        Check if response should be retried
+
+        :param response: BufferedResponse
+        :return: bool
+        """
+        return response.status_code in self.retry_status or response.errno() in self.retry_errno
+
+    def delay(self, attempt, elapsed=0.0, wait=0.0):
+        """
+        Get delay before next attempt
+
+        :param attempt: number of failed attempt (starting from 0)
+        :param elapsed: time already spent since first attempt in seconds
+        :param wait: (optional) delay required by rate limiter before next attempt in seconds
+        :return: delay in seconds, None if request should not be retried anymore
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if elapsed + max(delay, wait) > self.max_elapsed:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    def __init__(self, maintenance_cooldown=300.0, blocked_cooldown=3600.0, failure_threshold=5,
+                 failure_cooldown=30.0):
+        """
+        Circuit breaker: fails requests fast while service in maintenance (503), api key blocked (423) or after
+        several connection failures in a row. After cooldown one trial request is allowed.
+
+        :param maintenance_cooldown: seconds to fail fast after errno 503 (for all requests)
+        :param blocked_cooldown: seconds to fail fast after errno 423 (for requests with the same api key)
+        :param failure_threshold: connection failures in a row to open circuit
+        :param failure_cooldown: seconds to fail fast after failure_threshold reached
+        """
+        self.maintenance_cooldown = maintenance_cooldown
+        self.blocked_cooldown = blocked_cooldown
+        self.failure_threshold = failure_threshold
+        self.failure_cooldown = failure_cooldown
+        self.opened = {}
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def check(self, keys):
+        """
+        Check if request is allowed
+
+        :param keys: rate limiter keys of request, list of (scope, name) tuples
+        :return: None if allowed, otherwise response body for failed fast request
+        """
+        now = time.monotonic()
+        with self.lock:
+            for key in [None] + list(keys if keys else []):
+                if key not in self.opened:
+                    continue
+                until, errno = self.opened[key]
+                if now < until:
+                    return {"errno": errno, "error": f"Circuit is open, retry in {until - now:.0f} s"}
+                # half-open: let one trial request go, keep others failing fast until it's finished
+                self.opened[key] = (now + self.failure_cooldown, errno)
+        return None
+
+    def record(self, keys, errno):
+        """
+        Update circuit state after response
+
+        :param keys: rate limiter keys of request, list of (scope, name) tuples
+        :param errno: errno of response
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.failures = 0
+            if errno == 503:
+                self.opened[None] = (now + self.maintenance_cooldown, errno)
+            elif errno == 423:
+                for key in keys if keys else []:
+                    if key[0] == 'key':
+                        self.opened[key] = (now + self.blocked_cooldown, errno)
+            else:
+                self.opened.pop(None, None)
+                for key in keys if keys else []:
+                    self.opened.pop(key, None)
+
+    def record_failure(self):
+        """
+        Update circuit state after connection failure
+        """
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened[None] = (time.monotonic() + self.failure_cooldown, 503)
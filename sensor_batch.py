@@ -0,0 +1,229 @@
+from array import array
+import json
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def columns(data, names):
+    """
+    Get columns from DataFrame (or dict of columns), missing columns are None
+
+    :param data: DataFrame or dict
+    :param names: column names
+    :return: list of columns
+    """
+    return [data[name] if name in data else None for name in names]
+
+
+class SensorBatch:
+    __slots__ = ('ids', 'values', 'times', 'units', 'names')
+
+    def __init__(self):
+        """
+        Compact columnar list of sensors data: readings are kept in columns (array of values, array of times),
+        not in dict per reading, and serialized directly into JSON body
+        """
+        self.ids = []
+        self.values = array('d')
+        self.times = array('q')
+        self.units = None
+        self.names = None
+
+    @classmethod
+    def from_columns(cls, ids, values, times=None, units=None, names=None):
+        """
+        Create batch from equal-length columns, values should be finite (NaN/inf is not valid JSON)
+
+        :param ids: sensor IDs
+        :param values: sensor values (float)
+        :param times: (optional) utc timestamps (int), 0 means measurement for now
+        :param units: (optional) units (string or None)
+        :param names: (optional) public names of sensors (string or None)
+        :return: SensorBatch
+        """
+        batch = cls()
+        batch.ids = list(ids)
+        batch.values = array('d', values)
+        batch.times = array('q', times) if times is not None else array('q', bytes(8 * len(batch.ids)))
+        batch.units = list(units) if units is not None else None
+        batch.names = list(names) if names is not None else None
+        if not len(batch.ids) == len(batch.values) == len(batch.times):
+            raise ValueError('Narodmon sensors data columns have different length')
+        if not all(map(math.isfinite, batch.values)):
+            raise ValueError('Narodmon sensor values should be finite (NaN/inf is not valid JSON)')
+        return batch
+
+    def append(self, id_in, value, name=None, unit=None, utc_time=None):
+        """
+        Add sensor reading (same params as InterfaceJSON.prepare_sensor_data)
+
+        :param id_in: unique sensor ID (code) (required)
+        :param value: sensor value (float) (required), should be finite (NaN/inf is not valid JSON)
+        :param name: public name of sensor (string) (optional)
+        :param unit: unit (string) (optional)
+        :param utc_time: utc timestamp (long int) (optional if measurements for now)
+        """
+        if not math.isfinite(value):
+            raise ValueError(f'Narodmon sensor {id_in} value should be finite, not {value}')
+        if unit and self.units is None:
+            self.units = [None] * len(self.ids)
+        if name and self.names is None:
+            self.names = [None] * len(self.ids)
+        self.ids.append(id_in)
+        self.values.append(value)
+        self.times.append(utc_time if utc_time else 0)
+        if self.units is not None:
+            self.units.append(unit)
+        if self.names is not None:
+            self.names.append(name)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        """
+        Iterate over readings as sensor data dicts (same format as InterfaceJSON.prepare_sensor_data)
+        """
+        for index, id_in in enumerate(self.ids):
+            answer = {"id": id_in, "value": self.values[index]}
+            if self.names is not None and self.names[index]:
+                answer.update({"name": self.names[index]})
+            if self.units is not None and self.units[index]:
+                answer.update({"unit": self.units[index]})
+            if self.times[index]:
+                answer.update({"time": self.times[index]})
+            yield answer
+
+    def encode(self):
+        """
+        Serialize readings into JSON array without intermediate dicts
+
+        :return: bytes
+        """
+        dumps = json.dumps
+        parts = []
+        names = self.names
+        units = self.units
+        times = self.times
+        for index, (id_in, value) in enumerate(zip(self.ids, self.values)):
+            part = f'{{"id":{dumps(id_in)},"value":{float.__repr__(value)}'
+            if names is not None and names[index]:
+                part += f',"name":{dumps(names[index])}'
+            if units is not None and units[index]:
+                part += f',"unit":{dumps(units[index])}'
+            if times[index]:
+                part += f',"time":{times[index]}'
+            parts.append(part + '}')
+        return ('[' + ','.join(parts) + ']').encode()
+
+    @classmethod
+    def from_arrays(cls, ids, values=None, times=None, units=None, decimals=None):
+        """
+        Create batch from equal-length arrays (NumPy arrays, lists) or DataFrame with columns id, value, time, unit.
+        Values are rounded and NaN/inf readings are dropped in vectorized way (if NumPy installed).
+
+        :param ids: sensor IDs or DataFrame
+        :param values: sensor values
+        :param times: (optional) utc timestamps, 0 or NaN means measurement for now
+        :param units: (optional) units
+        :param decimals: (optional) round values to this count of decimals
+        :return: SensorBatch
+        """
+        if values is None:
+            ids, values, times, units = columns(ids, ('id', 'value', 'time', 'unit'))
+        if numpy is None:
+            return cls.from_lists(ids, values, times=times, units=units, decimals=decimals)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        ids = numpy.asarray(ids, dtype=object)
+        if ids.shape != values.shape or (times is not None and len(times) != len(values)) or \
+                (units is not None and len(units) != len(values)):
+            raise ValueError('Narodmon sensors data columns have different length')
+        mask = numpy.isfinite(values)
+        values = values[mask]
+        if decimals is not None:
+            values = numpy.round(values, decimals)
+        if times is None:
+            times = numpy.zeros(len(values), dtype=numpy.int64)
+        else:
+            times = numpy.nan_to_num(numpy.asarray(times, dtype=numpy.float64)[mask], nan=0).astype(numpy.int64)
+        batch = cls()
+        batch.ids = ids[mask].tolist()
+        batch.values = array('d', values.astype('=f8').tobytes())
+        batch.times = array('q', times.astype('=i8').tobytes())
+        batch.units = numpy.asarray(units, dtype=object)[mask].tolist() if units is not None else None
+        return batch
+
+    @classmethod
+    def from_lists(cls, ids, values, times=None, units=None, decimals=None):
+        """
+        Create batch from equal-length lists without NumPy (same rules as from_arrays)
+
+        :param ids: sensor IDs
+        :param values: sensor values
+        :param times: (optional) utc timestamps, 0 or None means measurement for now
+        :param units: (optional) units
+        :param decimals: (optional) round values to this count of decimals
+        :return: SensorBatch
+        """
+        ids = list(ids)
+        values = list(values)
+        if len(ids) != len(values) or (times is not None and len(times) != len(values)) or \
+                (units is not None and len(units) != len(values)):
+            raise ValueError('Narodmon sensors data columns have different length')
+        batch = cls()
+        for index, value in enumerate(values):
+            value = float(value)
+            if not math.isfinite(value):
+                continue
+            utc_time = times[index] if times is not None else None
+            batch.append(ids[index], round(value, decimals) if decimals is not None else value,
+                         unit=units[index] if units is not None else None,
+                         utc_time=int(utc_time) if utc_time and utc_time == utc_time else None)
+        return batch
+
+
+def group_by_mac(macs, ids=None, values=None, times=None, units=None, decimals=None):
+    """
+    Split equal-length arrays (or DataFrame with mac, id, value, time, unit columns) into batches per device
+
+    :param macs: mac addresses of devices or DataFrame
+    :param ids: sensor IDs
+    :param values: sensor values
+    :param times: (optional) utc timestamps
+    :param units: (optional) units
+    :param decimals: (optional) round values to this count of decimals
+    :return: dict {mac: SensorBatch}
+    """
+    if ids is None or values is None:
+        macs, ids, values, times, units = columns(macs, ('mac', 'id', 'value', 'time', 'unit'))
+    if numpy is None:
+        rows = {}
+        for index, mac in enumerate(macs):
+            rows.setdefault(mac, []).append(index)
+        return {mac: SensorBatch.from_lists([ids[index] for index in indexes], [values[index] for index in indexes],
+                                            times=[times[index] for index in indexes] if times is not None else None,
+                                            units=[units[index] for index in indexes] if units is not None else None,
+                                            decimals=decimals)
+                for mac, indexes in rows.items()}
+    macs = numpy.asarray(macs, dtype=object)
+    if len(macs) != len(values):
+        raise ValueError('Narodmon sensors data columns have different length')
+    ids = numpy.asarray(ids, dtype=object)
+    values = numpy.asarray(values, dtype=numpy.float64)
+    times = numpy.asarray(times) if times is not None else None
+    units = numpy.asarray(units, dtype=object) if units is not None else None
+    unique, inverse = numpy.unique(macs.astype(str), return_inverse=True)
+    order = numpy.argsort(inverse, kind='stable')
+    bounds = numpy.searchsorted(inverse[order], numpy.arange(len(unique) + 1))
+    batches = {}
+    for index in range(len(unique)):
+        rows = order[bounds[index]:bounds[index + 1]]
+        batches[macs[rows[0]]] = SensorBatch.from_arrays(ids[rows], values[rows],
+                                                         times=times[rows] if times is not None else None,
+                                                         units=units[rows] if units is not None else None,
+                                                         decimals=decimals)
+    return batches
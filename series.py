@@ -0,0 +1,168 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+STATISTICS = ('min', 'max', 'mean', 'last', 'first', 'sum', 'count')
+
+
+class HistorySeries:
+    def __init__(self, times, values, id_in=None, unit=None):
+        """
+        History of one sensor in contiguous arrays (int64 times, float64 values) sorted by time
+
+        :param times: utc timestamps (array-like)
+        :param values: values (array-like) of the same length
+        :param id_in: (optional) sensor id
+        :param unit: (optional) unit
+        """
+        if numpy is None:
+            raise ImportError("numpy is required for HistorySeries, install it via 'pip install numpy'")
+        times = numpy.asarray(times, dtype=numpy.int64)
+        values = numpy.asarray(values, dtype=numpy.float64)
+        if times.shape != values.shape:
+            raise ValueError('Narodmon history columns have different length')
+        if len(times) > 1 and numpy.any(times[1:] < times[:-1]):
+            order = numpy.argsort(times, kind='stable')
+            times = times[order]
+            values = values[order]
+        self.times = times
+        self.values = values
+        self.id = id_in
+        self.unit = unit
+
+    @classmethod
+    def from_response(cls, response, id_in=None):
+        """
+        Create series from sensorsHistory response (ids are compared as strings)
+
+        :param response: response JSON
+        :param id_in: (optional) sensor id, by default - id of first sensor in response
+        :return: HistorySeries
+        """
+        sensors = response.get('sensors') or [{}]
+        if id_in is None:
+            id_in = sensors[0].get('id')
+        data = [point for point in response.get('data') or []
+                if id_in is None or str(point.get('id', id_in)) == str(id_in)]
+        unit = next((sensor.get('unit') for sensor in sensors if str(sensor.get('id')) == str(id_in)), None)
+        return cls(numpy.fromiter((point['time'] for point in data), dtype=numpy.int64, count=len(data)),
+                   numpy.fromiter((point['value'] for point in data), dtype=numpy.float64, count=len(data)),
+                   id_in=id_in, unit=unit)
+
+    @classmethod
+    def from_points(cls, points, id_in=None, unit=None):
+        """
+        Create series from (time, value) tuples, i.e. HistoryStore.points
+
+        :param points: list of (time, value) tuples
+        :param id_in: (optional) sensor id
+        :param unit: (optional) unit
+        :return: HistorySeries
+        """
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+        return cls(points[:, 0], points[:, 1], id_in=id_in, unit=unit)
+
+    def __len__(self):
+        return len(self.times)
+
+    def slice(self, start=None, end=None):
+        """
+        Get part of series in time range (arrays are views, without copy)
+
+        :param start: (optional) start of range (utc timestamp, inclusive)
+        :param end: (optional) end of range (utc timestamp, inclusive)
+        :return: HistorySeries
+        """
+        first = numpy.searchsorted(self.times, start, side='left') if start is not None else 0
+        last = numpy.searchsorted(self.times, end, side='right') if end is not None else len(self.times)
+        return HistorySeries(self.times[first:last], self.values[first:last], id_in=self.id, unit=self.unit)
+
+    def resample(self, step, how='mean'):
+        """
+        Downsample series into buckets of fixed length aligned to utc
+
+        :param step: bucket length in seconds
+        :param how: statistic of bucket: 'min', 'max', 'mean', 'last', 'first', 'sum' or 'count'
+        :return: HistorySeries, time of point is start of bucket
+        """
+        if how not in STATISTICS:
+            raise ValueError(f'Unknown statistic {how}, possible values are: {", ".join(STATISTICS)}')
+        if not len(self.times):
+            return HistorySeries(self.times, self.values, id_in=self.id, unit=self.unit)
+        buckets = self.times // step * step
+        starts = numpy.flatnonzero(numpy.r_[True, buckets[1:] != buckets[:-1]])
+        ends = numpy.r_[starts[1:], len(buckets)]
+        if how == 'min':
+            values = numpy.minimum.reduceat(self.values, starts)
+        elif how == 'max':
+            values = numpy.maximum.reduceat(self.values, starts)
+        elif how == 'sum':
+            values = numpy.add.reduceat(self.values, starts)
+        elif how == 'mean':
+            values = numpy.add.reduceat(self.values, starts) / (ends - starts)
+        elif how == 'count':
+            values = (ends - starts).astype(numpy.float64)
+        elif how == 'first':
+            values = self.values[starts]
+        else:
+            values = self.values[ends - 1]
+        return HistorySeries(buckets[starts], values, id_in=self.id, unit=self.unit)
+
+    def rolling(self, window, how='mean'):
+        """
+        Rolling statistic over last points
+
+        :param window: count of points in window
+        :param how: 'mean', 'std', 'min', 'max' or 'sum'
+        :return: numpy array aligned with points (NaN while window is not full)
+        """
+        answer = numpy.full(len(self.values), numpy.nan)
+        if window < 1 or len(self.values) < window:
+            return answer
+        if how in ('mean', 'sum', 'std'):
+            cumsum = numpy.r_[0.0, numpy.cumsum(self.values)]
+            sums = cumsum[window:] - cumsum[:-window]
+            if how == 'sum':
+                answer[window - 1:] = sums
+            elif how == 'mean':
+                answer[window - 1:] = sums / window
+            else:
+                squares = numpy.r_[0.0, numpy.cumsum(self.values ** 2)]
+                variance = (squares[window:] - squares[:-window]) / window - (sums / window) ** 2
+                answer[window - 1:] = numpy.sqrt(numpy.maximum(variance, 0))
+        elif how in ('min', 'max'):
+            windows = numpy.lib.stride_tricks.sliding_window_view(self.values, window)
+            answer[window - 1:] = windows.min(axis=1) if how == 'min' else windows.max(axis=1)
+        else:
+            raise ValueError(f'Unknown statistic {how}, possible values are: mean, std, min, max, sum')
+        return answer
+
+    def trend(self, window=3600, per=3600):
+        """
+        Linear growth of values over last time window, calculated by least squares (as server trends=1)
+
+        :param window: length of window in seconds, ending at last point
+        :param per: slope unit in seconds, by default - change of value per hour
+        :return: slope (float), NaN if less than two points in window
+        """
+        if not len(self.times):
+            return numpy.nan
+        part = self.slice(start=self.times[-1] - window)
+        if len(part) < 2:
+            return numpy.nan
+        times = (part.times - part.times[0]).astype(numpy.float64)
+        times -= times.mean()
+        denominator = numpy.dot(times, times)
+        if not denominator:
+            return numpy.nan
+        return float(numpy.dot(times, part.values - part.values.mean()) / denominator * per)
+
+    def to_points(self):
+        """
+        Get points as list of dicts (format of sensorsHistory data)
+
+        :return: list of dicts with time and value
+        """
+        return [{"time": point_time, "value": value}
+                for point_time, value in zip(self.times.tolist(), self.values.tolist())]
@@ -1,4 +1,7 @@
 BASE_API_URL = 'https://narodmon.ru'
+MAX_SENSORS_VALUES = 50  # maximum sensors in one sensorsValues request
+RATE_BUDGETS = {'mac': (1, 60)}  # default client-side budgets {scope: (count, period)}, device sends once per minute
+RATE_MAX_WAIT = 5.0  # default maximum wait for client-side budget in seconds, longer wait fails with errno 429
 
 sensor_dict = {
     'temperature': ('TEMPC', 'BATTEMP', 'T*', 'TEMP*', 'BMPT*', 'DHTT*', 'DSW*', 'DS18T*'),
@@ -27,3 +30,91 @@ sensor_dict = {
     'longitude': ('LON',),
     'altitude': ('ALT',)
 }
+
+# default unit of sensor class (or of exact sensor ID, it has precedence over class)
+unit_dict = {
+    'temperature': '°C',
+    'humidity': '%',
+    'pressure': 'mmHg',
+    'HPA': 'hPa',
+    'rain': 'mm',
+    'wind_speed': 'm/s',
+    'KMH': 'km/h',
+    'heading': '°',
+    'voltage': 'V',
+    'current': 'A',
+    'power': 'W',
+    'power_energy': 'kWh',
+    'WH': 'Wh',
+    'water_flow': 'm³',
+    'luminocity': 'lx',
+    'radiation': 'µR/h',
+    'net_traffic': 'B',
+    'air_concentration': 'ppm',
+    'uptime': 's',
+    'signal_strength': 'dBm',
+    'uv': 'UVI',
+    'battery_status': '%',
+    'dust': 'µg/m³',
+    'dew_point': '°C',
+    'latitude': '°',
+    'longitude': '°',
+    'altitude': 'm'
+}
+
+# default deadband of sensor class: (absolute, percent), reading is not sent while it differs from last sent value
+# less than max(absolute, percent of last value)
+deadband_dict = {
+    'temperature': (0.1, 0),
+    'humidity': (1, 0),
+    'pressure': (0.5, 0),
+    'rain': (0.1, 0),
+    'wind_speed': (0.2, 0),
+    'heading': (5, 0),
+    'voltage': (0.01, 0),
+    'current': (0.01, 0),
+    'power': (0, 1),
+    'power_energy': (0, 0.1),
+    'water_flow': (0, 0.1),
+    'luminocity': (0, 5),
+    'radiation': (0, 5),
+    'net_traffic': (0, 1),
+    'air_concentration': (0, 2),
+    'signal_strength': (3, 0),
+    'uv': (0.1, 0),
+    'battery_status': (1, 0),
+    'dust': (0, 5),
+    'dew_point': (0.1, 0),
+    'latitude': (0.00001, 0),
+    'longitude': (0.00001, 0),
+    'altitude': (1, 0)
+}
+
+# default statistic of sensor class used by aggregation windows: 'last', 'mean', 'min', 'max' or 'median'
+aggregation_dict = {
+    'temperature': 'mean',
+    'humidity': 'mean',
+    'pressure': 'mean',
+    'rain': 'last',
+    'wind_speed': 'mean',
+    'heading': 'last',
+    'voltage': 'mean',
+    'current': 'mean',
+    'power': 'mean',
+    'power_energy': 'last',
+    'water_flow': 'last',
+    'luminocity': 'mean',
+    'radiation': 'mean',
+    'logic': 'last',
+    'net_traffic': 'last',
+    'air_concentration': 'mean',
+    'uptime': 'last',
+    'signal_strength': 'mean',
+    'uv': 'max',
+    'battery_status': 'last',
+    'dust': 'median',
+    'dew_point': 'mean',
+    'latitude': 'last',
+    'longitude': 'last',
+    'altitude': 'last'
+}
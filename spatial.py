@@ -0,0 +1,253 @@
+import math
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+EARTH_RADIUS = 6371.0088  # mean Earth radius in km
+KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+def haversine(lat, lon, lats, lons):
+    """
+    Great-circle distance from one point to array of points
+
+    :param lat: latitude of point (degrees)
+    :param lon: longitude of point (degrees)
+    :param lats: latitudes (numpy array, degrees)
+    :param lons: longitudes (numpy array, degrees)
+    :return: numpy array of distances in km
+    """
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats = numpy.radians(lats)
+    lons = numpy.radians(lons)
+    value = numpy.sin((lats - lat) / 2) ** 2 + math.cos(lat) * numpy.cos(lats) * numpy.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS * numpy.arcsin(numpy.sqrt(numpy.minimum(value, 1.0)))
+
+
+class SpatialIndex:
+    def __init__(self, cell_size=0.5):
+        """
+        Local index of devices and webcams filled from mapBounds, sensorsNearby and webcamsNearby responses.
+        Answers radius, k-nearest and bounding box queries in memory (items are kept in arrays sorted by latitude,
+        distances are calculated by vectorized haversine). Region is divided into grid cells, each cell remembers
+        time of its last refresh, so stale cells may be refreshed one by one.
+
+        :param cell_size: size of grid cell in degrees
+        """
+        if numpy is None:
+            raise ImportError("numpy is required for SpatialIndex, install it via 'pip install numpy'")
+        self.cell_size = cell_size
+        self.items = {}
+        self.refreshed = {}
+        self.lock = threading.Lock()
+        self.arrays = ([], numpy.empty(0), numpy.empty(0))
+        self.dirty = False
+
+    def get_cell(self, lat, lon):
+        return int(lat // self.cell_size), int(lon // self.cell_size)
+
+    def get_cell_bounds(self, cell):
+        """
+        Get bounds of grid cell
+
+        :param cell: (row, column) tuple
+        :return: [lat-min, lon-min, lat-max, lon-max]
+        """
+        return [cell[0] * self.cell_size, cell[1] * self.cell_size,
+                (cell[0] + 1) * self.cell_size, (cell[1] + 1) * self.cell_size]
+
+    def add(self, items, kind='device'):
+        """
+        Add or update items
+
+        :param items: list of dicts with id, lat and lon
+        :param kind: 'device' or 'webcam'
+        :return: count of added or updated items
+        """
+        count = 0
+        with self.lock:
+            for item in items:
+                if item.get('lat') is None or item.get('lon') is None:
+                    continue
+                self.items[(kind, item['id'])] = item
+                count += 1
+            self.dirty = self.dirty or bool(count)
+        return count
+
+    def add_response(self, response, bounds=None):
+        """
+        Add devices and webcams of mapBounds, sensorsNearby or webcamsNearby response. If bounds of request are
+        given, items missing in response are removed from these bounds and covered cells are marked as refreshed.
+
+        :param response: response JSON
+        :param bounds: (optional) bounds of request [lat-min, lon-min, lat-max, lon-max]
+        :return: count of added or updated items
+        """
+        if type(response) != dict:
+            return 0
+        if bounds is not None:
+            self.remove_bounds(bounds)
+        count = self.add(response.get('devices') or [], kind='device')
+        count += self.add(response.get('webcams') or [], kind='webcam')
+        if bounds is not None:
+            now = time.time()
+            first = self.get_cell(bounds[0], bounds[1])
+            last = self.get_cell(bounds[2], bounds[3])
+            with self.lock:
+                for row in range(first[0], last[0] + 1):
+                    for column in range(first[1], last[1] + 1):
+                        cell_bounds = self.get_cell_bounds((row, column))
+                        if bounds[0] <= cell_bounds[0] and bounds[1] <= cell_bounds[1] and \
+                                cell_bounds[2] <= bounds[2] and cell_bounds[3] <= bounds[3]:
+                            self.refreshed[(row, column)] = now
+        return count
+
+    def remove_bounds(self, bounds):
+        """
+        Remove items inside bounds
+
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        """
+        with self.lock:
+            for key in [key for key, item in self.items.items()
+                        if bounds[0] <= item['lat'] <= bounds[2] and bounds[1] <= item['lon'] <= bounds[3]]:
+                del self.items[key]
+            self.dirty = True
+
+    def stale_cells(self, bounds, max_age):
+        """
+        Get grid cells of region which were not refreshed during max_age seconds
+
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        :param max_age: maximum age of cell in seconds
+        :return: list of (row, column) tuples
+        """
+        now = time.time()
+        first = self.get_cell(bounds[0], bounds[1])
+        last = self.get_cell(bounds[2] - 1e-9, bounds[3] - 1e-9)
+        return [(row, column) for row in range(first[0], last[0] + 1) for column in range(first[1], last[1] + 1)
+                if now - self.refreshed.get((row, column), 0) > max_age]
+
+    def refresh(self, crawler, bounds, max_age=3600):
+        """
+        Refresh stale cells of region by MapCrawler
+
+        :param crawler: MapCrawler
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        :param max_age: maximum age of cell in seconds
+        :return: count of refreshed cells
+        """
+        count = 0
+        for cell in self.stale_cells(bounds, max_age):
+            cell_bounds = self.get_cell_bounds(cell)
+            result = crawler.crawl(cell_bounds)
+            if not result['failed']:
+                self.add_response(result, bounds=cell_bounds)
+                count += 1
+        return count
+
+    def build(self):
+        """
+        Get arrays (keys, latitudes, longitudes) sorted by latitude, they are rebuilt lazily after changes
+
+        :return: tuple (keys, lats, lons)
+        """
+        with self.lock:
+            if self.dirty:
+                keys = list(self.items)
+                lats = numpy.fromiter((self.items[key]['lat'] for key in keys), dtype=numpy.float64,
+                                      count=len(keys))
+                lons = numpy.fromiter((self.items[key]['lon'] for key in keys), dtype=numpy.float64,
+                                      count=len(keys))
+                order = numpy.argsort(lats, kind='stable')
+                self.arrays = ([keys[index] for index in order], lats[order], lons[order])
+                self.dirty = False
+            return self.arrays
+
+    @staticmethod
+    def candidates(lats, lat_min, lat_max):
+        first = numpy.searchsorted(lats, lat_min, side='left')
+        last = numpy.searchsorted(lats, lat_max, side='right')
+        return numpy.arange(first, last)
+
+    def select(self, keys, indexes, distances=None, kind=None, where=None):
+        """
+        Get items of array positions which pass filters
+
+        :param keys: keys array of build()
+        :param indexes: positions in arrays
+        :param distances: (optional) distances aligned with indexes
+        :param kind: (optional) 'device' or 'webcam'
+        :param where: (optional) filter callable(item)
+        :return: list of (distance, item) tuples
+        """
+        answer = []
+        for position, index in enumerate(indexes.tolist()):
+            key = keys[index]
+            item = self.items.get(key)
+            if item is None or (kind is not None and key[0] != kind) or (where is not None and not where(item)):
+                continue
+            answer.append((float(distances[position]) if distances is not None else None, item))
+        return answer
+
+    def nearby(self, lat, lon, radius, kind=None, where=None):
+        """
+        Get items within radius
+
+        :param lat: latitude (degrees)
+        :param lon: longitude (degrees)
+        :param radius: radius in km
+        :param kind: (optional) 'device' or 'webcam'
+        :param where: (optional) filter callable(item), i.e. lambda item: item.get('type') == 1
+        :return: list of (distance in km, item) tuples sorted by distance
+        """
+        keys, lats, lons = self.build()
+        degrees = radius / KM_PER_DEGREE
+        indexes = self.candidates(lats, lat - degrees, lat + degrees)
+        if not len(indexes):
+            return []
+        distances = haversine(lat, lon, lats[indexes], lons[indexes])
+        inside = numpy.flatnonzero(distances <= radius)
+        order = inside[numpy.argsort(distances[inside], kind='stable')]
+        return self.select(keys, indexes[order], distances[order], kind=kind, where=where)
+
+    def nearest(self, lat, lon, k=1, kind=None, where=None, max_radius=20000):
+        """
+        Get k nearest items (search radius is doubled until enough items found)
+
+        :param lat: latitude (degrees)
+        :param lon: longitude (degrees)
+        :param k: count of items
+        :param kind: (optional) 'device' or 'webcam'
+        :param where: (optional) filter callable(item)
+        :param max_radius: maximum search radius in km
+        :return: list of (distance in km, item) tuples sorted by distance
+        """
+        radius = self.cell_size * KM_PER_DEGREE
+        while True:
+            answer = self.nearby(lat, lon, radius, kind=kind, where=where)
+            if len(answer) >= k or radius >= max_radius:
+                return answer[:k]
+            radius = min(radius * 2, max_radius)
+
+    def within(self, bounds, kind=None, where=None):
+        """
+        Get items inside bounding box
+
+        :param bounds: [lat-min, lon-min, lat-max, lon-max]
+        :param kind: (optional) 'device' or 'webcam'
+        :param where: (optional) filter callable(item)
+        :return: list of items
+        """
+        keys, lats, lons = self.build()
+        indexes = self.candidates(lats, bounds[0], bounds[2])
+        inside = lons[indexes]
+        indexes = indexes[(inside >= bounds[1]) & (inside <= bounds[3])]
+        return [item for _, item in self.select(keys, indexes, kind=kind, where=where)]
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+import time
+
+from narodmon.tools import OK_CODES
+
+
+class Spool:
+    def __init__(self, path, synchronous='NORMAL'):
+        """
+        Durable append-only queue of sensors data (SQLite in WAL mode). Readings are stored before upload and
+        removed only after server confirmed them, so they survive network failures, maintenance and restarts.
+
+        :param path: path to spool file
+        :param synchronous: SQLite synchronous mode: 'NORMAL' - fsync on WAL checkpoints only (fast, safe against
+                            process crash), 'FULL' - fsync on each append (safe against power loss)
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(f'PRAGMA synchronous={synchronous}')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS readings (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                'mac TEXT, header TEXT, sensor TEXT)')
+
+    def append(self, devices):
+        """
+        Store devices data in one transaction. Readings without time are stamped with current time,
+        so replay sends them with original measurement time.
+
+        :param devices: list of device data (dicts with mac and sensors)
+        :return: tuple (list of stored seq numbers, devices with stamped sensors)
+        """
+        now = int(time.time())
+        rows = []
+        stamped = []
+        for device in devices:
+            header = {key: value for key, value in device.items() if key not in ('mac', 'sensors')}
+            sensors = [sensor if sensor.get('time') else dict(sensor, time=now) for sensor in device['sensors']]
+            stamped.append(dict(device, sensors=sensors))
+            header = json.dumps(header) if header else None
+            rows.extend((device.get('mac'), header, json.dumps(sensor)) for sensor in sensors)
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute('BEGIN')
+            seqs = []
+            for row in rows:
+                cursor.execute('INSERT INTO readings (mac, header, sensor) VALUES (?, ?, ?)', row)
+                seqs.append(cursor.lastrowid)
+            cursor.execute('COMMIT')
+        return seqs, stamped
+
+    def remove(self, seqs):
+        """
+        Remove confirmed readings
+
+        :param seqs: list of seq numbers
+        """
+        with self.lock:
+            self.connection.execute('BEGIN')
+            self.connection.executemany('DELETE FROM readings WHERE seq = ?', [(seq,) for seq in seqs])
+            self.connection.execute('COMMIT')
+
+    def peek(self, max_readings=1000):
+        """
+        Get oldest stored readings grouped by device
+
+        :param max_readings: maximum readings to get
+        :return: tuple (list of seq numbers, list of device data)
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT seq, mac, header, sensor FROM readings ORDER BY seq LIMIT ?',
+                                           (max_readings,)).fetchall()
+        seqs = []
+        devices = {}
+        for seq, mac, header, sensor in rows:
+            seqs.append(seq)
+            device = devices.setdefault(mac, {"mac": mac, "sensors": []})
+            if header:
+                device.update(json.loads(header))
+            device["sensors"].append(json.loads(sensor))
+        return seqs, list(devices.values())
+
+    def replay(self, send, max_readings=1000):
+        """
+        Drain backlog as bulk requests until spool is empty or server rejects data
+
+        :param send: callable(payload), returns response JSON (i.e. InterfaceJSON.post_payload)
+        :param max_readings: maximum readings in one bulk request
+        :return: count of confirmed readings
+        """
+        confirmed = 0
+        while True:
+            seqs, devices = self.peek(max_readings)
+            if not seqs:
+                return confirmed
+            response = send({"devices": devices})
+            if type(response) != dict or response.get('errno') not in OK_CODES:
+                return confirmed
+            self.remove(seqs)
+            confirmed += len(seqs)
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM readings').fetchone()[0]
+
+    def close(self):
+        """
+        Close spool file
+        """
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,59 @@
+import random
+import statistics
+
+import pytest
+
+from narodmon import Narodmon
+from narodmon.aggregation import Aggregator, P2Median
+
+
+def device(value, time, id_in='T1', mac='A'):
+    return [{"mac": mac, "sensors": [{"id": id_in, "value": value, "time": time}]}]
+
+
+@pytest.mark.parametrize('statistic, value, time', [('last', 3.0, 620), ('mean', 2.0, 620), ('min', 1.0, 610),
+                                                    ('max', 3.0, 620), ('median', 2.0, 620)])
+def test_window_statistic(statistic, value, time):
+    aggregator = Aggregator(window=60, statistics={'T1': statistic})
+    for sample_value, sample_time in ((2.0, 600), (1.0, 610), (3.0, 620)):
+        assert aggregator.add(device(sample_value, sample_time)) == {}
+    closed = aggregator.add(device(5.0, 660))
+    assert closed == {"A": [{"id": "T1", "value": value, "time": time}]}
+
+
+def test_statistic_by_class():
+    aggregator = Aggregator(statistics={'temperature': 'max'})
+    assert aggregator.get_statistic('DS18T2') == 'max'
+    assert aggregator.get_statistic('HPA') == 'mean'
+    assert aggregator.get_statistic('XYZ') == 'last'
+
+
+def test_p2_median_estimate():
+    generator = random.Random(1)
+    samples = [generator.gauss(20, 5) for _ in range(10000)]
+    median = P2Median()
+    for sample in samples:
+        median.add(sample)
+    assert abs(median.value() - statistics.median(samples)) < 0.3
+
+
+def test_flush():
+    aggregator = Aggregator(window=60)
+    aggregator.add(device(1.0, 600))
+    aggregator.add(device(2.0, 10**10, id_in='T2'))
+    assert aggregator.flush() == {"A": [{"id": "T1", "value": 1.0, "time": 600}]}
+    assert aggregator.flush(force=True) == {"A": [{"id": "T2", "value": 2.0, "time": 10**10}]}
+    assert aggregator.flush(force=True) == {}
+
+
+def test_aggregator_in_interface():
+    nm = Narodmon(mac='A', aggregator=Aggregator(window=60, statistics={'T1': 'mean'}))
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(payload) or {"errno": 200, "error": "OK"}
+    nm.via_json.send_short_data([{"id": "T1", "value": 1.0, "time": 600}])
+    nm.via_json.send_short_data([{"id": "T1", "value": 3.0, "time": 630}])
+    assert sent == []
+    nm.via_json.send_short_data([{"id": "T1", "value": 7.0, "time": 660}])
+    assert sent == [{"devices": [{"mac": "A", "sensors": [{"id": "T1", "value": 2.0, "time": 630}]}]}]
+    nm.via_json.flush_aggregator(force=True)
+    assert sent[-1] == {"devices": [{"mac": "A", "sensors": [{"id": "T1", "value": 7.0, "time": 660}]}]}
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from narodmon import archive as archive_module
+from narodmon.archive import HistoryArchive
+from narodmon.history import HistoryStore, HistorySync
+
+
+def points(times, value=1.0):
+    return [{"time": point_time, "value": value + point_time} for point_time in times]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return HistoryArchive(str(tmp_path / 'archive'))
+
+
+def test_append_and_range(archive):
+    assert archive.append(1, 'day', points(range(0, 100, 10))) == 10
+    assert archive.append(1, 'day', points(range(100, 200, 10))) == 10
+    times, values = archive.read(1, 'day', start=45, end=120)
+    assert list(times) == [50, 60, 70, 80, 90, 100, 110, 120]
+    assert list(values) == [51.0, 61.0, 71.0, 81.0, 91.0, 101.0, 111.0, 121.0]
+    assert archive.get_length(1, 'day') == 20
+    assert (1, 'day') in archive
+    assert (2, 'day') not in archive
+
+
+def test_merge_out_of_order(archive):
+    archive.append(1, 'day', points([10, 30]))
+    archive.append(1, 'day', points([20, 30], value=100.0))
+    times, values = archive.read(1, 'day')
+    assert list(times) == [10, 20, 30]
+    assert list(values) == [11.0, 120.0, 130.0]
+
+
+def test_read_without_numpy(archive, monkeypatch):
+    archive.append(1, 'day', points([10, 20, 30]))
+    monkeypatch.setattr(archive_module, 'numpy', None)
+    times, values = archive.read(1, 'day', start=15)
+    assert list(times) == [20, 30]
+    assert list(values) == [21.0, 31.0]
+
+
+def test_empty_read(archive):
+    times, values = archive.read(1, 'day')
+    assert len(times) == len(values) == 0
+
+
+def test_incomplete_tail_ignored(archive):
+    archive.append(1, 'day', points([10, 20]))
+    with open(archive.get_paths(1, 'day')[1], 'ab') as file:
+        file.write(b'\0' * 8)
+    assert archive.get_length(1, 'day') == 2
+    archive.append(1, 'day', points([30]))
+    assert list(archive.read(1, 'day')[1]) == [11.0, 21.0, 31.0]
+
+
+def test_sync_writes_archive(archive, tmp_path):
+    class FakeHistoryAPI:
+        def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
+            return {"data": [{"id": id_in, "time": 100, "value": 1.5}]}
+
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    HistorySync(FakeHistoryAPI(), store, archive=archive).sync(1, 'hour')
+    store.close()
+    assert list(archive.read(1, 'hour')[1]) == [1.5]
+
+
+def test_append_same_points_without_rewrite(archive):
+    archive.append(1, 'day', points([10, 20, 30]))
+    archive.append(1, 'day', points([20, 30, 40]))
+    archive.append(1, 'day', points([30, 50], value=100.0))
+    assert archive.get_generation(1, 'day') == 0
+    times, values = archive.read(1, 'day')
+    assert list(times) == [10, 20, 30, 40, 50]
+    assert list(values) == [11.0, 21.0, 130.0, 41.0, 150.0]
+
+
+def test_rewrite_switches_generation(archive):
+    archive.append(1, 'day', points([10, 30]))
+    archive.append(1, 'day', points([20]))
+    assert archive.get_generation(1, 'day') == 1
+    old_paths = archive.get_paths(1, 'day', 0)
+    archive.append(1, 'day', points([15]))
+    assert archive.get_generation(1, 'day') == 2
+    assert not any(os.path.exists(path) for path in old_paths)
+    assert list(archive.read(1, 'day')[0]) == [10, 15, 20, 30]
+    assert list(archive.load(1, 'day')[1]) == [11.0, 16.0, 21.0, 31.0]
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+from narodmon import Narodmon
+
+
+class FakeAsyncTransport:
+    def __init__(self):
+        self.payloads = []
+
+    async def post(self, url, json=None, headers=None, keys=None, data=None):
+        from narodmon.transport import BufferedResponse
+        self.payloads.append(json if data is None else self.decode(data))
+        return BufferedResponse(200, {"errno": 200, "error": "OK", "login": "user"})
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data)
+
+
+def test_async_api_same_payload_as_sync():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    nm.via_async_api.set_uuid('uuid')
+    transport = FakeAsyncTransport()
+    nm.via_async_api.transport = transport
+    response = asyncio.run(nm.via_async_api.sensors_values(sensors=[1, 2], trends=1))
+    assert response['errno'] == 200
+    assert transport.payloads == [{"cmd": "sensorsValues", "sensors": [1, 2], "uuid": "uuid",
+                                   "api_key": "key", "trends": 1}]
+
+
+def test_async_api_username():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    nm.via_async_api.transport = FakeAsyncTransport()
+    assert asyncio.run(nm.via_async_api.username()) == 'user'
+
+
+def test_async_json_send_short_data():
+    nm = Narodmon(mac='MAC')
+    transport = FakeAsyncTransport()
+    nm.via_async_json.transport = transport
+    sensor = nm.via_json.prepare_sensor_data(id_in='T1', value=1.5)
+    asyncio.run(nm.via_async_json.send_short_data(sensors=sensor))
+    assert transport.payloads == [nm.via_json.prepare_device_data_short(sensors=sensor)]
+
+
+def test_async_send_bulk_arrays_registers_devices():
+    nm = Narodmon(mac='A', name='n')
+    transport = FakeAsyncTransport()
+    nm.via_async_json.transport = transport
+    asyncio.run(nm.via_async_json.send_bulk_arrays(['A'], ['T1'], [1.0]))
+    asyncio.run(nm.via_async_json.send_bulk_arrays(['A'], ['T1'], [2.0]))
+    assert 'A' in nm.via_async_json.registry
+    assert 'name' in transport.payloads[0]['devices'][0]
+    assert transport.payloads[1]['devices'][0] == {"mac": "A", "sensors": [{"id": "T1", "value": 2.0}]}
+
+
+def test_async_flush_aggregator():
+    from narodmon.aggregation import Aggregator
+
+    nm = Narodmon(mac='A')
+    transport = FakeAsyncTransport()
+    nm.via_async_json.transport = transport
+    assert asyncio.run(nm.via_async_json.flush_aggregator()) is None
+    nm.via_async_json.set_aggregator(Aggregator(window=60))
+    assert asyncio.run(nm.via_async_json.flush_aggregator(force=True)) is None
+    asyncio.run(nm.via_async_json.send_short_data({"id": "T1", "value": 1.0, "time": 600}))
+    assert transport.payloads == []
+    response = asyncio.run(nm.via_async_json.flush_aggregator(force=True))
+    assert response['errno'] == 200
+    assert transport.payloads == [{"devices": [{"mac": "A", "sensors": [{"id": "T1", "value": 1.0, "time": 600}]}]}]
+
+
+@pytest.mark.parametrize('interface, name', [('via_async_api', 'catalog'), ('via_async_api', 'map_crawler'),
+                                             ('via_async_api', 'webcam_downloader'),
+                                             ('via_async_api', 'history_sync'),
+                                             ('via_async_json', 'batch_uploader'),
+                                             ('via_async_json', 'fleet_manager')])
+def test_async_sync_only_helpers(interface, name):
+    with pytest.raises(TypeError, match=name):
+        getattr(getattr(Narodmon(), interface), name)('path')
@@ -0,0 +1,61 @@
+import json
+import threading
+import time
+
+import pytest
+
+from narodmon.backfill import BackfillJob
+from narodmon.history import HistoryStore, HistorySync
+
+
+class FakeHistoryAPI:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
+        with self.lock:
+            self.requests.append((id_in, offset))
+        if (id_in, offset) in self.failing:
+            return {"errno": 429, "error": "Too many requests"}
+        end = int(time.time()) - offset * 3600
+        return {"data": [{"id": id_in, "time": end - 60, "value": 1.0}]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    yield store
+    store.close()
+
+
+def test_backfill_tasks(store, tmp_path):
+    api = FakeHistoryAPI()
+    progress = []
+    job = HistorySync(api, store).backfill([1, 2], 'hour', int(time.time()) - 5 * 3600 + 60,
+                                           checkpoint=str(tmp_path / 'job.json'), concurrency=3,
+                                           on_progress=progress.append)
+    result = job.run()
+    assert sorted(api.requests) == [(id_in, offset) for id_in in (1, 2) for offset in range(5)]
+    assert result['done'] == result['total'] == 10
+    assert result['points'] == 10
+    assert result['failed'] == []
+    assert len(progress) == 10
+    assert progress[-1]['eta'] == 0
+    with open(tmp_path / 'job.json') as file:
+        assert json.load(file)['done'] == 10
+
+
+def test_backfill_resume(store, tmp_path):
+    start = int(time.time()) - 3 * 3600 + 60
+    api = FakeHistoryAPI(failing=[(1, 2)])
+    checkpoint = str(tmp_path / 'job.json')
+    result = BackfillJob(HistorySync(api, store), [1], 'hour', start, checkpoint=checkpoint).run()
+    assert result['failed'] == [[1, 2, 429]]
+    api.failing.clear()
+    api.requests.clear()
+    result = BackfillJob(HistorySync(api, store), [1], 'hour', start, checkpoint=checkpoint).run()
+    assert api.requests == [(1, 2)]
+    assert result['done'] == result['total'] == 4
+    assert result['failed'] == []
@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+from narodmon.batching import BatchUploader
+
+
+class FakeInterface:
+    def __init__(self):
+        self.mac = 'DEFAULT'
+        self.sent = []
+        self.event = threading.Event()
+
+    def send_bulk_data(self, data):
+        self.sent.append(data)
+        self.event.set()
+        return {"errno": 200, "error": "OK"}
+
+
+def test_batch_merge_per_device():
+    interface = FakeInterface()
+    with BatchUploader(interface, max_age=60) as uploader:
+        uploader.add({"id": "T1", "value": 1})
+        uploader.add([{"id": "T1", "value": 2}, {"id": "H1", "value": 50}])
+        uploader.add({"id": "T1", "value": 3}, mac='OTHER')
+        assert uploader.flush(timeout=5)
+    assert interface.sent == [[{"mac": "DEFAULT", "sensors": [{"id": "T1", "value": 2}, {"id": "H1", "value": 50}]},
+                               {"mac": "OTHER", "sensors": [{"id": "T1", "value": 3}]}]]
+
+
+def test_batch_size_threshold():
+    interface = FakeInterface()
+    responses = []
+    with BatchUploader(interface, max_readings=2, max_age=60,
+                       on_response=lambda devices, response: responses.append(response)) as uploader:
+        uploader.add([{"id": "T1", "value": 1}, {"id": "T2", "value": 2}])
+        assert interface.event.wait(5)
+    assert len(interface.sent[0][0]["sensors"]) == 2
+    assert responses[0]["errno"] == 200
+
+
+def test_batch_age_threshold():
+    interface = FakeInterface()
+    with BatchUploader(interface, max_age=0.05) as uploader:
+        uploader.add({"id": "T1", "value": 1})
+        assert interface.event.wait(5)
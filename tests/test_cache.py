@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+
+from narodmon import Narodmon
+from narodmon.cache import ResponseCache
+from narodmon.transport import BufferedResponse
+
+
+def api_response(payload):
+    now = int(time.time())
+    if payload['cmd'] == 'sensorsValues':
+        return BufferedResponse(200, {"sensors": [{"id": id_in, "value": 1.0, "time": now - 10}
+                                                  for id_in in payload['sensors']]})
+    return BufferedResponse(200, {"webcams": [{"id": 1, "time": now}]})
+
+
+def decode(data):
+    return json.loads(data)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.payloads = []
+
+    def post(self, url, json=None, headers=None, keys=None, data=None):
+        payload = decode(data)
+        self.payloads.append(payload)
+        return api_response(payload)
+
+
+class FakeAsyncTransport(FakeTransport):
+    async def post(self, url, json=None, headers=None, keys=None, data=None):
+        return super().post(url, json=json, headers=headers, keys=keys, data=data)
+
+
+class IntIdTransport(FakeTransport):
+    def post(self, url, json=None, headers=None, keys=None, data=None):
+        payload = decode(data)
+        self.payloads.append(payload)
+        return api_response(dict(payload, sensors=[int(id_in) for id_in in payload['sensors']]))
+
+
+def test_cache_fetches_only_stale_sensors():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en', cache=ResponseCache())
+    nm.via_api.transport = transport = FakeTransport()
+    nm.via_api.sensors_values([1, 2])
+    response = nm.via_api.sensors_values([3, 2, 1])
+    assert [payload['sensors'] for payload in transport.payloads] == [[1, 2], [3]]
+    assert [sensor['id'] for sensor in response['sensors']] == [3, 2, 1]
+    nm.via_api.sensors_values([1, 2, 3])
+    assert len(transport.payloads) == 2
+
+
+def test_cache_string_sensor_ids():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en', cache=ResponseCache())
+    nm.via_api.transport = transport = IntIdTransport()
+    response = nm.via_api.sensors_values(['101', '102'])
+    assert [sensor['id'] for sensor in response['sensors']] == [101, 102]
+    response = nm.via_api.sensors_values(['102', 101])
+    assert [sensor['id'] for sensor in response['sensors']] == [102, 101]
+    assert len(transport.payloads) == 1
+
+
+def test_cache_scope_by_params():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en', cache=ResponseCache())
+    nm.via_api.transport = transport = FakeTransport()
+    nm.via_api.sensors_values([1])
+    nm.via_api.sensors_values([1], trends=1)
+    nm.via_api.webcams_nearby(lat=1.0, lon=2.0)
+    nm.via_api.webcams_nearby(lat=1.0, lon=2.0)
+    nm.via_api.webcams_nearby(lat=1.0, lon=3.0)
+    assert len(transport.payloads) == 4
+
+
+def test_ttl_by_cadence():
+    cache = ResponseCache(default_ttl=60, min_ttl=10, max_ttl=900)
+    assert cache.item_ttl('sensor', {"id": 1, "time": 1000}, now=1010) == 60
+    assert cache.item_ttl('sensor', {"id": 1, "time": 1300}, now=1310) == 290
+    assert cache.item_ttl('sensor', {"id": 1, "time": 1300}, now=2000) == 10
+
+
+def test_lru_memory_cap():
+    cache = ResponseCache(max_bytes=1000)
+    for index in range(20):
+        cache.put(('key', index), {"value": 'x' * 100}, 60)
+    assert cache.size <= 1000
+    assert cache.get(('key', 0)) is None
+    assert cache.get(('key', 19)) == {"value": 'x' * 100}
+
+
+def test_expired_entry():
+    cache = ResponseCache()
+    cache.put(('key',), {"value": 1}, 0)
+    assert cache.get(('key',)) is None
+    assert len(cache) == 0
+
+
+def test_async_cache():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en', cache=ResponseCache())
+    nm.via_async_api.transport = transport = FakeAsyncTransport()
+    asyncio.run(nm.via_async_api.sensors_values([1, 2]))
+    response = asyncio.run(nm.via_async_api.sensors_values([2, 3]))
+    assert [payload['sensors'] for payload in transport.payloads] == [[1, 2], [3]]
+    assert [sensor['id'] for sensor in response['sensors']] == [2, 3]
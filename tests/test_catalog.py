@@ -0,0 +1,93 @@
+import json
+import time
+from multiprocessing.pool import ThreadPool
+
+from narodmon import Narodmon
+from narodmon.catalog import Catalog
+
+RESPONSE = {"types": [{"type": 1, "name": "Temperature", "unit": "°C"}, {"type": 2, "name": "Humidity",
+                                                                         "unit": "%"}],
+            "favorites": [10, 20]}
+
+
+class FakeInitAPI:
+    def __init__(self, response=RESPONSE):
+        self.response = response
+        self.requests = 0
+
+    def app_init(self, lang=None, **kwargs):
+        self.requests += 1
+        time.sleep(0.05)
+        return self.response
+
+
+def test_catalog_from_memory(tmp_path):
+    api = FakeInitAPI()
+    catalog = Catalog(api, str(tmp_path / 'catalog.json'))
+    assert catalog.get_type(1)['unit'] == '°C'
+    assert catalog.get_type(2)['name'] == 'Humidity'
+    assert catalog.favorites == [10, 20]
+    assert api.requests == 1
+
+
+def test_catalog_shared_file(tmp_path):
+    path = str(tmp_path / 'catalog.json')
+    api = FakeInitAPI()
+    catalogs = [Catalog(api, path) for _ in range(4)]
+    with ThreadPool(4) as pool:
+        pool.map(lambda catalog: catalog.load(), catalogs)
+    assert api.requests == 1
+    assert all(catalog.types.keys() == {1, 2} for catalog in catalogs)
+
+
+def test_catalog_refresh_when_old(tmp_path):
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps({"fetched": time.time() - 2 * 86400, "response": {"types": []}}))
+    api = FakeInitAPI()
+    catalog = Catalog(api, str(path))
+    catalog.load()
+    assert api.requests == 1
+    assert json.loads(path.read_text())['response'] == RESPONSE
+
+
+def test_catalog_keeps_old_data_on_error(tmp_path):
+    catalog = Catalog(FakeInitAPI(), str(tmp_path / 'catalog.json'), max_age=0)
+    catalog.load()
+    catalog.interface = FakeInitAPI({"errno": 503, "error": "Maintenance"})
+    catalog.load()
+    assert catalog.get_type(1)['name'] == 'Temperature'
+
+
+def test_catalog_backs_off_after_error(tmp_path):
+    api = FakeInitAPI({"errno": 503, "error": "Maintenance"})
+    catalog = Catalog(api, str(tmp_path / 'catalog.json'), check_interval=600)
+    assert catalog.get_type(1) is None
+    assert catalog.get_type(2) is None
+    assert catalog.favorites == []
+    assert api.requests == 1
+    catalog.attempted -= 600
+    catalog.interface = FakeInitAPI()
+    assert catalog.get_type(1)['name'] == 'Temperature'
+    assert catalog.attempted is None
+
+
+def test_catalog_favorites_loads(tmp_path):
+    api = FakeInitAPI()
+    catalog = Catalog(api, str(tmp_path / 'catalog.json'))
+    assert catalog.favorites == [10, 20]
+    assert api.requests == 1
+
+
+def test_catalog_background_thread(tmp_path):
+    api = FakeInitAPI()
+    catalog = Catalog(api, str(tmp_path / 'catalog.json'), check_interval=0.01)
+    catalog.start()
+    time.sleep(0.2)
+    catalog.stop()
+    assert api.requests == 1
+    assert catalog.favorites == [10, 20]
+
+
+def test_catalog_factory(tmp_path):
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    assert nm.via_api.catalog(str(tmp_path / 'catalog.json')).interface is nm.via_api
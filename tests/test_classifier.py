@@ -0,0 +1,59 @@
+import pytest
+
+from narodmon import Narodmon
+from narodmon.classifier import SensorClassifier
+from narodmon.sensor_batch import SensorBatch
+from narodmon.settings import sensor_dict
+
+
+def linear_class(id_in):
+    id_in = id_in.upper()
+    found, found_length = None, -1
+    for class_name, patterns in sensor_dict.items():
+        for pattern in patterns:
+            if pattern == id_in:
+                return class_name
+            if pattern.endswith('*') and id_in.startswith(pattern[:-1]) and len(pattern) > found_length:
+                found, found_length = class_name, len(pattern)
+    return found
+
+
+@pytest.mark.parametrize('id_in, class_name', [('T1', 'temperature'), ('ds18t2', 'temperature'), ('RH', 'humidity'),
+                                               ('HPA', 'pressure'), ('WS1', 'wind_speed'), ('WH', 'power_energy'),
+                                               ('XYZ', None), ('', None)])
+def test_classify(id_in, class_name):
+    assert SensorClassifier().classify(id_in) == class_name
+
+
+def test_same_as_linear_scan():
+    classifier = SensorClassifier()
+    ids = [pattern.rstrip('*') + suffix for patterns in sensor_dict.values() for pattern in patterns
+           for suffix in ('', '1', 'X2', 'T')]
+    assert classifier.classify_many(ids) == [linear_class(id_in) for id_in in ids]
+
+
+def test_exact_and_longest_prefix():
+    classifier = SensorClassifier({'a': ['T*', 'TX'], 'b': ['TEM*'], 'c': ['*']})
+    assert classifier.classify('TX') == 'a'
+    assert classifier.classify('TXY') == 'a'
+    assert classifier.classify('TEMP') == 'b'
+    assert classifier.classify('TE') == 'a'
+    assert classifier.classify('Q') == 'c'
+
+
+def test_units():
+    classifier = SensorClassifier()
+    assert classifier.get_units(['T1', 'HPA', 'MMHG', 'KMH', 'XYZ']) == ['°C', 'hPa', 'mmHg', 'km/h', None]
+
+
+def test_fill_units():
+    nm = Narodmon(mac='A', classifier=SensorClassifier())
+    sensors = [{"id": "T1", "value": 1.0}, {"id": "H1", "value": 2.0, "unit": "RH"}, {"id": "XYZ", "value": 3.0}]
+    payload = nm.via_json.fill_units({"devices": [{"mac": "A", "sensors": sensors}]})
+    assert [sensor.get('unit') for sensor in payload['devices'][0]['sensors']] == ['°C', 'RH', None]
+    assert 'unit' not in sensors[0]
+
+    batch = SensorBatch.from_columns(['T1', 'XYZ'], [1.0, 2.0])
+    payload = nm.via_json.fill_units({"devices": [{"mac": "A", "sensors": batch}]})
+    assert payload['devices'][0]['sensors'].units == ['°C', None]
+    assert batch.units is None
@@ -0,0 +1,59 @@
+import threading
+
+from narodmon import Narodmon
+from narodmon.crawler import MapCrawler
+
+POINTS = [(55.0 + index * 0.01, 37.0 + (index % 10) * 0.1) for index in range(100)]
+
+
+class FakeMapAPI:
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def map_bounds(self, bounds, limit, lang=None, api_key=None, uuid=None):
+        with self.lock:
+            self.requests.append(bounds)
+        lat_min, lon_min, lat_max, lon_max = bounds
+        inside = [index for index, (lat, lon) in enumerate(POINTS)
+                  if lat_min <= lat <= lat_max and lon_min <= lon <= lon_max]
+        return {"devices": [{"id": index, "lat": POINTS[index][0], "lon": POINTS[index][1]}
+                            for index in inside[:limit]],
+                "webcams": [{"id": 1000 + index} for index in inside[:2]]}
+
+
+def test_crawl_splits_saturated_tiles():
+    api = FakeMapAPI()
+    result = MapCrawler(api, limit=20).crawl([54.9, 36.9, 56.1, 38.1])
+    assert sorted(device['id'] for device in result['devices']) == list(range(100))
+    assert len(result['webcams']) == len({webcam['id'] for webcam in result['webcams']})
+    assert result['requests'] == len(api.requests) > 1
+    assert result['failed'] == [] and result['truncated'] == []
+
+
+def test_crawl_cached_tiles():
+    api = FakeMapAPI()
+    crawler = MapCrawler(api, limit=20)
+    crawler.crawl([54.9, 36.9, 56.1, 38.1])
+    count = len(api.requests)
+    result = crawler.crawl([54.9, 36.9, 56.1, 38.1])
+    assert len(api.requests) == count
+    assert result['requests'] == 0
+    assert len(result['devices']) == 100
+
+
+def test_crawl_max_depth_and_failures():
+    class FailingAPI:
+        def map_bounds(self, bounds, limit, lang=None, api_key=None, uuid=None):
+            return {"errno": 429, "error": "Too many requests"}
+
+    result = MapCrawler(FakeMapAPI(), limit=20, max_depth=0).crawl([54.9, 36.9, 56.1, 38.1])
+    assert result['tiles'] == 1
+    assert result['truncated'] == [[54.9, 36.9, 56.1, 38.1]]
+    result = MapCrawler(FailingAPI()).crawl([0, 0, 1, 1])
+    assert result['failed'] == [{"bounds": [0, 0, 1, 1], "error": {"errno": 429, "error": "Too many requests"}}]
+
+
+def test_map_crawler_factory():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    assert nm.via_api.map_crawler(limit=30).limit == 30
@@ -0,0 +1,47 @@
+import pytest
+
+from narodmon import Narodmon
+from narodmon.filters import DeadbandFilter
+from narodmon.tools import sensor_class
+
+
+@pytest.mark.parametrize('id_in, class_name', [('TEMPC', 'temperature'), ('T1', 'temperature'),
+                                               ('DS18T2', 'temperature'), ('RH1', 'humidity'),
+                                               ('HPA', 'pressure'), ('VBAT', 'voltage'), ('XYZ', None)])
+def test_sensor_class(id_in, class_name):
+    assert sensor_class(id_in) == class_name
+
+
+def device(value, time, id_in='T1'):
+    return [{"mac": "A", "sensors": [{"id": id_in, "value": value, "time": time}]}]
+
+
+def test_deadband_drops_small_changes():
+    deadband = DeadbandFilter(heartbeat=900)
+    deadband.commit(device(20.0, 0))
+    assert deadband.apply(device(20.05, 60)) == []
+    assert deadband.apply(device(20.5, 60)) == device(20.5, 60)
+
+
+def test_deadband_percent():
+    deadband = DeadbandFilter(deadbands={'power': (0, 10)})
+    deadband.commit(device(100, 0, id_in='P1'))
+    assert deadband.apply(device(105, 60, id_in='P1')) == []
+    assert deadband.apply(device(115, 60, id_in='P1')) != []
+
+
+def test_deadband_heartbeat():
+    deadband = DeadbandFilter(heartbeat=300)
+    deadband.commit(device(20.0, 0))
+    assert deadband.apply(device(20.0, 299)) == []
+    assert deadband.apply(device(20.0, 300)) == device(20.0, 300)
+
+
+def test_deadband_in_interface():
+    nm = Narodmon(mac='A', deadband=DeadbandFilter())
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(payload) or {"errno": 200, "error": "OK"}
+    nm.via_json.send_bulk_data(device(20.0, 100))
+    response = nm.via_json.send_bulk_data(device(20.01, 160))
+    assert len(sent) == 1
+    assert response['errno'] == 200
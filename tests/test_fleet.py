@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from narodmon import Narodmon
+
+
+@pytest.fixture
+def fleet_nm():
+    nm = Narodmon()
+    nm.sent = []
+    lock = threading.Lock()
+
+    def post_payload(payload):
+        with lock:
+            nm.sent.append(payload)
+        if any(device['mac'] == 'BAD' for device in payload['devices']):
+            return {"errno": 400, "error": "Syntax error"}
+        return {"errno": 200, "error": "OK"}
+
+    nm.via_json.post_payload = post_payload
+    return nm
+
+
+def test_fleet_shards_by_device_count(fleet_nm):
+    fleet = fleet_nm.via_json.fleet_manager(max_devices=2)
+    for index in range(5):
+        fleet.add_device(f'MAC{index}', name=f'device{index}')
+        fleet.add(f'MAC{index}', {"id": "T1", "value": index})
+    results = fleet.flush()
+    assert len(fleet_nm.sent) == 3
+    assert all(success for success, response in results.values())
+    assert fleet.flush() == {}
+
+
+def test_fleet_shards_by_size(fleet_nm):
+    fleet = fleet_nm.via_json.fleet_manager(max_bytes=200)
+    for index in range(4):
+        fleet.add(f'MAC{index}', [{"id": f"T{sensor}", "value": sensor} for sensor in range(5)])
+    fleet.flush()
+    assert len(fleet_nm.sent) == 4
+
+
+def test_fleet_full_then_short(fleet_nm):
+    fleet = fleet_nm.via_json.fleet_manager()
+    fleet.add_device('MAC', name='device')
+    fleet.add('MAC', {"id": "T1", "value": 1})
+    fleet.flush()
+    fleet.add('MAC', {"id": "T1", "value": 2})
+    fleet.flush()
+    assert fleet_nm.sent[0]['devices'][0]['name'] == 'device'
+    assert fleet_nm.sent[1]['devices'][0] == {"mac": "MAC", "sensors": [{"id": "T1", "value": 2}]}
+
+
+def test_fleet_reports_failures(fleet_nm):
+    fleet = fleet_nm.via_json.fleet_manager(max_devices=1)
+    fleet.add('GOOD', {"id": "T1", "value": 1})
+    fleet.add('BAD', {"id": "T1", "value": 1})
+    results = fleet.flush()
+    assert results['GOOD'][0] and not results['BAD'][0]
+
+
+def test_fleet_does_not_use_interface_metadata(fleet_nm):
+    fleet_nm.via_json.set_name('gateway')
+    fleet_nm.via_json.set_lat(55.0)
+    fleet = fleet_nm.via_json.fleet_manager()
+    fleet.add('DEV1', {"id": "T1", "value": 1})
+    fleet.add_device('DEV2', name='device')
+    fleet.add('DEV2', {"id": "T1", "value": 1})
+    fleet.flush()
+    devices = {device['mac']: device for device in fleet_nm.sent[0]['devices']}
+    assert devices['DEV1'] == {"mac": "DEV1", "sensors": [{"id": "T1", "value": 1}]}
+    assert devices['DEV2']['name'] == 'device' and devices['DEV2']['lat'] is None
+
+
+def test_fleet_requeues_undelivered(fleet_nm):
+    responses = [{"errno": 503, "error": "Maintenance"}, {"errno": 200, "error": "OK"}]
+    fleet_nm.via_json.post_payload = lambda payload: fleet_nm.sent.append(payload) or responses.pop(0)
+    fleet = fleet_nm.via_json.fleet_manager()
+    fleet.add('MAC', {"id": "T1", "value": 1})
+    assert not fleet.flush()['MAC'][0]
+    fleet.add('MAC', {"id": "T1", "value": 2})
+    assert fleet.flush()['MAC'][0]
+    assert [sensor['value'] for sensor in fleet_nm.sent[1]['devices'][0]['sensors']] == [1, 2]
+    assert fleet.flush() == {}
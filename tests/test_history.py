@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from narodmon import Narodmon
+from narodmon.history import HistoryStore, HistorySync
+
+
+class FakeHistoryAPI:
+    def __init__(self, step=600):
+        self.step = step
+        self.requests = []
+
+    def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
+        self.requests.append((id_in, period, offset))
+        end = int(time.time()) - offset * 86400
+        return {"data": [{"id": int(id_in), "time": point_time - point_time % self.step, "value": 1.0}
+                         for point_time in range(end - 86400 + self.step, end + 1, self.step)]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history.db'))
+    yield store
+    store.close()
+
+
+def test_sync_fetches_only_missing_windows(store):
+    api = FakeHistoryAPI()
+    sync = HistorySync(api, store)
+    now = int(time.time())
+    assert sync.sync(1, 'day', now - 2 * 86400 + 100, now) > 0
+    assert [request[2] for request in api.requests] == [0, 1]
+    sync.sync(1, 'day', now - 3 * 86400 + 100, now - 86400)
+    assert [request[2] for request in api.requests] == [0, 1, 2]
+
+
+def test_points_deduplicated(store):
+    api = FakeHistoryAPI()
+    sync = HistorySync(api, store, min_gap=0)
+    first = sync.history(1, 'day')
+    time.sleep(1.1)
+    second = sync.history(1, 'day')
+    assert len(api.requests) == 2
+    assert len({point[0] for point in second}) == len(second)
+    assert len(second) - len(first) <= 1
+
+
+def test_coverage_merge_and_missing(store):
+    store.add(1, 'hour', [], 0, 100)
+    store.add(1, 'hour', [], 200, 300)
+    store.add(1, 'hour', [], 50, 150)
+    assert store.get_coverage(1, 'hour') == [(0, 150), (200, 300)]
+    assert store.missing(1, 'hour', 0, 400) == [(150, 200), (300, 400)]
+
+
+def test_failed_window_not_covered(store):
+    class FailingAPI:
+        def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
+            return {"errno": 429, "error": "Too many requests"}
+
+    sync = HistorySync(FailingAPI(), store)
+    assert sync.sync(1, 'hour') == 0
+    assert store.get_coverage(1, 'hour') == []
+
+
+def test_string_id_matches_numeric_response_id(store):
+    sync = HistorySync(FakeHistoryAPI(), store)
+    assert len(sync.history('123', 'hour')) > 0
+
+
+def test_window_of_other_sensor_not_covered(store):
+    class OtherSensorAPI:
+        def sensors_history(self, id_in, period, offset, api_key=None, uuid=None):
+            return {"data": [{"id": 999, "time": int(time.time()), "value": 1.0}]}
+
+    sync = HistorySync(OtherSensorAPI(), store)
+    assert sync.sync(1, 'hour') == 0
+    assert store.get_coverage(1, 'hour') == []
+
+
+def test_history_sync_factory(store):
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    assert nm.via_api.history_sync(store).interface is nm.via_api
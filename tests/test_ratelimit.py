@@ -0,0 +1,56 @@
+import pytest
+
+from narodmon.exceptions import RateLimitedError
+from narodmon.ratelimit import RateLimiter
+
+
+def test_ratelimit_no_budget_no_delay():
+    limiter = RateLimiter()
+    assert limiter.reserve([('key', 'K')]) == 0
+    assert limiter.reserve([('key', 'K')]) == 0
+
+
+def test_ratelimit_default_device_budget():
+    limiter = RateLimiter()
+    assert limiter.reserve([('mac', 'A')]) == 0
+    with pytest.raises(RateLimitedError):
+        limiter.reserve([('mac', 'A')])
+    limiter = RateLimiter(max_wait=None)
+    assert limiter.reserve([('mac', 'A')]) == 0
+    assert limiter.reserve([('mac', 'A')]) == pytest.approx(60, abs=1)
+    limiter = RateLimiter(budgets={'mac': (1, 0)})
+    assert limiter.reserve([('mac', 'A')]) == 0
+    assert limiter.reserve([('mac', 'A')]) == 0
+
+
+def test_ratelimit_budget_per_key():
+    limiter = RateLimiter(budgets={'mac': (1, 60)}, max_wait=None)
+    assert limiter.reserve([('mac', 'A')]) == 0
+    assert limiter.reserve([('mac', 'B')]) == 0
+    assert limiter.reserve([('mac', 'A')]) == pytest.approx(60, abs=1)
+
+
+def test_ratelimit_override():
+    limiter = RateLimiter(budgets={'endpoint': (1, 10)}, max_wait=None)
+    limiter.set_budget('endpoint', 1, 100, name='sensorsValues')
+    limiter.reserve([('endpoint', 'sensorsValues')])
+    limiter.reserve([('endpoint', 'mapBounds')])
+    assert limiter.reserve([('endpoint', 'sensorsValues')]) == pytest.approx(100, abs=1)
+    assert limiter.reserve([('endpoint', 'mapBounds')]) == pytest.approx(10, abs=1)
+
+
+def test_ratelimit_throttle_and_relax():
+    limiter = RateLimiter(penalty=60, max_penalty=300)
+    limiter.update([('key', 'K')], 429)
+    assert limiter.states[('key', 'K')].interval == 60
+    limiter.update([('key', 'K')], 429)
+    assert limiter.states[('key', 'K')].interval == 120
+    limiter.update([('key', 'K')], 200)
+    assert limiter.states[('key', 'K')].interval == pytest.approx(108)
+
+
+def test_ratelimit_max_wait():
+    limiter = RateLimiter(budgets={'mac': (1, 60)}, max_wait=1)
+    limiter.reserve([('mac', 'A')])
+    with pytest.raises(RateLimitedError):
+        limiter.reserve([('mac', 'A')])
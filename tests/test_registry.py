@@ -0,0 +1,60 @@
+import pytest
+
+from narodmon import Narodmon
+from narodmon.aggregation import Aggregator
+from narodmon.filters import DeadbandFilter
+from narodmon.registry import DeviceRegistry
+
+
+def test_registry_needs_full():
+    registry = DeviceRegistry()
+    assert registry.needs_full('A', 'name', 'owner', 1, 2, 3)
+    registry.register('A', 'name', 'owner', 1, 2, 3)
+    assert not registry.needs_full('A', 'name', 'owner', 1, 2, 3)
+    assert registry.needs_full('A', 'other', 'owner', 1, 2, 3)
+
+
+def test_registry_persisted(tmp_path):
+    path = str(tmp_path / 'registry.json')
+    DeviceRegistry(path).register('A', 'name', 'owner', 1.5, 2.5, 3)
+    registry = DeviceRegistry(path)
+    assert 'A' in registry
+    assert not registry.needs_full('A', 'name', 'owner', 1.5, 2.5, 3)
+
+
+def test_send_data_full_then_short():
+    nm = Narodmon(mac='A', name='name', owner='owner', lat=1, lon=2, alt=3)
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(payload) or {"errno": 200, "error": "OK"}
+    sensor = nm.via_json.prepare_sensor_data(id_in='T1', value=1)
+    nm.via_json.send_data(sensors=sensor)
+    nm.via_json.send_data(sensors=sensor)
+    assert sent[0] == {"devices": [nm.via_json.prepare_device_data_full(sensors=sensor)]}
+    assert sent[1] == {"devices": [{"mac": "A", "sensors": [sensor]}]}
+
+
+def test_send_data_full_until_accepted():
+    nm = Narodmon(mac='A', name='name')
+    nm.via_json.post_payload = lambda payload: {"errno": 503, "error": "Maintenance"}
+    sensor = nm.via_json.prepare_sensor_data(id_in='T1', value=1)
+    nm.via_json.send_data(sensors=sensor)
+    assert 'name' in nm.via_json.prepare_device_data(sensors=sensor)
+
+
+def test_not_registered_while_aggregated():
+    nm = Narodmon(mac='A', name='name', aggregator=Aggregator(window=60))
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(payload) or {"errno": 200, "error": "OK"}
+    nm.via_json.send_data(sensors={"id": "T1", "value": 1.0, "time": 600})
+    assert sent == [] and 'A' not in nm.via_json.registry
+    nm.via_json.send_data(sensors={"id": "T1", "value": 2.0, "time": 660})
+    assert sent[0]['devices'][0]['name'] == 'name'
+    assert 'A' in nm.via_json.registry
+
+
+def test_metadata_change_not_registered_if_filtered_by_deadband():
+    nm = Narodmon(mac='A', name='name', deadband=DeadbandFilter(default=(1, 0)))
+    nm.via_json.post_payload = lambda payload: {"errno": 200, "error": "OK"}
+    nm.via_json.send_data(sensors={"id": "T1", "value": 1.0})
+    nm.via_json.send_data(sensors={"id": "T1", "value": 1.0}, name='renamed')
+    assert nm.via_json.registry.needs_full('A', 'renamed', None, None, None, None)
@@ -0,0 +1,113 @@
+import json
+import time
+
+import pytest
+import requests
+
+from narodmon.ratelimit import RateLimiter
+from narodmon.retry import RetryPolicy, CircuitBreaker
+from narodmon.transport import Transport
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode()
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, json=None, data=None, headers=None, timeout=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def fake_transport(responses, **kwargs):
+    transport = Transport(**kwargs)
+    transport.session = FakeSession(responses)
+    return transport
+
+
+def test_retry_delay_bounds():
+    policy = RetryPolicy(max_attempts=5, base_delay=1, max_delay=4)
+    for attempt in range(4):
+        assert 0 <= policy.delay(attempt) <= min(4, 2 ** attempt)
+    assert policy.delay(4) is None
+
+
+def test_retry_errno_then_ok():
+    transport = fake_transport([FakeResponse(200, {"errno": 503, "error": "Maintenance"}),
+                                FakeResponse(200, {"errno": 200, "error": "OK"})],
+                               retry_policy=RetryPolicy(base_delay=0.001))
+    assert transport.post('url', json={}).errno() == 200
+    assert transport.session.calls == 2
+
+
+def test_retry_connection_error():
+    transport = fake_transport([requests.ConnectionError(), FakeResponse(200, {"errno": 200, "error": "OK"})],
+                               retry_policy=RetryPolicy(base_delay=0.001))
+    assert transport.post('url', json={}).errno() == 200
+
+
+def test_retry_gives_up():
+    transport = fake_transport([FakeResponse(502, {"errno": 502})] * 2,
+                               retry_policy=RetryPolicy(max_attempts=2, base_delay=0.001))
+    assert transport.post('url', json={}).status_code == 502
+    assert transport.session.calls == 2
+
+
+def test_circuit_breaker_maintenance_fails_fast():
+    transport = fake_transport([FakeResponse(200, {"errno": 503, "error": "Maintenance"})],
+                               circuit_breaker=CircuitBreaker())
+    transport.post('url', json={}, keys=[('key', 'K')])
+    response = transport.post('url', json={}, keys=[('key', 'K')])
+    assert response.local and response.errno() == 503
+    assert transport.session.calls == 1
+
+
+def test_circuit_breaker_key_blocked():
+    breaker = CircuitBreaker()
+    breaker.record([('endpoint', 'sensorsValues'), ('key', 'K')], 423)
+    assert breaker.check([('key', 'K')])['errno'] == 423
+    assert breaker.check([('key', 'OTHER')]) is None
+
+
+def test_circuit_breaker_half_open():
+    breaker = CircuitBreaker(maintenance_cooldown=0, failure_cooldown=60)
+    breaker.record([], 503)
+    assert breaker.check([]) is None
+    assert breaker.check([])['errno'] == 503
+    breaker.record([], 200)
+    assert breaker.check([]) is None
+
+
+def test_retry_counts_rate_limiter_wait():
+    limiter = RateLimiter(penalty=60)
+    transport = fake_transport([FakeResponse(200, {"errno": 429, "error": "Too many requests"})] * 3,
+                               retry_policy=RetryPolicy(max_attempts=3, base_delay=0.001, max_elapsed=10),
+                               rate_limiter=limiter)
+    started = time.monotonic()
+    assert transport.post('url', json={}, keys=[('key', 'K')]).errno() == 429
+    assert transport.session.calls == 1
+    assert time.monotonic() - started < 1
+
+
+def test_retry_delay_includes_wait():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_elapsed=10)
+    assert policy.delay(0, elapsed=9.5, wait=1) is None
+    assert policy.delay(0, elapsed=11) is None
+    assert policy.delay(0, elapsed=1, wait=5) is not None
+
+
+def test_rate_limited_request_not_sent():
+    transport = fake_transport([FakeResponse(200, {"errno": 200, "error": "OK"})] * 2, rate_limiter=RateLimiter())
+    assert transport.post('url', json={}, keys=[('mac', 'A')]).errno() == 200
+    response = transport.post('url', json={}, keys=[('mac', 'A')])
+    assert response.local and response.errno() == 429
+    assert transport.session.calls == 1
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from narodmon import Narodmon
+from narodmon.sensor_batch import SensorBatch
+from narodmon.tools import encode_json
+
+
+def test_sensor_batch_iter_same_as_prepare_sensor_data():
+    nm = Narodmon()
+    batch = SensorBatch()
+    batch.append('T1', 1.5)
+    batch.append('H1', 50.0, unit='%', utc_time=100, name='humidity')
+    assert list(batch) == [nm.via_json.prepare_sensor_data(id_in='T1', value=1.5),
+                           nm.via_json.prepare_sensor_data(id_in='H1', value=50.0, name='humidity', unit='%',
+                                                           utc_time=100)]
+
+
+def test_sensor_batch_encode():
+    batch = SensorBatch.from_columns(['T1', 'T"2'], [1.25, -3.0], times=[0, 10])
+    assert json.loads(batch.encode()) == list(batch)
+
+
+def test_sensor_batch_columns_length():
+    with pytest.raises(ValueError):
+        SensorBatch.from_columns(['T1'], [1.0, 2.0])
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), float('-inf')])
+def test_sensor_batch_not_finite_rejected(value):
+    with pytest.raises(ValueError):
+        SensorBatch.from_columns(['T1', 'T2'], [1.0, value])
+    batch = SensorBatch()
+    with pytest.raises(ValueError):
+        batch.append('T1', value)
+    assert len(batch) == 0 and batch.encode() == b'[]'
+
+
+def test_sensor_batch_payload_body():
+    nm = Narodmon(mac='A')
+    batch = SensorBatch.from_columns(['T1'], [1.0])
+    payload = {"devices": [nm.via_json.prepare_device_data(sensors=batch)]}
+    body = nm.via_json.request_body(payload)
+    assert json.loads(body['data']) == {"devices": [{"mac": "A", "name": None, "owner": None, "lat": None,
+                                                     "lon": None, "alt": None, "sensors": [{"id": "T1",
+                                                                                            "value": 1.0}]}]}
+    assert json.loads(encode_json({"a": [1, "b", None]})) == {"a": [1, "b", None]}
+
+
+def test_prepare_sensor_batch_drops_nan_and_rounds():
+    nm = Narodmon()
+    batch = nm.via_json.prepare_sensor_batch(['T1', 'T2', 'T3'], [1.2345, float('nan'), 3.0],
+                                             times=[10, 20, float('nan')], decimals=2)
+    assert list(batch) == [{"id": "T1", "value": 1.23, "time": 10}, {"id": "T3", "value": 3.0}]
+
+
+def test_prepare_sensor_batch_from_lists():
+    batch = SensorBatch.from_lists(['T1', 'T2'], [1.0, float('inf')], units=['C', 'C'])
+    assert list(batch) == [{"id": "T1", "value": 1.0, "unit": "C"}]
+
+
+def test_prepare_sensor_batch_from_columns_dict():
+    nm = Narodmon()
+    batch = nm.via_json.prepare_sensor_batch({"id": ['T1'], "value": [2.0]})
+    assert list(batch) == [{"id": "T1", "value": 2.0}]
+
+
+def test_send_bulk_arrays_groups_devices():
+    nm = Narodmon()
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(json.loads(nm.via_json.request_body(payload)['data'])) \
+        or {"errno": 200, "error": "OK"}
+    nm.via_json.send_bulk_arrays(['A', 'B', 'A'], ['T1', 'T1', 'T2'], [1.0, 2.0, float('nan')])
+    devices = {device['mac']: device['sensors'] for device in sent[0]['devices']}
+    assert devices == {"A": [{"id": "T1", "value": 1.0}], "B": [{"id": "T1", "value": 2.0}]}
+
+
+def test_send_bulk_arrays_metadata_only_for_own_device():
+    nm = Narodmon(mac='A', name='n')
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(json.loads(nm.via_json.request_body(payload)['data'])) \
+        or {"errno": 200, "error": "OK"}
+    nm.via_json.send_bulk_arrays(['A', 'B'], ['T1', 'T1'], [1.0, 2.0])
+    devices = {device['mac']: device for device in sent[0]['devices']}
+    assert devices['A']['name'] == 'n'
+    assert devices['B'] == {"mac": "B", "sensors": [{"id": "T1", "value": 2.0}]}
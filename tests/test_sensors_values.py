@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from narodmon import Narodmon
+from narodmon.transport import BufferedResponse
+
+
+def values_response(data):
+    sensors = json.loads(data)['sensors']
+    if 13 in sensors:
+        return BufferedResponse(200, {"errno": 429, "error": "Too many requests"})
+    return BufferedResponse(200, {"sensors": [{"id": id_in, "value": id_in * 1.5} for id_in in sensors]})
+
+
+class FakeTransport:
+    def __init__(self):
+        self.requests = []
+
+    def post(self, url, json=None, headers=None, keys=None, data=None):
+        self.requests.append(data)
+        return values_response(data)
+
+
+class FakeAsyncTransport(FakeTransport):
+    async def post(self, url, json=None, headers=None, keys=None, data=None):
+        self.requests.append(data)
+        return values_response(data)
+
+
+def test_sensors_values_many_chunks():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    nm.via_api.transport = transport = FakeTransport()
+    response = nm.via_api.sensors_values_many(list(range(20, 140)), chunk_size=50)
+    assert len(transport.requests) == 3
+    assert response['errno'] == 200
+    assert response['failed'] == []
+    assert sorted(response['sensors']) == list(range(20, 140))
+    assert response['sensors'][21] == {"id": 21, "value": 31.5}
+
+
+def test_sensors_values_many_string_ids():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    response = nm.via_api.merge_sensors_values([['21', '22']], [{"sensors": [{"id": 21, "value": 1.0},
+                                                                              {"id": 22, "value": 2.0}]}])
+    assert response['sensors']['21'] == {"id": 21, "value": 1.0}
+    assert sorted(response['sensors']) == ['21', '22']
+
+
+def test_sensors_values_many_partial_failure():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    nm.via_api.transport = FakeTransport()
+    response = nm.via_api.sensors_values_many(list(range(1, 101)))
+    assert response['errno'] == 429
+    assert response['failed'] == [{"sensors": list(range(1, 51)), "errno": 429, "error": "Too many requests"}]
+    assert sorted(response['sensors']) == list(range(51, 101))
+
+
+def test_sensors_values_many_raise_errors():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en', raise_errors=True)
+    nm.via_api.transport = FakeTransport()
+    response = nm.via_api.sensors_values_many([12, 13, 14], chunk_size=1)
+    assert [failed['sensors'] for failed in response['failed']] == [[13]]
+    assert response['failed'][0]['errno'] == 429
+    assert 'Too many requests' in response['failed'][0]['error']
+    assert sorted(response['sensors']) == [12, 14]
+
+
+def test_async_sensors_values_many():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    nm.via_async_api.transport = transport = FakeAsyncTransport()
+    response = asyncio.run(nm.via_async_api.sensors_values_many(list(range(20, 140)), concurrency=2))
+    assert len(transport.requests) == 3
+    assert sorted(response['sensors']) == list(range(20, 140))
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from narodmon import Narodmon
+from narodmon.series import HistorySeries, numpy
+
+pytestmark = pytest.mark.skipif(numpy is None, reason='numpy is not installed')
+
+
+def series():
+    return HistorySeries([0, 30, 60, 90, 120, 150], [1.0, 3.0, 2.0, 6.0, 5.0, 4.0], id_in=1)
+
+
+@pytest.mark.parametrize('how, values', [('min', [1.0, 2.0, 4.0]), ('max', [3.0, 6.0, 5.0]),
+                                         ('mean', [2.0, 4.0, 4.5]), ('last', [3.0, 6.0, 4.0]),
+                                         ('count', [2.0, 2.0, 2.0])])
+def test_resample(how, values):
+    resampled = series().resample(60, how=how)
+    assert resampled.times.tolist() == [0, 60, 120]
+    assert resampled.values.tolist() == values
+
+
+def test_rolling():
+    rolling = series().rolling(3)
+    assert numpy.isnan(rolling[:2]).all()
+    assert rolling[2:].tolist() == pytest.approx([2.0, 11 / 3, 13 / 3, 5.0])
+    assert series().rolling(2, how='max')[1:].tolist() == [3.0, 3.0, 6.0, 6.0, 5.0]
+    assert series().rolling(2, how='std')[1] == pytest.approx(1.0)
+
+
+def test_trend():
+    linear = HistorySeries(range(0, 7200, 60), [0.5 * point_time / 3600 for point_time in range(0, 7200, 60)])
+    assert linear.trend() == pytest.approx(0.5)
+    assert numpy.isnan(HistorySeries([0], [1.0]).trend())
+
+
+def test_sorted_and_slice():
+    unsorted = HistorySeries([30, 0, 60], [2.0, 1.0, 3.0])
+    assert unsorted.times.tolist() == [0, 30, 60]
+    assert unsorted.slice(start=10, end=60).values.tolist() == [2.0, 3.0]
+
+
+def test_from_response():
+    response = {"sensors": [{"id": 7, "unit": "C"}],
+                "data": [{"id": 7, "time": 100, "value": 1.5}, {"id": 7, "time": 50, "value": 0.5}]}
+    history = HistorySeries.from_response(response)
+    assert (history.id, history.unit) == (7, "C")
+    assert history.to_points() == [{"time": 50, "value": 0.5}, {"time": 100, "value": 1.5}]
+
+
+def test_from_response_string_id():
+    response = {"sensors": [{"id": 7, "unit": "C"}, {"id": 8, "unit": "%"}],
+                "data": [{"id": 7, "time": 100, "value": 1.5}, {"id": 8, "time": 100, "value": 50.0}]}
+    history = HistorySeries.from_response(response, id_in='7')
+    assert (history.unit, history.values.tolist()) == ("C", [1.5])
+
+
+def test_sensors_history_series():
+    nm = Narodmon(uuid='uuid', api_key='key', lang='en')
+    response = {"sensors": [{"id": 7}], "data": [{"id": 7, "time": 100, "value": 1.5}]}
+
+    async def sensors_history(id_in, period, offset, api_key=None, uuid=None):
+        return response
+
+    nm.via_api.sensors_history = lambda id_in, period, offset, api_key=None, uuid=None: response
+    nm.via_async_api.sensors_history = sensors_history
+    assert nm.via_api.sensors_history_series(7, 'day', 0).values.tolist() == [1.5]
+    assert asyncio.run(nm.via_async_api.sensors_history_series(7, 'day', 0)).times.tolist() == [100]
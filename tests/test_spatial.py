@@ -0,0 +1,54 @@
+import pytest
+
+from narodmon.crawler import MapCrawler
+from narodmon.spatial import SpatialIndex, haversine, numpy
+
+pytestmark = pytest.mark.skipif(numpy is None, reason='numpy is not installed')
+
+
+def response():
+    return {"devices": [{"id": 1, "lat": 55.75, "lon": 37.62, "type": 1},
+                        {"id": 2, "lat": 55.76, "lon": 37.64, "type": 2},
+                        {"id": 3, "lat": 59.93, "lon": 30.31, "type": 1}],
+            "webcams": [{"id": 10, "lat": 55.751, "lon": 37.621}]}
+
+
+def test_haversine():
+    distance = haversine(55.75, 37.62, numpy.array([59.93]), numpy.array([30.31]))[0]
+    assert distance == pytest.approx(633, abs=3)
+
+
+def test_nearby_and_nearest():
+    index = SpatialIndex()
+    assert index.add_response(response()) == 4
+    assert [item['id'] for _, item in index.nearby(55.75, 37.62, 5)] == [1, 10, 2]
+    assert [item['id'] for _, item in index.nearby(55.75, 37.62, 5, kind='device')] == [1, 2]
+    nearest = index.nearest(55.76, 37.64, k=2, where=lambda item: item.get('type') == 1)
+    assert [item['id'] for _, item in nearest] == [1, 3]
+    assert nearest[1][0] == pytest.approx(633, abs=3)
+
+
+def test_within():
+    index = SpatialIndex()
+    index.add_response(response())
+    assert sorted(item['id'] for item in index.within([55.7, 37.6, 55.8, 37.63])) == [1, 10]
+
+
+def test_refresh_removes_missing_items():
+    index = SpatialIndex(cell_size=1)
+    index.add_response(response())
+    index.add_response({"devices": [{"id": 2, "lat": 55.76, "lon": 37.64}]}, bounds=[55, 37, 56, 38])
+    assert sorted(item['id'] for item in index.within([55, 37, 56, 38])) == [2]
+    assert index.stale_cells([55, 37, 57, 38], max_age=60) == [(56, 37)]
+
+
+def test_refresh_by_crawler():
+    class FakeMapAPI:
+        def map_bounds(self, bounds, limit, lang=None, api_key=None, uuid=None):
+            return {"devices": [item for item in response()['devices']
+                                if bounds[0] <= item['lat'] <= bounds[2] and bounds[1] <= item['lon'] <= bounds[3]]}
+
+    index = SpatialIndex(cell_size=1)
+    assert index.refresh(MapCrawler(FakeMapAPI()), [55, 37, 56, 38]) == 1
+    assert len(index) == 2
+    assert index.refresh(MapCrawler(FakeMapAPI()), [55, 37, 56, 38]) == 0
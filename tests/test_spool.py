@@ -0,0 +1,42 @@
+import pytest
+
+from narodmon import Narodmon
+from narodmon.spool import Spool
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = Spool(str(tmp_path / 'spool.db'))
+    yield spool
+    spool.close()
+
+
+def test_spool_append_stamps_time(spool):
+    seqs, devices = spool.append([{"mac": "A", "sensors": [{"id": "T1", "value": 1}, {"id": "T2", "value": 2,
+                                                                                       "time": 100}]}])
+    assert len(seqs) == 2 and len(spool) == 2
+    assert devices[0]["sensors"][0]["time"] > 0
+    assert devices[0]["sensors"][1]["time"] == 100
+
+
+def test_spool_peek_groups_by_device(spool):
+    spool.append([{"mac": "A", "name": "device", "sensors": [{"id": "T1", "value": 1, "time": 1}]},
+                  {"mac": "B", "sensors": [{"id": "T1", "value": 2, "time": 1}]}])
+    spool.append([{"mac": "A", "sensors": [{"id": "T1", "value": 3, "time": 2}]}])
+    seqs, devices = spool.peek()
+    assert len(seqs) == 3
+    assert devices == [{"mac": "A", "name": "device", "sensors": [{"id": "T1", "value": 1, "time": 1},
+                                                                  {"id": "T1", "value": 3, "time": 2}]},
+                       {"mac": "B", "sensors": [{"id": "T1", "value": 2, "time": 1}]}]
+
+
+def test_spool_keeps_rejected_readings(spool):
+    nm = Narodmon(mac='A', spool=spool)
+    nm.via_json.post_payload = lambda payload: {"errno": 503, "error": "Maintenance"}
+    nm.via_json.send_bulk_data([{"mac": "A", "sensors": [{"id": "T1", "value": 1}]}])
+    assert len(spool) == 1
+    sent = []
+    nm.via_json.post_payload = lambda payload: sent.append(payload) or {"errno": 200, "error": "OK"}
+    assert nm.via_json.replay_spool() == 1
+    assert len(spool) == 0
+    assert sent[0]["devices"][0]["sensors"][0]["id"] == "T1"
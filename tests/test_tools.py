@@ -0,0 +1,83 @@
+import io
+import json
+
+import pytest
+
+from narodmon.exceptions import NarodmonError, RateLimitedError, MaintenanceError, KeyBlockedError
+from narodmon.interface_api import InterfaceAPI
+from narodmon.interface_json import InterfaceJSON
+from narodmon.tools import decode_body, response_error, status_decode, encode_json
+from narodmon.transport import BufferedResponse
+
+
+def test_decode_body_json():
+    assert decode_body(b'{"errno": 200, "error": "OK"}') == {"errno": 200, "error": "OK"}
+
+
+def test_decode_body_not_json():
+    assert decode_body(b'<html>Bad gateway</html>', status_code=502) == {"errno": 502,
+                                                                          "error": "<html>Bad gateway</html>"}
+
+
+def test_decode_body_not_json_on_ok_status():
+    body = decode_body(b'<html>Login</html>', status_code=200)
+    assert body['errno'] == 502
+    assert response_error(200, body) is not None
+
+
+def test_decode_body_custom_decoder():
+    assert decode_body(b'{}', loads=lambda content: 'decoded') == 'decoded'
+
+
+@pytest.mark.parametrize('errno, exception', [(429, RateLimitedError), (503, MaintenanceError),
+                                              (423, KeyBlockedError), (999, NarodmonError)])
+def test_response_error_errno(errno, exception):
+    error = response_error(200, {"errno": errno, "error": "text"})
+    assert type(error) == exception
+    assert error.errno == errno
+
+
+def test_response_error_ok():
+    assert response_error(200, {"errno": 200, "error": "OK"}) is None
+
+
+def test_response_error_http_status():
+    assert type(response_error(503, {"errno": 503, "error": "down"})) == MaintenanceError
+
+
+def test_status_decode_raise():
+    with pytest.raises(RateLimitedError):
+        status_decode(BufferedResponse(200, {"errno": 429, "error": "Too fast"}), raise_errors=True)
+
+
+def test_status_decode_stderr(monkeypatch):
+    output = io.StringIO()
+    monkeypatch.setattr('narodmon.tools.stderr', output)
+    body = {"errno": 429, "error": "Too fast"}
+    assert status_decode(BufferedResponse(200, body)) == body
+    assert 'Too fast' in output.getvalue()
+
+
+def test_encode_json_mixed():
+    from narodmon.sensor_batch import SensorBatch
+    batch = SensorBatch.from_columns(['T1'], [1.5], times=[100])
+    body = encode_json({"devices": [{"mac": "A", "sensors": batch}], "n": None})
+    assert json.loads(body) == {"devices": [{"mac": "A", "sensors": [{"id": "T1", "value": 1.5, "time": 100}]}],
+                                "n": None}
+
+
+def test_api_encode_payload_reuses_envelope():
+    api = InterfaceAPI(uuid='uuid', api_key='key', lang='en')
+    payload = {"cmd": "sensorsValues", "sensors": [1, 2], "uuid": "uuid", "api_key": "key"}
+    assert json.loads(api.encode_payload(payload)) == payload
+    assert json.loads(api.encode_payload(dict(payload, sensors=[3]))) == dict(payload, sensors=[3])
+    assert len(api.envelopes) == 1
+
+
+def test_json_encode_payload_reuses_device_header():
+    interface = InterfaceJSON(mac='A', name='name', owner='owner', lat=1.0, lon=2.0, alt=3.0)
+    for value in (1.0, 2.0):
+        payload = {"devices": [interface.prepare_device_data_full({"id": "T1", "value": value}),
+                               {"mac": "B", "sensors": []}]}
+        assert json.loads(interface.encode_payload(payload)) == payload
+    assert len(interface.device_headers) == 2
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+import requests
+
+from narodmon import Narodmon
+from narodmon.transport import Transport
+
+
+def test_transport_shared_between_interfaces():
+    nm = Narodmon()
+    assert nm.via_json.transport is nm.transport
+    assert nm.via_api.transport is nm.transport
+
+
+def test_transport_session_reused():
+    nm = Narodmon(pool_maxsize=2)
+    session = nm.transport.get_session()
+    assert nm.transport.get_session() is session
+    assert session.get_adapter('https://narodmon.ru')._pool_maxsize == 2
+
+
+def test_transport_context_manager_closes_session():
+    with Narodmon() as nm:
+        nm.transport.get_session()
+    assert nm.transport.session is None
+
+
+def test_transport_session_created_once_by_threads(monkeypatch):
+    created = []
+
+    class SlowSession(requests.Session):
+        def __init__(self):
+            created.append(self)
+            time.sleep(0.05)
+            super().__init__()
+
+    monkeypatch.setattr(requests, 'Session', SlowSession)
+    transport = Transport()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: transport.get_session(), range(8)))
+    assert len(created) == 1
+    assert all(session is sessions[0] for session in sessions)
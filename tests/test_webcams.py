@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+
+import requests
+
+from narodmon import Narodmon
+from narodmon.webcams import WebcamDownloader
+
+FILES = {f'http://cam/{index}.jpg': bytes([index]) * 1000 for index in range(10)}
+FILES['http://cam/same.jpg'] = FILES['http://cam/1.jpg']
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200, fail_after=None, etag=None):
+        self.body = body
+        self.status_code = status_code
+        self.fail_after = fail_after
+        self.headers = {'ETag': etag} if etag else {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Error')
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError('Connection broken')
+            yield self.body[start:start + chunk_size]
+
+
+class FakeTransport:
+    def __init__(self, fail_after=None, ignore_if_range=False):
+        self.requests = []
+        self.fail_after = fail_after
+        self.ignore_if_range = ignore_if_range
+        self.files = dict(FILES)
+        self.lock = threading.Lock()
+
+    def stream(self, url, headers=None):
+        with self.lock:
+            self.requests.append((url, headers))
+        if url not in self.files:
+            return FakeResponse(b'', status_code=404)
+        body = self.files[url]
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        if headers and 'Range' in headers and (self.ignore_if_range or headers.get('If-Range') == etag):
+            return FakeResponse(body[int(headers['Range'][6:-1]):], status_code=206, etag=etag)
+        fail_after, self.fail_after = self.fail_after, None
+        return FakeResponse(body, fail_after=fail_after, etag=etag)
+
+
+class FakeAPI:
+    def __init__(self, transport):
+        self.transport = transport
+        self.calls = []
+
+    def webcam_images(self, id_in, limit=None, since=None, latest=None, width=None, uuid=None, api_key=None):
+        self.calls.append((id_in, since))
+        return {"id": id_in, "images": [{"time": 100 + index, "image": f'http://cam/{index}.jpg'}
+                                        for index in range(10) if since is None or 100 + index >= since]}
+
+
+def test_download_is_content_addressed(tmp_path):
+    downloader = WebcamDownloader(FakeAPI(FakeTransport()), str(tmp_path), chunk_size=128)
+    digest, path = downloader.download('http://cam/3.jpg')
+    assert digest == hashlib.sha256(FILES['http://cam/3.jpg']).hexdigest()
+    assert open(path, 'rb').read() == FILES['http://cam/3.jpg']
+    assert downloader.download('http://cam/same.jpg')[1] == downloader.download('http://cam/1.jpg')[1]
+    assert os.listdir(os.path.join(str(tmp_path), 'partial')) == []
+
+
+def test_download_resumes_partial(tmp_path):
+    transport = FakeTransport(fail_after=512)
+    downloader = WebcamDownloader(FakeAPI(transport), str(tmp_path), chunk_size=128)
+    digest, path = downloader.download('http://cam/5.jpg')
+    assert open(path, 'rb').read() == FILES['http://cam/5.jpg']
+    assert digest == hashlib.sha256(FILES['http://cam/5.jpg']).hexdigest()
+    assert transport.requests[1][1]['Range'] == 'bytes=512-'
+    assert transport.requests[1][1]['If-Range'] == f'"{digest}"'
+
+
+def download_changed(tmp_path, transport):
+    downloader = WebcamDownloader(FakeAPI(transport), str(tmp_path), chunk_size=128, max_attempts=1)
+    try:
+        downloader.download('http://cam/5.jpg')
+    except requests.exceptions.ChunkedEncodingError:
+        pass
+    transport.files['http://cam/5.jpg'] = b'new' * 300
+    digest, path = downloader.download('http://cam/5.jpg')
+    assert open(path, 'rb').read() == b'new' * 300
+    assert digest == hashlib.sha256(b'new' * 300).hexdigest()
+    assert os.listdir(os.path.join(str(tmp_path), 'partial')) == []
+
+
+def test_partial_of_changed_image_discarded(tmp_path):
+    download_changed(tmp_path, FakeTransport(fail_after=512))
+
+
+def test_partial_discarded_if_server_ignores_if_range(tmp_path):
+    transport = FakeTransport(fail_after=512, ignore_if_range=True)
+    download_changed(tmp_path, transport)
+    assert transport.requests[-1][1] is None
+
+
+def test_save_statuses(tmp_path):
+    transport = FakeTransport()
+    downloader = WebcamDownloader(FakeAPI(transport), str(tmp_path))
+    assert downloader.save(7, {"time": 100, "image": 'http://cam/1.jpg'})['status'] == 'saved'
+    assert downloader.save(7, {"time": 100, "image": 'http://cam/1.jpg'})['status'] == 'exists'
+    assert downloader.save(7, {"time": 101, "image": 'http://cam/same.jpg'})['status'] == 'duplicate'
+    result = downloader.save(7, {"time": 102, "image": 'http://cam/missing.jpg'})
+    assert result['status'] == 'failed' and '404' in result['error']
+    assert len(transport.requests) == 3
+    assert downloader.get_last_time(7) == 100
+
+
+def test_sync_and_retention(tmp_path):
+    api = FakeAPI(FakeTransport())
+    downloader = WebcamDownloader(api, str(tmp_path), concurrency=4, keep=3)
+    result = downloader.sync([1, 2])
+    assert result['failed'] == []
+    assert len(result['results']) == 20
+    assert [snapshot[0] for snapshot in downloader.get_snapshots(1)] == [107, 108, 109]
+    objects = [name for _, _, names in os.walk(os.path.join(str(tmp_path), 'objects')) for name in names]
+    assert len(objects) == 3
+    downloader.sync([1])
+    assert api.calls[-1] == (1, 110)
+
+
+def test_webcam_downloader_factory(tmp_path):
+    nm = Narodmon()
+    downloader = nm.via_api.webcam_downloader(str(tmp_path), keep=10)
+    assert downloader.interface is nm.via_api
+    assert downloader.keep == 10
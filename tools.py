@@ -1,38 +1,129 @@
 from sys import stderr
 import hashlib
+import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def status_decode(response):
-    if response.status_code == 200 or response.status_code == 201 or response.status_code == 202:
-        if response.json()['errno'] != 200 and response.json()['errno'] != 201 and response.json()['errno'] != 202:
-            if response.json()['errno'] == 429:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Too fast | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 400:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Syntax error | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 401:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Auth required | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 403:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Forbidden | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 404:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Not found | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 434:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Offline | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 503:
-                stderr.write(f"\nServer response is {response.json()['errno']} == Maintenance | Original: "
-                             f"\n{response.json()['error']}\n")
-            elif response.json()['errno'] == 423:
-                stderr.write(f"\nServer response is {response.json()['errno']} == API key blocked | Original: "
-                             f"\n{response.json()['error']}\n")
-            else:
-                stderr.write(f"\nServer response is {response.json()} == Something nasty happened\n")
-    else:
-        stderr.write(f"\nServer response is {response.status_code} == Something nasty happened | {response.json()}\n")
+from narodmon.classifier import default_classifier
+from narodmon.exceptions import NarodmonError, ERRNO_EXCEPTIONS
+
+OK_CODES = (200, 201, 202)
+INVALID_BODY_ERRNO = 502  # errno of response which body is not JSON (i.e. HTML page of proxy)
+
+json_decoder = orjson.loads if orjson else json.loads
+
+
+def compact_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+json_encoder = orjson.dumps if orjson else compact_dumps
+
+
+def set_json_decoder(loads):
+    """
+    Set/update JSON decoder used for all responses (for example, orjson.loads or ujson.loads)
+
+    :param loads: callable, accepts bytes or str and returns decoded object
+    """
+    global json_decoder
+    json_decoder = loads
+
+
+def set_json_encoder(dumps):
+    """
+    Set/update JSON encoder used for all request bodies (for example, orjson.dumps or ujson.dumps)
+
+    :param dumps: callable, accepts object and returns bytes or str, raises TypeError for unsupported objects
+    """
+    global json_encoder
+    json_encoder = dumps
+
+
+def decode_body(content, status_code=200, loads=None):
+    """
+    Decode response body once. If body is not JSON (i.e. HTML error page), errno will be set to HTTP status code,
+    or to INVALID_BODY_ERRNO if status is OK (page of proxy or captive portal is not a server confirmation)
+
+    :param content: raw response body (bytes)
+    :param status_code: HTTP status code of response
+    :param loads: (optional) JSON decoder, by default - module decoder
+    :return: decoded body
+    """
+    try:
+        return (loads if loads else json_decoder)(content)
+    except ValueError:
+        return {"errno": status_code if status_code not in OK_CODES else INVALID_BODY_ERRNO,
+                "error": content.decode('utf-8', 'replace') if type(content) == bytes else content}
+
+
+def response_error(status_code, body):
+    """
+    Map decoded response to typed error
+
+    :param status_code: HTTP status code
+    :param body: decoded response body
+    :return: NarodmonError (or subclass) instance, None if response is OK
+    """
+    errno = body.get('errno', 200) if type(body) == dict else 200
+    if status_code in OK_CODES and errno in OK_CODES:
+        return None
+    if status_code not in OK_CODES and errno in OK_CODES:
+        errno = status_code
+    error = body.get('error') if type(body) == dict else body
+    return ERRNO_EXCEPTIONS.get(errno, NarodmonError)(errno, error=error, body=body, status_code=status_code)
+
+
+def status_decode(response, raise_errors=False):
+    """
+    Check server response, body is decoded only once
+
+    :param response: response object
+    :param raise_errors: if True - error will be raised, otherwise it will be written to stderr
+    :return: decoded body
+    """
+    body = response.json()
+    error = response_error(response.status_code, body)
+    if error:
+        if raise_errors:
+            raise error
+        stderr.write(f"\n{error}\n")
+    return body
+
+
+def encode_json(obj):
+    """
+    Serialize object into JSON by module encoder, objects with encode() method (i.e. SensorBatch) are serialized
+    by themselves
+
+    :param obj: object to serialize
+    :return: bytes
+    """
+    if hasattr(obj, 'encode') and not isinstance(obj, str):
+        return obj.encode()
+    try:
+        body = json_encoder(obj)
+    except TypeError:
+        if type(obj) == dict:
+            return b'{' + b','.join(encode_json(str(key)) + b':' + encode_json(value)
+                                    for key, value in obj.items()) + b'}'
+        if type(obj) in (list, tuple):
+            return b'[' + b','.join(encode_json(item) for item in obj) + b']'
+        raise
+    return body if type(body) == bytes else body.encode()
+
+
+def sensor_class(id_in):
+    """
+    Get class of sensor by its ID according to settings.sensor_dict (exact name first, then longest wildcard)
+
+    :param id_in: sensor ID, i.e. 'TEMPC', 'T1', 'DS18T2'
+    :return: class name, i.e. 'temperature', None if unknown
+    """
+    return default_classifier.memo(id_in)
 
 
 def generate_hash(app_id):
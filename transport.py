@@ -0,0 +1,339 @@
+import asyncio
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from narodmon.exceptions import RateLimitedError
+from narodmon.tools import decode_body
+
+
+class BufferedResponse:
+    def __init__(self, status_code, body, local=False):
+        """
+        Already read response, body is decoded only once
+
+        :param status_code: HTTP status code
+        :param body: decoded JSON body
+        :param local: True if response is generated by client (request was not sent)
+        """
+        self.status_code = status_code
+        self.body = body
+        self.local = local
+
+    def json(self):
+        return self.body
+
+    def errno(self):
+        """
+        Get errno of response (HTTP status code if body has no errno)
+
+        :return: int
+        """
+        if type(self.body) == dict and 'errno' in self.body:
+            return self.body['errno']
+        return self.status_code
+
+
+def retry_delay(retry_policy, rate_limiter, attempt, start, keys):
+    """
+    Get delay before next attempt, request is not retried if time since first attempt together with wait for rate
+    limiter would exceed retry_policy.max_elapsed
+
+    :param retry_policy: RetryPolicy
+    :param rate_limiter: RateLimiter or None
+    :param attempt: number of failed attempt (starting from 0)
+    :param start: time.monotonic() of first attempt
+    :param keys: rate limiter keys of request, list of (scope, name) tuples or None
+    :return: delay in seconds, None if request should not be retried anymore
+    """
+    wait = rate_limiter.get_delay(keys) if rate_limiter and keys else 0.0
+    return retry_policy.delay(attempt, time.monotonic() - start, wait)
+
+
+class Transport:
+    def __init__(self, pool_connections=4, pool_maxsize=16, pool_block=False, keep_alive=True,
+                 connect_timeout=5.0, read_timeout=30.0, json_decoder=None, rate_limiter=None,
+                 retry_policy=None, circuit_breaker=None):
+        """
+        Shared HTTP connection pool for narodmon endpoints (keep-alive session)
+
+        :param pool_connections: number of per-host pools to cache
+        :param pool_maxsize: maximum connections kept open per host
+        :param pool_block: if True - wait for free connection instead of opening extra one when pool is full
+        :param keep_alive: if False - connection will be closed after each request
+        :param connect_timeout: TCP/TLS connect timeout in seconds
+        :param read_timeout: response read timeout in seconds
+        :param json_decoder: (optional) JSON decoder for responses, by default - tools.json_decoder
+        :param rate_limiter: (optional) RateLimiter, all requests will wait for their budgets (request which should
+            wait longer than rate_limiter.max_wait is not sent, local response with errno 429 is returned)
+        :param retry_policy: (optional) RetryPolicy for retryable errno, HTTP statuses and connection errors
+        :param circuit_breaker: (optional) CircuitBreaker, fails requests fast in maintenance or if key blocked
+        """
+        self.json_decoder = json_decoder
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = None
+        self.session_lock = threading.Lock()
+
+    def get_session(self):
+        """
+        Get (lazily create) pooled session, it's created once even if called from several threads
+
+        :return: requests.Session
+        """
+        session = self.session
+        if session is not None:
+            return session
+        with self.session_lock:
+            if self.session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                                      pool_block=self.pool_block)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Connection': 'keep-alive' if self.keep_alive else 'close'})
+                self.session = session
+            return self.session
+
+    def set_timeouts(self, connect_timeout=None, read_timeout=None):
+        """
+        Set/update connect and read timeouts
+
+        :param connect_timeout: (optional) connect timeout in seconds
+        :param read_timeout: (optional) read timeout in seconds
+        """
+        if connect_timeout:
+            self.connect_timeout = connect_timeout
+        if read_timeout:
+            self.read_timeout = read_timeout
+
+    def post(self, url, json=None, headers=None, keys=None, data=None):
+        """
+        Send POST request over pooled connection, retry it if needed
+
+        :param url: url of endpoint
+        :param json: payload (dict)
+        :param headers: (optional) request headers
+        :param keys: (optional) rate limiter keys of request, list of (scope, name) tuples
+        :param data: (optional) already serialized body (bytes), used instead of json
+        :return: BufferedResponse
+        """
+        attempt = 0
+        start = time.monotonic()
+        while True:
+            try:
+                response = self.send(url, json=json, headers=headers, keys=keys, data=data)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_failure()
+                delay = retry_delay(self.retry_policy, self.rate_limiter, attempt, start, keys) \
+                    if self.retry_policy and self.retry_policy.retry_connection_errors else None
+                if delay is None:
+                    raise
+            else:
+                if response.local or not self.retry_policy or not self.retry_policy.is_retryable(response):
+                    return response
+                delay = retry_delay(self.retry_policy, self.rate_limiter, attempt, start, keys)
+                if delay is None:
+                    return response
+            time.sleep(delay)
+            attempt += 1
+
+    def send(self, url, json=None, headers=None, keys=None, data=None):
+        """
+        Send one POST request over pooled connection
+
+        :param url: url of endpoint
+        :param json: payload (dict)
+        :param headers: (optional) request headers
+        :param keys: (optional) rate limiter keys of request, list of (scope, name) tuples
+        :param data: (optional) already serialized body (bytes), used instead of json
+        :return: BufferedResponse
+        """
+        if self.circuit_breaker:
+            body = self.circuit_breaker.check(keys)
+            if body:
+                return BufferedResponse(200, body, local=True)
+        if self.rate_limiter and keys:
+            try:
+                self.rate_limiter.acquire(keys)
+            except RateLimitedError as error:
+                return BufferedResponse(200, error.body, local=True)
+        response = self.get_session().post(url, json=json, data=data, headers=headers,
+                                           timeout=(self.connect_timeout, self.read_timeout))
+        response = BufferedResponse(response.status_code,
+                                    decode_body(response.content, response.status_code, self.json_decoder))
+        if self.rate_limiter and keys:
+            self.rate_limiter.update(keys, response.errno())
+        if self.circuit_breaker:
+            self.circuit_breaker.record(keys, response.errno())
+        return response
+
+    def stream(self, url, headers=None):
+        """
+        Send GET request over pooled connection without reading body (i.e. to download file by chunks)
+
+        :param url: url of file
+        :param headers: (optional) request headers, i.e. Range
+        :return: requests.Response (should be closed or used as context manager)
+        """
+        return self.get_session().get(url, headers=headers, stream=True,
+                                      timeout=(self.connect_timeout, self.read_timeout))
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        with self.session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AsyncTransport:
+    def __init__(self, concurrency=100, pool_maxsize=100, limit_per_host=100, keep_alive=True,
+                 connect_timeout=5.0, read_timeout=30.0, json_decoder=None, rate_limiter=None,
+                 retry_policy=None, circuit_breaker=None):
+        """
+        Shared asyncio HTTP connection pool for narodmon endpoints (requires aiohttp)
+
+        :param concurrency: maximum requests in flight at the same time
+        :param pool_maxsize: maximum connections in pool
+        :param limit_per_host: maximum connections per host
+        :param keep_alive: if False - connection will be closed after each request
+        :param connect_timeout: TCP/TLS connect timeout in seconds
+        :param read_timeout: response read timeout in seconds
+        :param json_decoder: (optional) JSON decoder for responses, by default - tools.json_decoder
+        :param rate_limiter: (optional) RateLimiter, all requests will wait for their budgets (request which should
+            wait longer than rate_limiter.max_wait is not sent, local response with errno 429 is returned)
+        :param retry_policy: (optional) RetryPolicy for retryable errno, HTTP statuses and connection errors
+        :param circuit_breaker: (optional) CircuitBreaker, fails requests fast in maintenance or if key blocked
+        """
+        self.json_decoder = json_decoder
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.concurrency = concurrency
+        self.pool_maxsize = pool_maxsize
+        self.limit_per_host = limit_per_host
+        self.keep_alive = keep_alive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = None
+        self.semaphore = None
+
+    def get_session(self):
+        """
+        Get (lazily create) pooled session, should be called inside running event loop
+
+        :return: aiohttp.ClientSession
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for async interfaces, install it via 'pip install aiohttp'")
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, limit_per_host=self.limit_per_host,
+                                             force_close=not self.keep_alive)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self.session
+
+    async def post(self, url, json=None, headers=None, keys=None, data=None):
+        """
+        Send POST request over pooled connection, retry it if needed
+
+        :param url: url of endpoint
+        :param json: payload (dict)
+        :param headers: (optional) request headers
+        :param keys: (optional) rate limiter keys of request, list of (scope, name) tuples
+        :param data: (optional) already serialized body (bytes), used instead of json
+        :return: BufferedResponse
+        """
+        attempt = 0
+        start = time.monotonic()
+        while True:
+            try:
+                response = await self.send(url, json=json, headers=headers, keys=keys, data=data)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_failure()
+                delay = retry_delay(self.retry_policy, self.rate_limiter, attempt, start, keys) \
+                    if self.retry_policy and self.retry_policy.retry_connection_errors else None
+                if delay is None:
+                    raise
+            else:
+                if response.local or not self.retry_policy or not self.retry_policy.is_retryable(response):
+                    return response
+                delay = retry_delay(self.retry_policy, self.rate_limiter, attempt, start, keys)
+                if delay is None:
+                    return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send(self, url, json=None, headers=None, keys=None, data=None):
+        """
+        Send one POST request over pooled connection, waits for free slot if concurrency limit reached
+
+        :param url: url of endpoint
+        :param json: payload (dict)
+        :param headers: (optional) request headers
+        :param keys: (optional) rate limiter keys of request, list of (scope, name) tuples
+        :param data: (optional) already serialized body (bytes), used instead of json
+        :return: BufferedResponse
+        """
+        session = self.get_session()
+        if self.circuit_breaker:
+            body = self.circuit_breaker.check(keys)
+            if body:
+                return BufferedResponse(200, body, local=True)
+        if self.rate_limiter and keys:
+            try:
+                delay = self.rate_limiter.reserve(keys)
+            except RateLimitedError as error:
+                return BufferedResponse(200, error.body, local=True)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with self.semaphore:
+            async with session.post(url, json=json, data=data, headers=headers) as response:
+                content = await response.read()
+                response = BufferedResponse(response.status, decode_body(content, response.status,
+                                                                         self.json_decoder))
+        if self.rate_limiter and keys:
+            self.rate_limiter.update(keys, response.errno())
+        if self.circuit_breaker:
+            self.circuit_breaker.record(keys, response.errno())
+        return response
+
+    async def close(self):
+        """
+        Close all pooled connections
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
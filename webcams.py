@@ -0,0 +1,284 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from narodmon.tools import OK_CODES
+
+
+class WebcamDownloader:
+    def __init__(self, interface, path, concurrency=8, keep=100, chunk_size=65536, max_attempts=3):
+        """
+        Downloader of webcam snapshots: images are streamed to disk by chunks over pooled connections of interface
+        transport, many images are downloaded concurrently. Files are stored by sha256 of content (identical snapshots
+        are stored once), interrupted downloads are resumed by Range requests with If-Range validator (partial file
+        of changed image is discarded). Camera directory keeps hard links to stored files, only last `keep` snapshots
+        of each camera are kept.
+
+        Layout of path: objects/<2 chars of hash>/<hash><ext>, partial/<hash of url>.part,
+        cameras/<camera id>/<time>-<hash><ext>
+
+        :param interface: InterfaceAPI used for requests (with sync Transport)
+        :param path: directory of storage
+        :param concurrency: maximum downloads at the same time
+        :param keep: maximum snapshots kept for each camera, None - keep all
+        :param chunk_size: size of chunk read from connection (bytes)
+        :param max_attempts: attempts to download image (next attempt continues partial file)
+        """
+        self.interface = interface
+        self.path = path
+        self.concurrency = concurrency
+        self.keep = keep
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.url_locks = [threading.Lock() for _ in range(64)]
+        for name in ('objects', 'partial', 'cameras'):
+            os.makedirs(os.path.join(path, name), exist_ok=True)
+
+    @staticmethod
+    def get_extension(url):
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        return extension if 1 < len(extension) <= 5 else '.jpg'
+
+    def get_object_path(self, digest, extension):
+        return os.path.join(self.path, 'objects', digest[:2], f'{digest}{extension}')
+
+    def get_partial_path(self, url):
+        return os.path.join(self.path, 'partial', f'{hashlib.sha256(url.encode()).hexdigest()}.part')
+
+    def get_camera_path(self, camera_id):
+        return os.path.join(self.path, 'cameras', str(camera_id))
+
+    def get_snapshots(self, camera_id):
+        """
+        Get stored snapshots of camera
+
+        :param camera_id: id of webcam
+        :return: list of (time, hash, file name) tuples sorted by time
+        """
+        try:
+            names = os.listdir(self.get_camera_path(camera_id))
+        except FileNotFoundError:
+            return []
+        answer = []
+        for name in names:
+            image_time, _, rest = name.partition('-')
+            if image_time.isdigit() and rest:
+                answer.append((int(image_time), os.path.splitext(rest)[0], name))
+        return sorted(answer)
+
+    def get_last_time(self, camera_id):
+        """
+        Get time of last stored snapshot of camera
+
+        :param camera_id: id of webcam
+        :return: utc timestamp, None if nothing stored
+        """
+        snapshots = self.get_snapshots(camera_id)
+        return snapshots[-1][0] if snapshots else None
+
+    def download(self, url):
+        """
+        Download file by chunks into content-addressed storage (partial file is continued by Range request)
+
+        :param url: url of file
+        :return: tuple (sha256 hex digest, path of stored file)
+        """
+        partial_path = self.get_partial_path(url)
+        attempt = 0
+        with self.url_locks[hash(url) % len(self.url_locks)]:
+            while True:
+                try:
+                    return self.download_partial(url, partial_path)
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                    attempt += 1
+                    if attempt >= self.max_attempts:
+                        raise
+
+    @staticmethod
+    def get_validator(response):
+        """
+        Get validator of response content for If-Range: strong ETag or Last-Modified
+
+        :param response: requests.Response
+        :return: string, None if server didn't send it
+        """
+        etag = response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('Last-Modified')
+
+    @staticmethod
+    def discard(partial_path):
+        for path in (partial_path, f'{partial_path}.validator'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def download_partial(self, url, partial_path):
+        """
+        Download file into partial file: it's continued by Range request with If-Range validator of first response,
+        partial file is discarded if file was changed on server (or validator is unknown)
+
+        :param url: url of file
+        :param partial_path: path of partial file
+        :return: tuple (sha256 hex digest, path of stored file)
+        """
+        validator_path = f'{partial_path}.validator'
+        while True:
+            offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            validator = None
+            if offset and os.path.exists(validator_path):
+                with open(validator_path) as file:
+                    validator = file.read() or None
+            headers = {'Range': f'bytes={offset}-', 'If-Range': validator} if offset and validator else None
+            with self.interface.transport.stream(url, headers=headers) as response:
+                if headers and (response.status_code == 416 or (response.status_code == 206 and
+                                                                self.get_validator(response) != validator)):
+                    self.discard(partial_path)
+                    continue
+                response.raise_for_status()
+                digest = hashlib.sha256()
+                if headers and response.status_code == 206:
+                    with open(partial_path, 'rb') as file:
+                        for chunk in iter(lambda: file.read(self.chunk_size), b''):
+                            digest.update(chunk)
+                    mode = 'ab'
+                else:
+                    mode = 'wb'
+                    with open(validator_path, 'w') as file:
+                        file.write(self.get_validator(response) or '')
+                with open(partial_path, mode) as file:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        digest.update(chunk)
+                        file.write(chunk)
+            break
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        digest = digest.hexdigest()
+        object_path = self.get_object_path(digest, self.get_extension(url))
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        with self.lock:
+            if os.path.exists(object_path):
+                os.remove(partial_path)
+            else:
+                os.replace(partial_path, object_path)
+        return digest, object_path
+
+    def save(self, camera_id, image):
+        """
+        Download snapshot of camera (if it isn't stored yet) and apply retention
+
+        :param camera_id: id of webcam
+        :param image: dict with time and image url (item of webcamImages images)
+        :return: dict with camera, time, url, hash, path and status: 'saved', 'exists' (snapshot of this time is
+                 already stored), 'duplicate' (camera has snapshot with the same content) or 'failed' (with error)
+        """
+        image_time = int(image.get('time') or time.time())
+        answer = {"camera": camera_id, "time": image_time, "url": image.get('image'), "hash": None, "path": None}
+        snapshots = self.get_snapshots(camera_id)
+        for snapshot_time, digest, name in snapshots:
+            if snapshot_time == image_time:
+                answer.update({"hash": digest, "path": os.path.join(self.get_camera_path(camera_id), name),
+                               "status": 'exists'})
+                return answer
+        try:
+            digest, object_path = self.download(answer['url'])
+        except Exception as error:
+            answer.update({"status": 'failed', "error": str(error)})
+            return answer
+        answer['hash'] = digest
+        if any(snapshot[1] == digest for snapshot in snapshots):
+            answer['status'] = 'duplicate'
+            return answer
+        camera_path = self.get_camera_path(camera_id)
+        os.makedirs(camera_path, exist_ok=True)
+        answer['path'] = os.path.join(camera_path, f'{image_time}-{os.path.basename(object_path)}')
+        with self.lock:
+            try:
+                os.link(object_path, answer['path'])
+            except FileExistsError:
+                pass
+            except FileNotFoundError:
+                answer.update({"path": None, "status": 'failed', "error": 'Stored file was removed by retention'})
+                return answer
+            except OSError:
+                shutil.copyfile(object_path, answer['path'])
+        answer['status'] = 'saved'
+        self.apply_retention(camera_id)
+        return answer
+
+    def apply_retention(self, camera_id):
+        """
+        Remove oldest snapshots of camera over keep limit, stored files without links are removed too
+
+        :param camera_id: id of webcam
+        :return: count of removed snapshots
+        """
+        if self.keep is None:
+            return 0
+        camera_path = self.get_camera_path(camera_id)
+        with self.lock:
+            snapshots = self.get_snapshots(camera_id)
+            removed = snapshots[:max(len(snapshots) - self.keep, 0)]
+            for _, digest, name in removed:
+                object_path = self.get_object_path(digest, os.path.splitext(name)[1])
+                os.remove(os.path.join(camera_path, name))
+                if os.path.exists(object_path) and os.stat(object_path).st_nlink <= 1:
+                    os.remove(object_path)
+        return len(removed)
+
+    def download_images(self, images):
+        """
+        Download snapshots concurrently (repeated snapshots of camera are downloaded once)
+
+        :param images: list of (camera id, image dict with time and image url) tuples
+        :return: list of results of save (same order as images)
+        """
+        tasks = {}
+        for camera_id, image in images:
+            if image.get('image'):
+                tasks.setdefault((camera_id, image['image']), (camera_id, image))
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = dict(zip(tasks, executor.map(lambda task: self.save(*task), tasks.values())))
+        return [results[(camera_id, image['image'])] for camera_id, image in images if image.get('image')]
+
+    def download_webcams(self, webcams):
+        """
+        Download last snapshots of webcams from webcamsNearby response (or MapCrawler result)
+
+        :param webcams: response JSON or list of webcams with id, time and image
+        :return: list of results of save
+        """
+        if type(webcams) == dict:
+            webcams = webcams.get('webcams') or []
+        return self.download_images([(webcam.get('id'), webcam) for webcam in webcams])
+
+    def sync(self, camera_ids, limit=None):
+        """
+        Request lists of snapshots of cameras (since last stored snapshot) and download new ones
+
+        :param camera_ids: ids of webcams
+        :param limit: (optional) maximum snapshots in list of each camera (max 50)
+        :return: dict with results of save and failed lists of snapshots
+        """
+        images = []
+        failed = []
+        for camera_id in camera_ids:
+            last_time = self.get_last_time(camera_id)
+            try:
+                response = self.interface.webcam_images(camera_id, limit=limit,
+                                                        since=last_time + 1 if last_time is not None else None)
+            except Exception as error:
+                failed.append({"camera": camera_id, "error": str(error)})
+                continue
+            if type(response) != dict or response.get('errno', 200) not in OK_CODES:
+                failed.append({"camera": camera_id, "error": response})
+                continue
+            images.extend((camera_id, image) for image in response.get('images') or [])
+        return {"results": self.download_images(images), "failed": failed}